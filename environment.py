@@ -386,6 +386,23 @@ def env() -> Mapping[str, Optional[str]]:
         #
         'AZUL_ES_TIMEOUT': '60',
 
+        # The maximum number of connections to each Elasticsearch node that a
+        # process keeps open. The connections are reused by subsequent
+        # requests, including those made during later invocations of the same
+        # Lambda process. Threads making concurrent requests in excess of
+        # this limit wait for a connection to be returned to the pool. This
+        # should be at least as large as the number of threads making
+        # concurrent requests to Elasticsearch in any given process.
+        #
+        'AZUL_ES_POOL_SIZE': '16',
+
+        # Set to 1 to have the service send independent requests to
+        # Elasticsearch concurrently, using an asynchronous client on an event
+        # loop, instead of one after the other or batched into a single
+        # multi-search request.
+        #
+        'AZUL_ES_ASYNC': '0',
+
         # The number of workers pulling files from the DSS repository. There is
         # one such set of repository workers per index worker.
         #
@@ -399,6 +416,41 @@ def env() -> Mapping[str, Optional[str]]:
         #
         'AZUL_TDR_WORKERS': '1',
 
+        # The number of BigQuery queries used to retrieve the metadata entities
+        # of a TDR bundle, not counting the queries for the links entities.
+        # The entity types are distributed over that many queries, each
+        # combining the rows for its entity types using UNION ALL. Every
+        # query pays BigQuery's job startup latency, so fewer queries make
+        # for faster indexing. Set this variable to 0 to use one query per
+        # entity type.
+        #
+        'AZUL_TDR_ENTITY_QUERIES': '0',
+
+        # The location of a persistent cache of the stitching lineage of TDR
+        # snapshots, either an S3 URL of the form s3://{bucket}/{prefix} or a
+        # file:// URL of a local directory. For every snapshot, the cache holds
+        # an index mapping each output entity of a process to the bundles
+        # containing that process. The index is built by a single scan of the
+        # snapshot's `links` table the first time a bundle from the snapshot
+        # needs stitching, and turns every subsequent search for upstream
+        # bundles into a lookup. Indices are keyed on snapshot ID, so a new
+        # snapshot gets a new index. Sources that are datasets are never
+        # cached. If this variable is unset, upstream bundles are found by
+        # querying the `links` table every time.
+        #
+        # The indexer Lambda functions are granted access to the objects under
+        # the given S3 location, e.g. s3://{AZUL_S3_BUCKET}/lineage
+        #
+        # Lambda processes don't coordinate the building of an index. Until
+        # the index for a snapshot has been saved, every process that needs
+        # it scans the `links` table itself. During a reindex, up to
+        # AZUL_CONTRIBUTION_CONCURRENCY processes may start out with a cold
+        # cache, and thus scan the same table concurrently, with the cost of
+        # every scan being billed. To avoid that, populate the cache by
+        # indexing a single bundle from each new snapshot first.
+        #
+        'AZUL_TDR_LINEAGE_CACHE': None,
+
         # The number of times a deployment has been destroyed and rebuilt. Some
         # services used by Azul do not support the case of a resource being
         # recreated under the same name as a previous incarnation. The name of
@@ -511,6 +563,78 @@ def env() -> Mapping[str, Optional[str]]:
         'AZUL_CONTRIBUTION_CONCURRENCY': '64',
         'AZUL_AGGREGATION_CONCURRENCY': '64',
 
+        # Set to 1 to enable incremental aggregation. With incremental
+        # aggregation, every aggregate document carries the state of the
+        # accumulators that produced it, so that contributions from bundles
+        # that don't yet contribute to the aggregate can be merged into it
+        # without reading all of the existing contributions again. Deletions,
+        # updates to contributing bundles and accumulators that don't support
+        # it cause the aggregate to be rebuilt from scratch, as does state that
+        # is too large to be stored.
+        #
+        # The mapping of aggregate indices created without this setting does
+        # not include the accumulator state. Existing deployments must be
+        # reindexed after enabling it.
+        #
+        'AZUL_INCREMENTAL_AGGREGATION': '0',
+
+        # The number of bundles listed in a single notification message queued
+        # during a reindex. The contribution Lambda transforms the bundles in
+        # such a message in one invocation, allowing repository plugins to
+        # share work between them. For TDR sources, the links of all bundles,
+        # the upstream bundles needed for stitching and the entities of the
+        # same type are retrieved in shared BigQuery queries. Larger values
+        # amortize more query latency but prolong the invocation and cause the
+        # contributions from all bundles in the message to be retried if any
+        # of them fails. Set to 1 to queue one message per bundle.
+        #
+        'AZUL_REINDEX_BATCH_SIZE': '1',
+
+        # The maximum number of responses to the /index/{entity_type} and
+        # /index/summary endpoints to retain in a cache in the memory of each
+        # service Lambda process. Cached responses are keyed on the catalog,
+        # entity type, filters, pagination and the sources accessible to the
+        # client. The indexer increments a generation counter for a catalog,
+        # stored in DynamoDB, whenever it writes aggregates to that catalog.
+        # Since the generation is part of the key, cached responses never
+        # outlive the aggregates they were derived from. Set to 0 to disable
+        # the cache, along with the maintenance of the generation counters.
+        #
+        'AZUL_RESPONSE_CACHE_SIZE': '0',
+
+        # The maximum number of hits counted by Elasticsearch when computing
+        # the total number of hits for a page of results from the
+        # /index/{entity_type} endpoint, unless the client requests an exact
+        # count via the `exact_total` parameter. The limit only applies to
+        # pages other than the first one, and to unfiltered searches, both of
+        # which typically match many hits. If the limit is exceeded, the
+        # `total` property of the response is a lower bound and its
+        # `totalRelation` property is `gte`.
+        #
+        'AZUL_TOTAL_HITS_LIMIT': '10000',
+
+        # Set to 1 to have the indexer maintain summary rollups, holding the
+        # counts and sums needed by the /index/summary endpoint for the
+        # aggregates of some entity types. The rollups are partitioned by
+        # catalog, entity type, set of sources and entity ID prefix. Every
+        # partition records the contribution of each aggregate in it, so that
+        # updating a partition is idempotent. Summary requests that are
+        # filtered by source only, if at all, are then answered from the
+        # rollups, with only the remaining aggregations left to Elasticsearch.
+        # Enabling this requires a reindex, or rebuilding the rollups with
+        # `scripts/reindex.py --rebuild-rollups`.
+        #
+        'AZUL_SUMMARY_ROLLUPS': '0',
+
+        # The maximum number of slices a compact or curl manifest is split
+        # into. Each slice covers a range of file entity IDs. The slices are
+        # generated concurrently by separate branches of the manifest step
+        # function and then concatenated. Only manifests large enough for every
+        # slice to contain a substantial number of files are sliced. Set to 1
+        # to disable slicing.
+        #
+        'AZUL_MANIFEST_SLICES': '1',
+
         # The name of the S3 bucket where the manifest API stores the downloadable
         # content requested by client.
         #
@@ -227,7 +227,7 @@ spec = {
         # changes and reset the minor version to zero. Otherwise, increment only
         # the minor version for backwards compatible changes. A backwards
         # compatible change is one that does not require updates to clients.
-        'version': '3.2'
+        'version': '3.3'
     },
     'tags': [
         {
@@ -371,7 +371,12 @@ class ServiceApp(AzulChaliceApp):
                     f'search_{before_or_after}': json.dumps(search_key),
                     'sort': self.sort,
                     'order': self.order,
-                    'size': self.size
+                    'size': self.size,
+                    **(
+                        {}
+                        if self.exact_total is None else
+                        {'exact_total': json.dumps(self.exact_total)}
+                    )
                 }
             return furl(url=self.self_url, args=params)
 
@@ -379,6 +384,9 @@ class ServiceApp(AzulChaliceApp):
         default_sorting = self.metadata_plugin.exposed_indices[entity_type]
         params = self.current_request.query_params or {}
         sb, sa = params.get('search_before'), params.get('search_after')
+        exact_total = params.get('exact_total')
+        if exact_total is not None:
+            exact_total = json.loads(exact_total)
         if sb is None:
             if sa is not None:
                 sa = tuple(json.loads(sa))
@@ -393,6 +401,7 @@ class ServiceApp(AzulChaliceApp):
                                    sort=params.get('sort', default_sorting.field_name),
                                    search_before=sb,
                                    search_after=sa,
+                                   exact_total=exact_total,
                                    self_url=self.self_url)
         except RequirementError as e:
             raise ChaliceViewError(repr(e.args))
@@ -570,6 +579,7 @@ def validate_repository_search(entity_type: EntityType,
                                **validators):
     validate_params(params, **{
         'catalog': validate_catalog,
+        'exact_total': validate_exact_total,
         'filters': validate_filters,
         'order': validate_order,
         'search_after': partial(validate_json_param, 'search_after'),
@@ -700,6 +710,13 @@ def validate_order(order: str):
         raise BRE(f'Unknown order `{order}`. Must be one of {supported_orders}')
 
 
+def validate_exact_total(exact_total: str):
+    supported_values = ('true', 'false')
+    if exact_total not in supported_values:
+        raise BRE(f'Invalid value for parameter `exact_total`. '
+                  f'Must be one of {supported_values}')
+
+
 def validate_json_param(name: str, value: str) -> MutableJSON:
     try:
         return json.loads(value)
@@ -1000,6 +1017,19 @@ def repository_search_params_spec():
                 The default value depends on the entity type.
             ''')
         ),
+        params.query(
+            'exact_total',
+            schema.optional(bool),
+            description=fd('''
+                Whether the total number of hits in the `pagination` response
+                element must be exact. If false, the number of hits counted is
+                capped at a limit configured by the server, and the total is a
+                lower bound if the `totalRelation` property of the `pagination`
+                response element is `gte`. If absent, the total is exact for
+                the first page of a filtered search, and capped otherwise.
+                Exact totals are more expensive to compute.
+            ''')
+        ),
         *[
             params.query(
                 param,
@@ -1034,10 +1064,11 @@ def repository_search_spec():
                     entity]({id_spec_link}).
 
                     The `pagination` section describes the total number of hits
-                    and total number of pages, as well as user-supplied search
-                    parameters for page size and sorting behavior. It also
-                    provides links for navigating forwards and backwards between
-                    pages of results.
+                    and total number of pages, whether these are exact or lower
+                    bounds (see the `exact_total` parameter), as well as
+                    user-supplied search parameters for page size and sorting
+                    behavior. It also provides links for navigating forwards and
+                    backwards between pages of results.
 
                     The `termFacets` section tabulates the occurrence of unique
                     values within nested fields of the `hits` section across all
@@ -1141,7 +1172,7 @@ repository_summary_spec = {
     method_spec=repository_id_spec(),
     cors=True
 )
-def repository_search(entity_type: str, entity_id: Optional[str] = None) -> JSON:
+def repository_search(entity_type: str, entity_id: Optional[str] = None) -> Response:
     request = app.current_request
     query_params = request.query_params or {}
     validate_repository_search(entity_type, query_params)
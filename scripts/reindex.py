@@ -91,6 +91,13 @@ parser.add_argument('--deindex',
                          'the specified sources. '
                          'Incompatible with --index, --create, and --delete. '
                          'Do not run while indexing is ongoing.')
+parser.add_argument('--rebuild-rollups',
+                    default=False,
+                    action='store_true',
+                    help='Rebuild the summary rollups of the specified catalogs from '
+                         'the aggregates in the index. '
+                         'Incompatible with --index, --create, --delete and --deindex. '
+                         'Do not run while indexing is ongoing.')
 parser.add_argument('--create',
                     default=False,
                     action='store_true',
@@ -164,6 +171,14 @@ def main(argv: list[str]):
             if sources:
                 azul.deindex(catalog, sources)
 
+    if args.rebuild_rollups:
+        require(not any((args.index, args.delete, args.create, args.deindex)),
+                '--rebuild-rollups is incompatible with --index, --create, '
+                '--delete and --deindex.')
+        for catalog in args.catalogs:
+            azul.rebuild_rollups(catalog)
+        return
+
     azul.reset_indexer(args.catalogs,
                        purge_queues=args.purge,
                        delete_indices=args.delete,
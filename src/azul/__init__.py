@@ -272,6 +272,16 @@ class Config:
     def es_timeout(self) -> int:
         return int(self.environ['AZUL_ES_TIMEOUT'])
 
+    @property
+    def es_pool_size(self) -> int:
+        pool_size = int(self.environ['AZUL_ES_POOL_SIZE'])
+        require(pool_size > 0, 'AZUL_ES_POOL_SIZE must be positive', pool_size)
+        return pool_size
+
+    @property
+    def es_async(self) -> bool:
+        return self._boolean(self.environ['AZUL_ES_ASYNC'])
+
     @property
     def data_browser_domain(self):
         domain = self.domain_name
@@ -392,6 +402,48 @@ class Config:
     def num_tdr_workers(self) -> int:
         return int(self.environ['AZUL_TDR_WORKERS'])
 
+    @property
+    def num_tdr_entity_queries(self) -> int:
+        return int(self.environ['AZUL_TDR_ENTITY_QUERIES'])
+
+    @property
+    def tdr_lineage_cache(self) -> Optional[str]:
+        return self.environ.get('AZUL_TDR_LINEAGE_CACHE')
+
+    @property
+    def tdr_lineage_cache_s3_path(self) -> Optional[str]:
+        """
+        The bucket and the key prefix, ending in a slash unless empty, of the
+        lineage cache, or None if the cache is disabled or isn't in S3.
+
+        >>> from unittest.mock import patch
+        >>> def f(location):
+        ...     with patch.dict(os.environ, AZUL_TDR_LINEAGE_CACHE=location):
+        ...         return config.tdr_lineage_cache_s3_path
+
+        >>> f('s3://foo/bar')
+        'foo/bar/'
+
+        >>> f('s3://foo/bar/')
+        'foo/bar/'
+
+        >>> f('s3://foo')
+        'foo/'
+
+        >>> f('file:///tmp/lineage') is None
+        True
+        """
+        location = self.tdr_lineage_cache
+        if location is None:
+            return None
+        else:
+            url = furl(location)
+            if url.scheme == 's3':
+                prefix = str(url.path).strip('/')
+                return url.netloc + '/' + (prefix + '/' if prefix else '')
+            else:
+                return None
+
     @property
     def external_lambda_role_assumptors(self) -> dict[str, list[str]]:
         try:
@@ -1257,6 +1309,39 @@ class Config:
     def aggregation_concurrency(self, *, retry: bool) -> int:
         return self._concurrency(self.environ['AZUL_AGGREGATION_CONCURRENCY'], retry)
 
+    @property
+    def incremental_aggregation(self) -> bool:
+        return self._boolean(self.environ['AZUL_INCREMENTAL_AGGREGATION'])
+
+    @property
+    def summary_rollups(self) -> bool:
+        return self._boolean(self.environ['AZUL_SUMMARY_ROLLUPS'])
+
+    @property
+    def manifest_slices(self) -> int:
+        num_slices = int(self.environ['AZUL_MANIFEST_SLICES'])
+        # Inline Map states in step functions run at most 40 branches
+        # concurrently
+        require(0 < num_slices <= 40,
+                'AZUL_MANIFEST_SLICES must be between 1 and 40', num_slices)
+        return num_slices
+
+    @property
+    def response_cache_size(self) -> int:
+        return int(self.environ['AZUL_RESPONSE_CACHE_SIZE'])
+
+    @property
+    def total_hits_limit(self) -> int:
+        limit = int(self.environ['AZUL_TOTAL_HITS_LIMIT'])
+        require(limit > 0, 'AZUL_TOTAL_HITS_LIMIT must be positive', limit)
+        return limit
+
+    @property
+    def reindex_batch_size(self) -> int:
+        batch_size = int(self.environ['AZUL_REINDEX_BATCH_SIZE'])
+        require(batch_size > 0, 'AZUL_REINDEX_BATCH_SIZE must be positive', batch_size)
+        return batch_size
+
     @property
     def bigquery_reserved_slots(self) -> int:
         """
@@ -1372,6 +1457,10 @@ class Config:
     def dynamo_sources_cache_table_name(self) -> str:
         return self.qualified_resource_name('sources_cache_by_auth')
 
+    @property
+    def dynamo_generations_table_name(self) -> str:
+        return self.qualified_resource_name('generations')
+
     @property
     def reindex_sources(self) -> list[str]:
         sources = shlex.split(self.environ.get('azul_reindex_sources', '*'))
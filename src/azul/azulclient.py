@@ -3,6 +3,7 @@ from collections import (
 )
 from collections.abc import (
     Iterable,
+    Sequence,
     Set,
 )
 from concurrent.futures import (
@@ -110,6 +111,20 @@ class AzulClient(SignatureHelper):
             'catalog': catalog
         }
 
+    def bundles_message(self,
+                        catalog: CatalogName,
+                        bundle_fqids: Sequence[SourcedBundleFQID]
+                        ) -> JSON:
+        """
+        A message that causes the indexer to transform the given bundles in a
+        single invocation.
+        """
+        return {
+            'action': 'add',
+            'notifications': list(map(self.synthesize_notification, bundle_fqids)),
+            'catalog': catalog
+        }
+
     def reindex_message(self,
                         catalog: CatalogName,
                         source: SourceRef,
@@ -258,13 +273,21 @@ class AzulClient(SignatureHelper):
         log.info('After filtering obsolete versions, '
                  '%i bundles remain in prefix %r of source %r in catalog %r',
                  len(bundle_fqids), prefix, str(source.spec), catalog)
-        messages = (
-            self.bundle_message(catalog, bundle_fqid)
-            for bundle_fqid in bundle_fqids
-        )
+        batch_size = config.reindex_batch_size
+        if batch_size == 1:
+            messages = (
+                self.bundle_message(catalog, bundle_fqid)
+                for bundle_fqid in bundle_fqids
+            )
+        else:
+            messages = (
+                self.bundles_message(catalog, batch)
+                for batch in chunked(bundle_fqids, batch_size)
+            )
         num_messages = self.queue_notifications(messages)
-        log.info('Successfully queued %i notification(s) for prefix %s of '
-                 'source %r', num_messages, prefix, source)
+        log.info('Successfully queued %i notification(s) for %i bundle(s) in '
+                 'prefix %s of source %r',
+                 num_messages, len(bundle_fqids), prefix, source)
 
     def queue_notifications(self, messages: Iterable[JSON]) -> int:
         num_messages = 0
@@ -432,6 +455,10 @@ class AzulClient(SignatureHelper):
                           'inconsistent state.')
             raise RuntimeError('Failures during deletion', response['failures'])
 
+    def rebuild_rollups(self, catalog: CatalogName):
+        log.info('Rebuilding summary rollups of catalog %r', catalog)
+        self.index_service.rebuild_rollups(catalog)
+
     @cached_property
     def queues(self):
         return Queues()
@@ -1,4 +1,16 @@
+from abc import (
+    ABCMeta,
+    abstractmethod,
+)
+import asyncio
+import datetime
+import hashlib
+import hmac
 import logging
+from threading import (
+    Lock,
+    local,
+)
 from typing import (
     Any,
     Collection,
@@ -11,15 +23,25 @@ from urllib.parse import (
     urlencode,
 )
 
+import attr
+from aws_requests_auth import (
+    aws_auth,
+)
 from aws_requests_auth.boto_utils import (
     BotoAWSRequestsAuth,
 )
 from elasticsearch import (
+    AIOHttpConnection,
+    AsyncElasticsearch,
     Connection,
     Elasticsearch,
     RequestsHttpConnection,
     Urllib3HttpConnection,
 )
+import requests
+from requests.adapters import (
+    HTTPAdapter,
+)
 
 from azul import (
     config,
@@ -37,6 +59,13 @@ log = logging.getLogger(__name__)
 
 
 class CachedBotoAWSRequestsAuth(BotoAWSRequestsAuth):
+    """
+    Signs requests like its base class, but memoizes the SigV4 signing key.
+    The base class derives the key from the secret access key using four HMAC
+    operations for every request it signs. The derived key only depends on
+    the secret, the date, the region and the service, so it only changes once
+    a day or whenever the credentials are refreshed.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -46,8 +75,88 @@ class CachedBotoAWSRequestsAuth(BotoAWSRequestsAuth):
         # noinspection PyProtectedMember
         self._refreshable_credentials = aws.boto3_session.get_credentials()
 
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _signing_key(secret_key: str,
+                     date_stamp: str,
+                     region: str,
+                     service: str
+                     ) -> bytes:
+        return aws_auth.getSignatureKey(secret_key, date_stamp, region, service)
+
+    # Equivalent to the overridden method, except for the memoized signing key.
+    # The overridden method invokes the key derivation by its global name,
+    # leaving no other way to intercept it short of patching the library.
+
+    def get_aws_request_headers(self,
+                                r: requests.PreparedRequest,
+                                aws_access_key: str,
+                                aws_secret_access_key: str,
+                                aws_token: Optional[str]
+                                ) -> dict[str, str]:
+        now = datetime.datetime.utcnow()
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        date_stamp = now.strftime('%Y%m%d')
+        canonical_headers = f'host:{self.aws_host}\nx-amz-date:{amz_date}\n'
+        signed_headers = 'host;x-amz-date'
+        if aws_token:
+            canonical_headers += f'x-amz-security-token:{aws_token}\n'
+            signed_headers += ';x-amz-security-token'
+        body = r.body or b''
+        if isinstance(body, str):
+            body = body.encode()
+        payload_hash = hashlib.sha256(body).hexdigest()
+        canonical_request = '\n'.join([
+            r.method,
+            self.get_canonical_path(r),
+            self.get_canonical_querystring(r),
+            canonical_headers,
+            signed_headers,
+            payload_hash
+        ])
+        algorithm = 'AWS4-HMAC-SHA256'
+        credential_scope = f'{date_stamp}/{self.aws_region}/{self.service}/aws4_request'
+        string_to_sign = '\n'.join([
+            algorithm,
+            amz_date,
+            credential_scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+        signing_key = self._signing_key(aws_secret_access_key,
+                                        date_stamp,
+                                        self.aws_region,
+                                        self.service)
+        signature = hmac.new(signing_key,
+                             string_to_sign.encode(),
+                             hashlib.sha256).hexdigest()
+        headers = {
+            'Authorization': f'{algorithm} '
+                             f'Credential={aws_access_key}/{credential_scope}, '
+                             f'SignedHeaders={signed_headers}, '
+                             f'Signature={signature}',
+            'x-amz-date': amz_date,
+            'x-amz-content-sha256': payload_hash
+        }
+        if aws_token:
+            headers['X-Amz-Security-Token'] = aws_token
+        return headers
+
+
+@attr.s(auto_attribs=True, kw_only=True)
+class ConnectionPoolStats:
+    #: The number of requests made via the pool
+    requests: int = 0
+
+    #: The number of requests that had to wait for a connection to be returned
+    #: to the pool because all of its connections were in use
+    waits: int = 0
+
+    #: The number of connections opened by the pool. Once the pool is warmed
+    #: up, this should only increase when a server closes an idle connection.
+    new_connections: int = 0
 
-class AzulConnection(Connection):
+
+class AzulConnection(Connection, metaclass=ABCMeta):
     """
     Improves the request logging by the Elasticsearch client library with
     respect to performance and utility. Most importantly, this class logs a
@@ -56,8 +165,20 @@ class AzulConnection(Connection):
     level the complete body is logged. Also eliminates expensive decoding at
     INFO level by logging the request body as a raw ``bytes`` literal. At DEBUG
     level, the *decoded* (and complete) body is logged as a string literal.
+
+    Additionally, this class limits the size of the pool of keep-alive
+    connections to the host and tracks the usage of that pool. Requests in
+    excess of the pool size wait for a connection to become available instead
+    of opening a connection that would be discarded afterwards.
     """
 
+    def __init__(self, *, pool_size: int, **kwargs):
+        super().__init__(**kwargs)
+        self.pool_size = pool_size
+        self.pool_stats = ConnectionPoolStats()
+        self._pool_lock = Lock()
+        self._in_flight = 0
+
     def perform_request(self,
                         method: str,
                         url: str,
@@ -68,7 +189,45 @@ class AzulConnection(Connection):
                         headers: Optional[Mapping[str, str]] = None
                         ) -> Tuple[int, Mapping[str, str], str]:
         self._log_request(method, self._full_url(url, params), headers, body)
-        return super().perform_request(method, url, params, body, timeout, ignore, headers)
+        with self._pool_lock:
+            waited = self._in_flight >= self.pool_size
+            self._in_flight += 1
+        try:
+            return super().perform_request(method, url, params, body, timeout, ignore, headers)
+        finally:
+            num_connections = self._num_connections()
+            with self._pool_lock:
+                self._in_flight -= 1
+                stats = self.pool_stats
+                stats.requests += 1
+                stats.waits += waited
+                new_connections = num_connections - stats.new_connections
+                stats.new_connections = num_connections
+                stats = attr.evolve(stats)
+            self._log_pool_stats(stats, waited, new_connections)
+
+    @abstractmethod
+    def _num_connections(self) -> int:
+        """
+        The number of connections opened by the underlying pool so far
+        """
+        raise NotImplementedError
+
+    def _log_pool_stats(self,
+                        stats: ConnectionPoolStats,
+                        waited: bool,
+                        new_connections: int
+                        ) -> None:
+        # Only a cold pool or one that is too small for the workload should
+        # produce these at INFO level
+        log_level = logging.INFO if waited or new_connections else logging.DEBUG
+        es_log.log(log_level,
+                   '%s for a pooled connection to %s and opened %i new '
+                   'connection(s), pool of size %i made %i request(s) with '
+                   '%i wait(s) and %i connection(s) so far',
+                   'Waited' if waited else 'Did not wait', self.host,
+                   new_connections, self.pool_size, stats.requests,
+                   stats.waits, stats.new_connections)
 
     def log_request_success(self,
                             method: str,
@@ -138,11 +297,101 @@ class AzulConnection(Connection):
 
 
 class AzulRequestsHttpConnection(AzulConnection, RequestsHttpConnection):
-    pass
+
+    def __init__(self, *, pool_size: int, **kwargs):
+        super().__init__(pool_size=pool_size, **kwargs)
+        # The default adapter of a `requests` session doesn't block when its
+        # pool is exhausted and only retains ten connections per host
+        self._adapter = HTTPAdapter(pool_connections=1,
+                                    pool_maxsize=pool_size,
+                                    pool_block=True)
+        self.session.mount(self.base_url, self._adapter)
+
+    def _num_connections(self) -> int:
+        pool = self._adapter.poolmanager.connection_from_url(self.base_url)
+        return pool.num_connections
 
 
 class AzulUrllib3HttpConnection(AzulConnection, Urllib3HttpConnection):
-    pass
+
+    def __init__(self, *, pool_size: int, **kwargs):
+        super().__init__(pool_size=pool_size, maxsize=pool_size, **kwargs)
+        self.pool.block = True
+
+    def _num_connections(self) -> int:
+        return self.pool.num_connections
+
+
+class AzulAIOHttpConnection(AIOHttpConnection):
+    """
+    An asynchronous connection that optionally signs each request with AWS
+    credentials, which the connection class of the asynchronous client library
+    can't do by itself.
+    """
+
+    def __init__(self,
+                 *,
+                 pool_size: int,
+                 aws_auth: Optional[BotoAWSRequestsAuth] = None,
+                 **kwargs):
+        super().__init__(maxsize=pool_size, **kwargs)
+        self.aws_auth = aws_auth
+
+    async def perform_request(self,
+                              method: str,
+                              url: str,
+                              params: Optional[Mapping[str, Any]] = None,
+                              body: Optional[bytes] = None,
+                              timeout: Optional[Union[int, float]] = None,
+                              ignore: Collection[int] = (),
+                              headers: Optional[Mapping[str, str]] = None
+                              ) -> Tuple[int, Mapping[str, str], str]:
+        if self.aws_auth is not None:
+            # The base class builds the URL the same way
+            full_url = self.host + self.url_prefix + url
+            if params:
+                full_url += '?' + urlencode(params)
+            # The base class sends a HEAD request as a GET request, working
+            # around https://github.com/aio-libs/aiohttp/issues/1769, so the
+            # signature must cover the method actually sent
+            signed_method = 'GET' if method == 'HEAD' else method
+            request = requests.Request(method=signed_method,
+                                       url=full_url,
+                                       data=body,
+                                       headers=headers)
+            request = self.aws_auth(request.prepare())
+            headers = dict(request.headers)
+        return await super().perform_request(method,
+                                             url,
+                                             params=params,
+                                             body=body,
+                                             timeout=timeout,
+                                             ignore=ignore,
+                                             headers=headers)
+
+
+_event_loops = local()
+
+#: The asynchronous client of the current thread, along with the configuration
+#: it was created with, see :meth:`ESClientFactory.get_async`
+#:
+_async_clients = local()
+
+
+def event_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop of the current thread for running requests with the
+    asynchronous Elasticsearch client. The loop is kept for the lifetime of the
+    thread because the client, and the pool of keep-alive connections it
+    maintains, is bound to the loop that was running when the client was
+    created.
+    """
+    try:
+        loop = _event_loops.loop
+    except AttributeError:
+        loop = asyncio.new_event_loop()
+        _event_loops.loop = loop
+    return loop
 
 
 class ESClientFactory:
@@ -150,11 +399,14 @@ class ESClientFactory:
     @classmethod
     def get(cls) -> Elasticsearch:
         host, port = aws.es_endpoint
-        return cls._create_client(host, port, config.es_timeout)
+        return cls._create_client(host, port, config.es_timeout, config.es_pool_size)
 
+    # Caching the client also retains its pools of keep-alive connections
+    # between invocations of a Lambda function in the same process
+    #
     @classmethod
     @lru_cache(maxsize=32)
-    def _create_client(cls, host, port, timeout):
+    def _create_client(cls, host, port, timeout, pool_size):
         log.debug(f'Creating ES client [{host}:{port}]')
         # Implicit retries don't make much sense in conjunction with optimistic
         # locking (versioning). Consider a write request that times out in ELB
@@ -165,7 +417,8 @@ class ESClientFactory:
         # error handling, we disable the implicit retries via max_retries=0.
         common_params = dict(hosts=[dict(host=host, port=port)],
                              timeout=timeout,
-                             max_retries=0)
+                             max_retries=0,
+                             pool_size=pool_size)
         if host.endswith('.amazonaws.com'):
             aws_auth = CachedBotoAWSRequestsAuth(aws_host=host,
                                                  aws_region=aws.region_name,
@@ -178,3 +431,48 @@ class ESClientFactory:
         else:
             return Elasticsearch(connection_class=AzulUrllib3HttpConnection,
                                  **common_params)
+
+    @classmethod
+    async def get_async(cls) -> AsyncElasticsearch:
+        """
+        Return the asynchronous client for use with the event loop of the
+        current thread, see :func:`event_loop`. There is at most one such
+        client per thread. If the configuration changed since the client was
+        created, the client is replaced and closed.
+        """
+        loop = asyncio.get_running_loop()
+        assert loop is event_loop(), 'Not running on the event loop of this thread'
+        host, port = aws.es_endpoint
+        key = host, port, config.es_timeout, config.es_pool_size
+        old_key, old_client = getattr(_async_clients, 'client', (None, None))
+        if old_key == key:
+            return old_client
+        else:
+            # Replace the client before yielding to other coroutines
+            client = cls._create_async_client(*key, loop)
+            _async_clients.client = key, client
+            if old_client is not None:
+                log.debug('Closing asynchronous ES client [%s:%s]', *old_key[:2])
+                await old_client.close()
+            return client
+
+    @classmethod
+    def _create_async_client(cls, host, port, timeout, pool_size, loop):
+        log.debug(f'Creating asynchronous ES client [{host}:{port}]')
+        # See the synchronous client for why retries are disabled
+        common_params = dict(hosts=[dict(host=host, port=port)],
+                             timeout=timeout,
+                             max_retries=0,
+                             pool_size=pool_size,
+                             loop=loop,
+                             connection_class=AzulAIOHttpConnection)
+        if host.endswith('.amazonaws.com'):
+            aws_auth = CachedBotoAWSRequestsAuth(aws_host=host,
+                                                 aws_region=aws.region_name,
+                                                 aws_service='es')
+            return AsyncElasticsearch(aws_auth=aws_auth,
+                                      use_ssl=True,
+                                      verify_certs=True,
+                                      **common_params)
+        else:
+            return AsyncElasticsearch(**common_params)
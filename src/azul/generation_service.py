@@ -0,0 +1,102 @@
+import time
+
+import attr
+
+from azul import (
+    CatalogName,
+    config,
+)
+from azul.deployment import (
+    aws,
+)
+
+
+@attr.s(frozen=True, auto_attribs=True, kw_only=True)
+class Generation:
+    """
+    The generation of the aggregate documents in a catalog. The generation
+    number is incremented every time aggregates in the catalog are written or
+    deleted, so any result derived from the aggregates is obsolete once the
+    number changes.
+    """
+    number: int
+
+    #: The time of the most recent increment, in seconds since the epoch
+    modified: float
+
+    def is_settled(self, now: float) -> bool:
+        """
+        True, if every aggregate written before the most recent increment is
+        visible to searches. Elasticsearch makes writes visible after the next
+        refresh of the index. Results from searches made before then may not
+        reflect the writes and must not be associated with this generation.
+
+        >>> g = Generation(number=1, modified=100.0)
+        >>> g.is_settled(101.0)
+        False
+        >>> g.is_settled(103.0)
+        True
+        """
+        # Allow for some clock skew between the indexer and service Lambdas
+        margin = 1
+        return now - self.modified > config.es_refresh_interval + margin
+
+
+class GenerationService:
+    """
+    Tracks the generation of the aggregate documents in each catalog in a
+    DynamoDB table. The indexer increments the generation after writing
+    aggregates, the service uses it to invalidate cached responses.
+    """
+    table_name = config.dynamo_generations_table_name
+
+    key_attribute = 'catalog'
+    number_attribute = 'generation'
+    modified_attribute = 'modified'
+
+    @property
+    def _dynamodb(self):
+        return aws.dynamodb
+
+    def get(self, catalog: CatalogName) -> Generation:
+        """
+        Strongly consistent read of the current generation of the given
+        catalog. The generation of a catalog that was never incremented is 0.
+        """
+        response = self._dynamodb.get_item(TableName=self.table_name,
+                                           Key={self.key_attribute: {'S': catalog}},
+                                           ProjectionExpression=','.join([
+                                               self.number_attribute,
+                                               self.modified_attribute
+                                           ]),
+                                           ConsistentRead=True)
+        try:
+            item = response['Item']
+        except KeyError:
+            return Generation(number=0, modified=0.0)
+        else:
+            return Generation(number=int(item[self.number_attribute]['N']),
+                              modified=float(item[self.modified_attribute]['N']))
+
+    def increment(self, catalog: CatalogName) -> Generation:
+        """
+        Atomically increment the generation of the given catalog and return
+        the new generation.
+        """
+        response = self._dynamodb.update_item(
+            TableName=self.table_name,
+            Key={self.key_attribute: {'S': catalog}},
+            UpdateExpression='ADD #number :one SET #modified = :now',
+            ExpressionAttributeNames={
+                '#number': self.number_attribute,
+                '#modified': self.modified_attribute
+            },
+            ExpressionAttributeValues={
+                ':one': {'N': '1'},
+                ':now': {'N': repr(time.time())}
+            },
+            ReturnValues='ALL_NEW'
+        )
+        item = response['Attributes']
+        return Generation(number=int(item[self.number_attribute]['N']),
+                          modified=float(item[self.modified_attribute]['N']))
@@ -24,6 +24,7 @@ from azul.json_freeze import (
     thaw,
 )
 from azul.types import (
+    AnyJSON,
     JSON,
     JSONs,
 )
@@ -53,6 +54,24 @@ class Accumulator(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def get_state(self) -> AnyJSON:
+        """
+        Return a JSON representation of the internal state of this accumulator
+        that, when passed to :meth:`set_state` of a fresh instance configured
+        the same way as this one, allows for resuming the accumulation. This
+        is used for incremental aggregation. Accumulators that don't support
+        it raise NotImplementedError, forcing the aggregation to be rebuilt
+        from scratch.
+        """
+        raise NotImplementedError
+
+    def set_state(self, state: AnyJSON) -> None:
+        """
+        Restore the internal state of this accumulator from a value returned by
+        :meth:`get_state`.
+        """
+        raise NotImplementedError
+
 
 class SumAccumulator(Accumulator):
     """
@@ -82,6 +101,12 @@ class SumAccumulator(Accumulator):
     def get(self):
         return self.value
 
+    def get_state(self) -> AnyJSON:
+        return self.value
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value = state
+
 
 class SetAccumulator(Accumulator):
     """
@@ -130,6 +155,12 @@ class SetAccumulator(Accumulator):
     def get(self) -> list[Any]:
         return sorted(self.value, key=self.key)
 
+    def get_state(self) -> AnyJSON:
+        return thaw(sorted(self.value, key=self.key))
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value = set(map(freeze, state))
+
 
 class ListAccumulator(Accumulator):
     """
@@ -152,6 +183,12 @@ class ListAccumulator(Accumulator):
     def get(self) -> list[Any]:
         return sorted(self.value)
 
+    def get_state(self) -> AnyJSON:
+        return thaw(self.value)
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value = list(state)
+
 
 class SetOfDictAccumulator(SetAccumulator):
     """
@@ -198,6 +235,12 @@ class DictAccumulator(Accumulator):
     def get(self):
         return sorted(self.value.values(), key=self.key)
 
+    def get_state(self) -> AnyJSON:
+        return thaw(self.get())
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value = {self.key(value): value for value in state}
+
 
 class FrequencySetAccumulator(Accumulator):
     """
@@ -230,6 +273,12 @@ class FrequencySetAccumulator(Accumulator):
     def get(self) -> list[Any]:
         return [item for item, count in self.value.most_common(self.max_size)]
 
+    def get_state(self) -> AnyJSON:
+        return [[thaw(item), count] for item, count in self.value.most_common()]
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value = Counter({freeze(item): count for item, count in state})
+
 
 class LastValueAccumulator(Accumulator):
     """
@@ -247,6 +296,12 @@ class LastValueAccumulator(Accumulator):
     def get(self):
         return self.value
 
+    def get_state(self) -> AnyJSON:
+        return thaw(self.value)
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value = state
+
 
 class SingleValueAccumulator(LastValueAccumulator):
     """
@@ -307,6 +362,14 @@ class PriorityOptionalValueAccumulator(OptionalValueAccumulator):
         if self.priority == priority:
             super().accumulate(value)
 
+    def get_state(self) -> AnyJSON:
+        return [thaw(self.priority), super().get_state()]
+
+    def set_state(self, state: AnyJSON) -> None:
+        priority, value = state
+        self.priority = freeze(priority)
+        super().set_state(value)
+
 
 class MinAccumulator(LastValueAccumulator):
     """
@@ -365,6 +428,16 @@ class DistinctAccumulator(Accumulator):
     def get(self):
         return self.value.get()
 
+    def get_state(self) -> AnyJSON:
+        return {
+            'keys': self.keys.get_state(),
+            'value': self.value.get_state()
+        }
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.keys.set_state(state['keys'])
+        self.value.set_state(state['value'])
+
 
 class UniqueValueCountAccumulator(Accumulator):
     """
@@ -385,6 +458,12 @@ class UniqueValueCountAccumulator(Accumulator):
         unique_items = self.value.get()
         return len(unique_items)
 
+    def get_state(self) -> AnyJSON:
+        return self.value.get_state()
+
+    def set_state(self, state: AnyJSON) -> None:
+        self.value.set_state(state)
+
 
 class EntityAggregator(metaclass=ABCMeta):
 
@@ -405,6 +484,29 @@ class EntityAggregator(metaclass=ABCMeta):
     def aggregate(self, entities: Entities) -> Entities:
         raise NotImplementedError
 
+    def resume(self,
+               state: Optional[AnyJSON],
+               entities: Entities
+               ) -> tuple[Entities, Optional[AnyJSON]]:
+        """
+        Same as :meth:`aggregate` but resume the aggregation from the given
+        state instead of starting from scratch. Return the aggregated entities
+        and the updated state, or None instead of the updated state if the
+        aggregation cannot be resumed later, because one or more accumulators
+        don't support it.
+
+        :param state: None to start from scratch or the state returned by a
+                      previous invocation of this method.
+
+        :param entities: the entities to aggregate in addition to those
+                         represented by the given state
+        """
+        assert state is None, state
+        return self.aggregate(entities), None
+
+
+AccumulatorsByField = dict[str, Optional[Accumulator]]
+
 
 class SimpleAggregator(EntityAggregator):
 
@@ -412,16 +514,55 @@ class SimpleAggregator(EntityAggregator):
         aggregate = {}
         for entity in entities:
             self._accumulate(aggregate, entity)
-        return [
-            {
-                k: accumulator.get()
-                for k, accumulator in aggregate.items()
-                if accumulator is not None
+        return self._get(aggregate)
+
+    def resume(self,
+               state: Optional[AnyJSON],
+               entities: Entities
+               ) -> tuple[Entities, Optional[AnyJSON]]:
+        """
+        >>> a = SimpleAggregator()
+        >>> a.resume(None, [{'x': 1}, {'x': 2}])
+        ([{'x': [1, 2]}], {'x': [1, 2]})
+
+        >>> a.resume({'x': [1, 2]}, [{'x': 3}, {'x': 1}])
+        ([{'x': [1, 2, 3]}], {'x': [1, 2, 3]})
+        """
+        aggregate = {} if state is None else self._set_state(state)
+        for entity in entities:
+            self._accumulate(aggregate, entity)
+        return self._get(aggregate), self._get_state(aggregate)
+
+    def _get(self, aggregate: AccumulatorsByField) -> Entities:
+        return [self._get_entity(aggregate)] if aggregate else []
+
+    def _get_entity(self, aggregate: AccumulatorsByField) -> JSON:
+        return {
+            k: accumulator.get()
+            for k, accumulator in aggregate.items()
+            if accumulator is not None
+        }
+
+    def _get_state(self, aggregate: AccumulatorsByField) -> Optional[JSON]:
+        try:
+            return {
+                field: None if accumulator is None else accumulator.get_state()
+                for field, accumulator in aggregate.items()
             }
-        ] if aggregate else []
+        except NotImplementedError:
+            return None
+
+    def _set_state(self, state: JSON) -> AccumulatorsByField:
+        aggregate = {}
+        for field, accumulator_state in state.items():
+            accumulator = self._accumulator(field)
+            if accumulator is not None:
+                accumulator.set_state(accumulator_state)
+            aggregate[field] = accumulator
+        return aggregate
 
     def _accumulate(self,
-                    aggregate: dict[str, Optional[Accumulator]],
+                    aggregate: AccumulatorsByField,
                     entity: JSON
                     ):
         entity = self._transform_entity(entity)
@@ -438,19 +579,52 @@ class SimpleAggregator(EntityAggregator):
 class GroupingAggregator(SimpleAggregator):
 
     def aggregate(self, entities: Entities) -> Entities:
-        aggregates: dict[Any, dict[str, Optional[Accumulator]]] = defaultdict(dict)
+        aggregates: dict[Any, AccumulatorsByField] = defaultdict(dict)
         for entity in entities:
             group_keys = self._group_keys(entity)
             aggregate = aggregates[group_keys]
             self._accumulate(aggregate, entity)
-        return [
-            {
-                field: accumulator.get()
-                for field, accumulator in aggregate.items()
-                if accumulator is not None
-            }
-            for aggregate in aggregates.values()
-        ]
+        return list(map(self._get_entity, aggregates.values()))
+
+    def resume(self,
+               state: Optional[AnyJSON],
+               entities: Entities
+               ) -> tuple[Entities, Optional[AnyJSON]]:
+        # The group keys can't be represented in JSON directly so we use their
+        # encoded form as the key, both for the restored groups and the new ones
+        aggregates: dict[Any, AccumulatorsByField] = {}
+        if state is not None:
+            for group_keys, group_state in state:
+                aggregates[freeze(group_keys)] = self._set_state(group_state)
+        for entity in entities:
+            group_keys = freeze(self._encode_group_keys(self._group_keys(entity)))
+            aggregate = aggregates.setdefault(group_keys, {})
+            self._accumulate(aggregate, entity)
+        entities = list(map(self._get_entity, aggregates.values()))
+        state = []
+        for group_keys, aggregate in aggregates.items():
+            group_state = self._get_state(aggregate)
+            if group_state is None:
+                return entities, None
+            state.append([thaw(group_keys), group_state])
+        return entities, state
+
+    @classmethod
+    def _encode_group_keys(cls, group_keys: Any) -> AnyJSON:
+        """
+        Convert the return value of :meth:`_group_keys` to JSON. Sets are
+        converted to sorted lists.
+
+        >>> GroupingAggregator._encode_group_keys((frozenset(['b', 'a']), 'x', None, True))
+        [['a', 'b'], 'x', None, True]
+        """
+        if isinstance(group_keys, (set, frozenset)):
+            return sorted(map(cls._encode_group_keys, group_keys),
+                          key=none_safe_key(none_last=True))
+        elif isinstance(group_keys, (tuple, list)):
+            return list(map(cls._encode_group_keys, group_keys))
+        else:
+            return group_keys
 
     @abstractmethod
     def _group_keys(self, entity) -> tuple[Any, ...]:
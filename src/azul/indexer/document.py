@@ -3,6 +3,7 @@ from abc import (
     abstractmethod,
 )
 from collections.abc import (
+    Callable,
     Mapping,
 )
 from datetime import (
@@ -100,6 +101,7 @@ E = TypeVar('E', bound=EntityReference)
 class DocumentType(Enum):
     contribution = 'contribution'
     aggregate = 'aggregate'
+    rollup = 'rollup'
 
     def __repr__(self) -> str:
         return f'<{self.__class__.__name__}.{self._name_}>'
@@ -130,7 +132,8 @@ class IndexName:
     #: The type of entities this index contains metadata about
     entity_type: str
 
-    #: Whether the documents in the index are contributions or aggregates
+    #: Whether the documents in the index are contributions, aggregates or
+    #: summary rollups
     doc_type: DocumentType = DocumentType.contribution
 
     index_name_version_re: ClassVar[re.Pattern] = re.compile(r'v(\d+)')
@@ -337,6 +340,14 @@ class IndexName:
                   entity_type='foo_bar',
                   doc_type=<DocumentType.aggregate>)
 
+        >>> IndexName.parse('azul_v2_staging_hca_foo_bar_rollup') # doctest: +NORMALIZE_WHITESPACE
+        IndexName(prefix='azul',
+                  version=2,
+                  deployment='staging',
+                  catalog='hca',
+                  entity_type='foo_bar',
+                  doc_type=<DocumentType.rollup>)
+
         >>> IndexName.parse('azul_v2_staging__foo_bar__aggregate') # doctest: +ELLIPSIS
         Traceback (most recent call last):
             ...
@@ -361,9 +372,9 @@ class IndexName:
             version = 1
             catalog = None
             *index_name, deployment = index_name
-        if index_name[-1] == 'aggregate':
-            *index_name, _ = index_name
-            doc_type = DocumentType.aggregate
+        if index_name[-1] in ('aggregate', 'rollup'):
+            *index_name, doc_type = index_name
+            doc_type = DocumentType(doc_type)
         else:
             doc_type = DocumentType.contribution
         entity_type = '_'.join(index_name)
@@ -416,14 +427,21 @@ class IndexName:
         ...               entity_type='foo_bar',
         ...               doc_type=DocumentType.aggregate))
         'azul_v2_staging_hca_foo_bar_aggregate'
+
+        >>> str(IndexName(version=2,
+        ...               deployment='staging',
+        ...               catalog='hca',
+        ...               entity_type='foo_bar',
+        ...               doc_type=DocumentType.rollup))
+        'azul_v2_staging_hca_foo_bar_rollup'
         """
-        aggregate = ['aggregate'] if self.doc_type is DocumentType.aggregate else []
+        suffix = [] if self.doc_type is DocumentType.contribution else [self.doc_type.value]
         if self.version == 1:
             require(self.catalog is None)
             return '_'.join([
                 self.prefix,
                 self.entity_type,
-                *aggregate,
+                *suffix,
                 self.deployment
             ])
         elif self.version == 2:
@@ -434,7 +452,7 @@ class IndexName:
                 self.deployment,
                 self.catalog,
                 self.entity_type,
-                *aggregate,
+                *suffix,
             ])
         else:
             assert False, self.version
@@ -1026,6 +1044,9 @@ FieldTypes1 = Union[Mapping[str, FieldTypes2], Sequence[FieldType], FieldType]
 FieldTypes = Mapping[str, FieldTypes1]
 CataloguedFieldTypes = Mapping[CatalogName, FieldTypes]
 
+# A function that translates a document, compiled from a FieldTypes tree
+Translator = Callable[[AnyJSON], AnyMutableJSON]
+
 
 class VersionType(Enum):
     # No versioning; document is created or overwritten as needed
@@ -1049,6 +1070,15 @@ C = TypeVar('C', bound=DocumentCoordinates)
 class Document(Generic[C]):
     needs_seq_no_primary_term: ClassVar[bool] = False
 
+    # Compiled translators, keyed by the identity of the field types tree they
+    # were compiled from, among other things. The tree is kept alive alongside
+    # the translator so that its identity can't be reused by another tree.
+    #
+    _translators: ClassVar[dict[tuple[CatalogName, Type['Document'], bool, bool, int],
+                                tuple[FieldTypes, Translator]]] = {}
+
+    _max_translators: ClassVar[int] = 64
+
     coordinates: C
     version_type: VersionType = VersionType.none
 
@@ -1163,6 +1193,243 @@ class Document(Generic[C]):
                 else:
                     return field_type.from_index(doc)
 
+    @classmethod
+    def translator(cls,
+                   catalog: CatalogName,
+                   field_types: FieldTypes,
+                   *,
+                   forward: bool,
+                   in_place: bool = False
+                   ) -> Translator:
+        """
+        Return a function that is equivalent to :meth:`translate_fields` with
+        the given field types, but that is compiled from the field types up
+        front, so that the type of each node in the field types tree doesn't
+        need to be determined again for every document being translated.
+
+        :param in_place: If True, return a translator that modifies the given
+                         document instead of translating it into a copy. Such
+                         a translator only visits the fields whose values need
+                         to be translated, skipping those with pass-through
+                         types, and doesn't reject fields missing from the
+                         given field types. Only reverse translation can be
+                         done in place.
+
+        Translators are cached per catalog, document class, direction and
+        field types tree. A cached translator is only reused if it was compiled
+        from the very same tree, so callers should avoid recreating the tree.
+        Translators compiled from different trees, like those of the various
+        long-lived services, are cached side by side.
+
+        >>> field_types = {'a': null_int, 'b': [null_str], 'c': {'d': null_bool}}
+        >>> t = Document.translator('foo', field_types, forward=True)
+        >>> t({'a': None, 'b': [], 'c': [{'d': True}]})
+        {'a': 9223372036854774784, 'a_': None, 'b': ['~null'], 'c': [{'d': 1}]}
+
+        >>> t is Document.translator('foo', field_types, forward=True)
+        True
+
+        >>> other_field_types = dict(field_types)
+        >>> t is Document.translator('foo', other_field_types, forward=True)
+        False
+
+        >>> t is Document.translator('foo', field_types, forward=True)
+        True
+
+        >>> t = Document.translator('foo', field_types, forward=False)
+        >>> t({'a': 9223372036854774784, 'a_': None, 'b': ['~null']})
+        {'a': None, 'b': [None]}
+
+        >>> t({'x': 1})
+        Traceback (most recent call last):
+        ...
+        KeyError: "Key 'x' not defined in field_types"
+
+        >>> t = Document.translator('foo', field_types, forward=False, in_place=True)
+        >>> doc = {'a': 9223372036854774784, 'a_': None, 'b': ['~null'], 'x': 1}
+        >>> t(doc) is doc, doc
+        (True, {'a': None, 'b': [None], 'x': 1})
+
+        >>> Document.translator('foo', field_types, forward=True, in_place=True)
+        Traceback (most recent call last):
+        ...
+        AssertionError: Only reverse translation can be done in place
+        """
+        assert not (forward and in_place), 'Only reverse translation can be done in place'
+        key = catalog, cls, forward, in_place, id(field_types)
+        try:
+            compiled_field_types, translator = cls._translators[key]
+        except KeyError:
+            pass
+        else:
+            assert compiled_field_types is field_types
+            return translator
+        if in_place:
+            translator = cls._compile_in_place_translator(field_types, path=())
+            if translator is None:
+                def translator(doc: AnyJSON) -> AnyMutableJSON:
+                    return doc
+        else:
+            translator = cls._compile_translator(field_types, forward=forward, path=())
+        if len(cls._translators) >= cls._max_translators:
+            # Evict the least recently compiled translator
+            cls._translators.pop(next(iter(cls._translators)), None)
+        cls._translators[key] = field_types, translator
+        return translator
+
+    @classmethod
+    def _compile_in_place_translator(cls,
+                                     field_types: Union[FieldType, FieldTypes],
+                                     *,
+                                     path: tuple[str, ...]
+                                     ) -> Optional[Translator]:
+        """
+        Compile a reverse translator that modifies the documents it is given,
+        or return None if documents with the given field types don't need to
+        be modified at all.
+        """
+        if isinstance(field_types, dict):
+            translators = {}
+            shadow_keys = []
+            for key, field_type in field_types.items():
+                if key.endswith('_'):
+                    continue
+                translator = cls._compile_in_place_translator(field_type,
+                                                              path=(*path, key))
+                if translator is not None:
+                    translators[key] = translator
+                if isinstance(field_type, FieldType) and field_type.shadowed:
+                    shadow_keys.append(key + '_')
+            if not translators and not shadow_keys:
+                return None
+
+            def translate(doc: AnyJSON) -> AnyMutableJSON:
+                if isinstance(doc, dict):
+                    for key, translator in translators.items():
+                        try:
+                            val = doc[key]
+                        except KeyError:
+                            pass
+                        else:
+                            doc[key] = translator(val)
+                    for key in shadow_keys:
+                        doc.pop(key, None)
+                    return doc
+                elif isinstance(doc, list):
+                    for item in doc:
+                        translate(item)
+                    return doc
+                else:
+                    assert False, (path, type(doc))
+
+            return translate
+        else:
+            is_list = isinstance(field_types, list)
+            field_type = one(field_types) if is_list else field_types
+            if not isinstance(field_type, FieldType):
+                def translate(_doc: AnyJSON) -> AnyMutableJSON:
+                    assert False, (path, type(field_type))
+
+                return translate
+
+            if type(field_type).from_index is PassThrough.from_index:
+                return None
+
+            from_index = field_type.from_index
+
+            def translate(doc: AnyJSON) -> AnyMutableJSON:
+                if isinstance(doc, list):
+                    doc[:] = map(from_index, doc)
+                    return doc
+                else:
+                    assert not is_list, (doc, path)
+                    return from_index(doc)
+
+            return translate
+
+    @classmethod
+    def _compile_translator(cls,
+                            field_types: Union[FieldType, FieldTypes],
+                            *,
+                            forward: bool,
+                            path: tuple[str, ...]
+                            ) -> Translator:
+        if isinstance(field_types, dict):
+            translators = {}
+            for key, field_type in field_types.items():
+                if key.endswith('_'):
+                    # Such a key would be taken for a shadow copy
+                    continue
+                translator = cls._compile_translator(field_type,
+                                                     forward=forward,
+                                                     path=(*path, key))
+                # Add a non-translated shadow copy of the field's numeric value
+                # for sum aggregations
+                shadowed = forward and isinstance(field_type, FieldType) and field_type.shadowed
+                translators[key] = translator, shadowed
+
+            def translate(doc: AnyJSON) -> AnyMutableJSON:
+                if isinstance(doc, dict):
+                    new_doc = {}
+                    for key, val in doc.items():
+                        try:
+                            translator, shadowed = translators[key]
+                        except KeyError:
+                            if key.endswith('_'):
+                                # Shadow copy fields should only be present
+                                # during a reverse translation and we skip over
+                                # to remove them.
+                                assert not forward, path
+                                continue
+                            else:
+                                raise KeyError(f'Key {key!r} not defined in field_types')
+                        new_doc[key] = translator(val)
+                        if shadowed:
+                            new_doc[key + '_'] = val
+                    return new_doc
+                elif isinstance(doc, list):
+                    return list(map(translate, doc))
+                else:
+                    assert False, (path, type(doc))
+
+            return translate
+        else:
+            is_list = isinstance(field_types, list)
+            field_type = one(field_types) if is_list else field_types
+            if not isinstance(field_type, FieldType):
+                def translate(_doc: AnyJSON) -> AnyMutableJSON:
+                    assert False, (path, type(field_type))
+
+                return translate
+
+            pass_thru = type(field_type).to_index is PassThrough.to_index
+            if forward:
+                to_index = field_type.to_index
+                allow_sorting_by_empty_lists = field_type.allow_sorting_by_empty_lists
+
+                def translate(doc: AnyJSON) -> AnyMutableJSON:
+                    if isinstance(doc, list):
+                        if not doc and allow_sorting_by_empty_lists:
+                            # See translate_fields() for the rationale
+                            doc = [None]
+                        return list(doc) if pass_thru else list(map(to_index, doc))
+                    else:
+                        assert not is_list, (doc, path)
+                        return doc if pass_thru else to_index(doc)
+            else:
+                from_index = field_type.from_index
+                allow_sorting_by_empty_lists = field_type.allow_sorting_by_empty_lists
+
+                def translate(doc: AnyJSON) -> AnyMutableJSON:
+                    if isinstance(doc, list):
+                        assert doc or not allow_sorting_by_empty_lists
+                        return list(doc) if pass_thru else list(map(from_index, doc))
+                    else:
+                        assert not is_list, (doc, path)
+                        return doc if pass_thru else from_index(doc)
+
+            return translate
+
     def to_json(self) -> JSON:
         assert self.contents is not None, self
         return dict(entity_id=self.coordinates.entity.entity_id,
@@ -1203,9 +1470,9 @@ class Document(Generic[C]):
                    ) -> Self:
         if coordinates is None:
             coordinates = DocumentCoordinates.from_hit(hit)
-        document = cls.translate_fields(hit['_source'],
-                                        field_types[coordinates.entity.catalog],
-                                        forward=False)
+        catalog = coordinates.entity.catalog
+        translator = cls.translator(catalog, field_types[catalog], forward=False)
+        document = translator(hit['_source'])
         if cls.needs_seq_no_primary_term:
             try:
                 version = (hit['_seq_no'], hit['_primary_term'])
@@ -1244,9 +1511,9 @@ class Document(Generic[C]):
                 if delete else
                 {
                     '_source' if bulk else 'body':
-                        self.translate_fields(doc=self.to_json(),
-                                              field_types=field_types[coordinates.entity.catalog],
-                                              forward=True)
+                        self.translator(coordinates.entity.catalog,
+                                        field_types[coordinates.entity.catalog],
+                                        forward=True)(self.to_json())
                 }
             ),
             '_id' if bulk else 'id': self.coordinates.document_id
@@ -1372,6 +1639,15 @@ class Aggregate(Document[AggregateCoordinates]):
     num_contributions: int
     needs_seq_no_primary_term: ClassVar[bool] = True
 
+    # The state of the accumulators used to produce the contents of this
+    # aggregate, along with enough bookkeeping to incorporate additional
+    # contributions without reading the existing ones again. This attribute is
+    # None if incremental aggregation is disabled, or if it isn't supported by
+    # one or more of the accumulators involved, or if the aggregate was
+    # retrieved without this property.
+    #
+    accumulators: Optional[JSON] = None
+
     def __attrs_post_init__(self):
         assert isinstance(self.coordinates, AggregateCoordinates)
         assert self.coordinates.doc_type is DocumentType.aggregate
@@ -1388,7 +1664,8 @@ class Aggregate(Document[AggregateCoordinates]):
             'bundles': {
                 'uuid': pass_thru_str,
                 'version': pass_thru_str,
-            }
+            },
+            'accumulators': pass_thru_json
         }
 
     @classmethod
@@ -1405,7 +1682,8 @@ class Aggregate(Document[AggregateCoordinates]):
                                  num_contributions=document['num_contributions'],
                                  sources=set(map(DocumentSource.from_json,
                                                  cast(list[SourceJSON], document['sources']))),
-                                 bundles=document.get('bundles'))
+                                 bundles=document.get('bundles'),
+                                 accumulators=document.get('accumulators'))
         assert isinstance(self, Aggregate)
         return self
 
@@ -1418,10 +1696,13 @@ class Aggregate(Document[AggregateCoordinates]):
         ]
 
     def to_json(self) -> JSON:
-        return dict(super().to_json(),
-                    num_contributions=self.num_contributions,
-                    sources=[source.to_json() for source in self.sources],
-                    bundles=self.bundles)
+        result = dict(super().to_json(),
+                      num_contributions=self.num_contributions,
+                      sources=[source.to_json() for source in self.sources],
+                      bundles=self.bundles)
+        if self.accumulators is not None:
+            result['accumulators'] = self.accumulators
+        return result
 
     @property
     def delete(self):
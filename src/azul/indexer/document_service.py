@@ -2,6 +2,7 @@ from collections.abc import (
     Iterable,
 )
 from typing import (
+    Optional,
     Type,
 )
 
@@ -25,6 +26,9 @@ from azul.indexer.document import (
     FieldType,
     FieldTypes,
 )
+from azul.indexer.rollup import (
+    SummaryRollup,
+)
 from azul.indexer.transform import (
     Transformer,
 )
@@ -48,6 +52,17 @@ class DocumentService:
     def aggregate_class(self, catalog: CatalogName) -> Type[Aggregate]:
         return self.metadata_plugin(catalog).aggregate_class()
 
+    def summary_rollup(self, catalog: CatalogName) -> Optional[SummaryRollup]:
+        """
+        The summary rollup for the given catalog or None if summary rollups are
+        disabled or not supported by the metadata plugin of the catalog.
+        """
+        if config.summary_rollups:
+            rollup_cls = self.metadata_plugin(catalog).summary_rollup
+            if rollup_cls is not None:
+                return rollup_cls(service=self, catalog=catalog)
+        return None
+
     def transformer_types(self,
                           catalog: CatalogName
                           ) -> Iterable[Type[Transformer]]:
@@ -80,9 +95,12 @@ class DocumentService:
             field_types = one(field_types)
         return field_types
 
+    @cache
     def field_types(self, catalog: CatalogName) -> FieldTypes:
         """
-        Returns a mapping of fields to field types
+        Returns a mapping of fields to field types. The mapping is cached so
+        that translators compiled from it can be reused, see
+        :meth:`Document.translator`.
 
         :return: dict with nested keys matching Elasticsearch fields and values
                  with the field's type
@@ -107,6 +125,11 @@ class DocumentService:
                          catalog: CatalogName,
                          doc: AnyJSON,
                          *,
-                         forward: bool
+                         forward: bool,
+                         in_place: bool = False
                          ) -> AnyMutableJSON:
-        return Document.translate_fields(doc, self.field_types(catalog), forward=forward)
+        translator = Document.translator(catalog,
+                                         self.field_types(catalog),
+                                         forward=forward,
+                                         in_place=in_place)
+        return translator(doc)
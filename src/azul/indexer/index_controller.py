@@ -51,6 +51,7 @@ from azul.hmac import (
     HMACAuthentication,
 )
 from azul.indexer import (
+    Bundle,
     BundlePartition,
     SourcedBundleFQIDJSON,
 )
@@ -64,6 +65,7 @@ from azul.indexer.index_service import (
 )
 from azul.types import (
     JSON,
+    JSONs,
 )
 
 log = logging.getLogger(__name__)
@@ -172,11 +174,16 @@ class IndexController(AppController):
                 if action is Action.reindex:
                     AzulClient().remote_reindex_partition(message)
                 else:
-                    notification = message['notification']
                     catalog = message['catalog']
                     assert catalog is not None
                     delete = action.is_delete()
-                    contributions = self.transform(catalog, notification, delete)
+                    try:
+                        notifications = message['notifications']
+                    except KeyError:
+                        notification = message['notification']
+                        contributions = self.transform(catalog, notification, delete)
+                    else:
+                        contributions = self.transform_batch(catalog, notifications, delete)
                     log.info('Writing %i contributions to index.', len(contributions))
                     tallies = self.index_service.contribute(catalog, contributions)
                     tallies = [DocumentTally.for_entity(catalog, entity, num_contributions)
@@ -204,18 +211,47 @@ class IndexController(AppController):
         notification into a list of contributions to documents, each document
         representing one metadata entity in the index.
         """
+        bundle_fqid = self._bundle_fqid(notification)
+        bundle = self.index_service.fetch_bundle(catalog, bundle_fqid)
+        return self._transform(catalog, notification, bundle, delete)
+
+    def transform_batch(self,
+                        catalog: CatalogName,
+                        notifications: JSONs,
+                        delete: bool
+                        ) -> list[Contribution]:
+        """
+        Transform the metadata in the bundles referenced by the given
+        notifications into a list of contributions to documents. The bundles
+        are fetched together, so that the repository plugin can share work
+        between them.
+        """
+        bundle_fqids = list(map(self._bundle_fqid, notifications))
+        bundles = self.index_service.fetch_bundles(catalog, bundle_fqids)
+        return [
+            contribution
+            for notification, bundle in zip(notifications, bundles, strict=True)
+            for contribution in self._transform(catalog, notification, bundle, delete)
+        ]
+
+    def _bundle_fqid(self, notification: JSON) -> SourcedBundleFQIDJSON:
         # FIXME: Adopt `trycast` for casting JSON to TypeDict
         #        https://github.com/DataBiosphere/azul/issues/5171
-        bundle_fqid = cast(SourcedBundleFQIDJSON, notification['bundle_fqid'])
+        return cast(SourcedBundleFQIDJSON, notification['bundle_fqid'])
+
+    def _transform(self,
+                   catalog: CatalogName,
+                   notification: JSON,
+                   bundle: Bundle,
+                   delete: bool
+                   ) -> list[Contribution]:
         try:
             partition = notification['partition']
         except KeyError:
             partition = BundlePartition.root
         else:
             partition = BundlePartition.from_json(partition)
-        service = self.index_service
-        bundle = service.fetch_bundle(catalog, bundle_fqid)
-        results = service.transform(catalog, bundle, partition, delete=delete)
+        results = self.index_service.transform(catalog, bundle, partition, delete=delete)
         result = first(results)
         if isinstance(result, BundlePartition):
             for partition in results:
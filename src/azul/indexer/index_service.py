@@ -1,20 +1,32 @@
 from collections import (
     Counter,
     defaultdict,
+    deque,
 )
 from collections.abc import (
     Iterable,
     Iterator,
     Mapping,
     Sequence,
+    Set,
 )
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+import hashlib
+import heapq
 from itertools import (
     groupby,
 )
+import json
 import logging
 from operator import (
     attrgetter,
+    itemgetter,
 )
+import threading
+import time
 from typing import (
     MutableSet,
     Optional,
@@ -23,8 +35,9 @@ from typing import (
     Union,
 )
 
+import attrs
 from elasticsearch import (
-    ConflictError,
+    ConnectionTimeout,
     ElasticsearchException,
 )
 from elasticsearch.exceptions import (
@@ -32,7 +45,8 @@ from elasticsearch.exceptions import (
     RequestError,
 )
 from elasticsearch.helpers import (
-    streaming_bulk,
+    expand_action,
+    scan,
 )
 from more_itertools import (
     first,
@@ -44,6 +58,7 @@ from azul import (
     cache,
     config,
     freeze,
+    require,
 )
 from azul.deployment import (
     aws,
@@ -51,6 +66,9 @@ from azul.deployment import (
 from azul.es import (
     ESClientFactory,
 )
+from azul.generation_service import (
+    GenerationService,
+)
 from azul.indexer import (
     Bundle,
     BundleFQID,
@@ -81,6 +99,9 @@ from azul.indexer.document import (
 from azul.indexer.document_service import (
     DocumentService,
 )
+from azul.indexer.rollup import (
+    SummaryRollup,
+)
 from azul.indexer.transform import (
     Transformer,
 )
@@ -95,6 +116,7 @@ from azul.types import (
     CompositeJSON,
     JSON,
     JSONs,
+    MutableJSON,
 )
 
 log = logging.getLogger(__name__)
@@ -105,6 +127,12 @@ CataloguedTallies = Mapping[CataloguedEntityReference, int]
 
 MutableCataloguedTallies = dict[CataloguedEntityReference, int]
 
+#: The summary rollup partition an aggregate contributes to: the catalog and
+#: entity type of the aggregate, the IDs of its sources and the partition of its
+#: entity ID, see :meth:`SummaryRollup.partition`
+#:
+RollupKey = tuple[CatalogName, EntityType, frozenset[str], str]
+
 
 class IndexExistsAndDiffersException(Exception):
     pass
@@ -120,7 +148,8 @@ class IndexService(DocumentService):
 
         index_name = IndexName.parse(index_name)
         index_name.validate()
-        aggregate = index_name.doc_type is DocumentType.aggregate
+        # Rollup indices are even smaller than aggregate indices
+        aggregate = index_name.doc_type is not DocumentType.contribution
         catalog = index_name.catalog
         assert catalog is not None, catalog
         if config.catalogs[catalog].is_integration_test_catalog:
@@ -166,13 +195,20 @@ class IndexService(DocumentService):
         }
 
     def index_names(self, catalog: CatalogName) -> list[str]:
-        return [
+        index_names = [
             str(IndexName.create(catalog=catalog,
                                  entity_type=entity_type,
                                  doc_type=doc_type))
             for entity_type in self.entity_types(catalog)
             for doc_type in (DocumentType.contribution, DocumentType.aggregate)
         ]
+        rollup = self.summary_rollup(catalog)
+        if rollup is not None:
+            index_names.extend(
+                SummaryRollup.index_name(catalog, entity_type)
+                for entity_type in rollup.entity_types
+            )
+        return index_names
 
     def fetch_bundle(self,
                      catalog: CatalogName,
@@ -182,6 +218,14 @@ class IndexService(DocumentService):
         bundle_fqid = plugin.resolve_bundle(bundle_fqid)
         return plugin.fetch_bundle(bundle_fqid)
 
+    def fetch_bundles(self,
+                      catalog: CatalogName,
+                      bundle_fqids: Sequence[SourcedBundleFQIDJSON]
+                      ) -> list[Bundle]:
+        plugin = self.repository_plugin(catalog)
+        bundle_fqids = list(map(plugin.resolve_bundle, bundle_fqids))
+        return plugin.fetch_bundles(bundle_fqids)
+
     def index(self, catalog: CatalogName, bundle: Bundle) -> None:
         """
         Index the bundle referenced by the given notification into the specified
@@ -284,29 +328,39 @@ class IndexService(DocumentService):
             return contributions
 
     def create_indices(self, catalog: CatalogName):
-        es_client = ESClientFactory.get()
         for index_name in self.index_names(catalog):
-            while True:
-                settings = self.settings(index_name)
+            self._create_index(catalog, index_name)
+
+    def _create_index(self, catalog: CatalogName, index_name: str):
+        """
+        Create the index with the given name unless it exists, in which case
+        its settings and mappings are checked.
+        """
+        es_client = ESClientFactory.get()
+        while True:
+            settings = self.settings(index_name)
+            if IndexName.parse(index_name).doc_type is DocumentType.rollup:
+                mappings = SummaryRollup.mapping
+            else:
                 mappings = self.metadata_plugin(catalog).mapping()
+            try:
+                with silenced_es_logger():
+                    index = es_client.indices.get(index=index_name)
+            except NotFoundError:
                 try:
-                    with silenced_es_logger():
-                        index = es_client.indices.get(index=index_name)
-                except NotFoundError:
-                    try:
-                        es_client.indices.create(index=index_name,
-                                                 body=dict(settings=settings,
-                                                           mappings=mappings))
-                    except RequestError as e:
-                        if e.error == 'resource_already_exists_exception':
-                            log.info('Another party concurrently created index %r, retrying.', index_name)
-                        else:
-                            raise
-                else:
-                    self._check_index(settings=settings,
-                                      mappings=mappings,
-                                      index=index[index_name])
-                    break
+                    es_client.indices.create(index=index_name,
+                                             body=dict(settings=settings,
+                                                       mappings=mappings))
+                except RequestError as e:
+                    if e.error == 'resource_already_exists_exception':
+                        log.info('Another party concurrently created index %r, retrying.', index_name)
+                    else:
+                        raise
+            else:
+                self._check_index(settings=settings,
+                                  mappings=mappings,
+                                  index=index[index_name])
+                break
 
     def _check_index(self, *, settings: JSON, mappings: JSON, index: JSON):
 
@@ -378,6 +432,7 @@ class IndexService(DocumentService):
         for index_name in self.index_names(catalog):
             if es_client.indices.exists(index_name):
                 es_client.indices.delete(index=index_name)
+        self._increment_generations([catalog])
 
     def contribute(self,
                    catalog: CatalogName,
@@ -423,58 +478,334 @@ class IndexService(DocumentService):
 
         Also note that the input tallies can refer to entities from different
         catalogs.
+
+        If incremental aggregation is enabled, only the contributions from
+        bundles that don't already contribute to an existing aggregate are read
+        and merged into that aggregate. See :meth:`_aggregate_incrementally`.
+
+        If summary rollups are enabled, the contribution of every aggregate
+        written is recorded in the summary rollups. See :meth:`_update_rollups`.
+
+        Otherwise, the contributions are streamed from the index, ordered by
+        entity, and the aggregate for an entity is built as soon as the last
+        contribution to that entity was read. Aggregates are written in batches
+        of :attr:`aggregate_batch_size`. The number of contributions held in
+        memory is therefore bounded by the number of contributions to the most
+        popular entity, not the total number of contributions read.
         """
         # Use catalog specified in each tally
         writer = self._create_writer(catalog=None)
+        # The catalogs in which at least one aggregate was written
+        modified_catalogs: set[CatalogName] = set()
         while True:
             # Read the aggregates
             old_aggregates = self._read_aggregates(tallies)
+            # Aggregation may modify the old aggregates
+            old_rollup_keys = self._rollup_keys(old_aggregates.values())
             total_tallies: MutableCataloguedTallies = Counter(tallies)
             total_tallies.update({
                 old_aggregate.coordinates.entity: old_aggregate.num_contributions
                 for old_aggregate in old_aggregates.values()
             })
 
-            # Read all contributions
-            contributions = self._read_contributions(total_tallies)
-            actual_tallies = Counter(contribution.coordinates.entity
-                                     for contribution in contributions)
-            if tallies.keys() != actual_tallies.keys():
-                message = 'Could not find all expected contributions.'
-                args = (tallies, actual_tallies) if config.debug else ()
-                raise EventualConsistencyException(message, *args)
-            assert all(tallies[entity] <= actual_tally
-                       for entity, actual_tally in actual_tallies.items())
-
-            # Combine the contributions into new aggregates, one per entity
-            new_aggregates = self._aggregate(contributions)
-
-            # Remove old aggregates (leaving over only deletions) while
-            # propagating the expected document version to the corresponding new
-            # aggregate
+            if config.incremental_aggregation:
+                # Read only the contributions that aren't already incorporated
+                # into the old aggregates
+                contributions, actual_tallies = self._read_new_contributions(total_tallies,
+                                                                             old_aggregates)
+                self._check_tallies(tallies, actual_tallies)
+                new_aggregates = self._aggregate_incrementally(contributions,
+                                                               actual_tallies,
+                                                               old_aggregates)
+            else:
+                # Stream all contributions, counting them as they are consumed
+                actual_tallies: MutableCataloguedTallies = Counter()
+
+                def count(contributions: Iterable[CataloguedContribution]
+                          ) -> Iterator[CataloguedContribution]:
+                    for contribution in contributions:
+                        actual_tallies[contribution.coordinates.entity] += 1
+                        yield contribution
+
+                contributions = count(self._read_contributions(total_tallies))
+                new_aggregates = self._aggregate(contributions)
+
+            retries: MutableSet[DocumentCoordinates] = set()
+
+            def write(aggregates: list[Aggregate]):
+                writer.write(aggregates)
+                self._update_rollups(aggregates, writer.written, old_rollup_keys)
+                modified_catalogs.update(
+                    coordinates.entity.catalog
+                    for coordinates in writer.written
+                )
+                retries.update(writer.retries)
+
+            # Combine the contributions into new aggregates, one per entity,
+            # and write them in batches as soon as they become available. Old
+            # aggregates are removed (leaving over only deletions) while
+            # propagating the expected document version to the corresponding
+            # new aggregate.
+            batch = []
             for new_aggregate in new_aggregates:
-                old_aggregate = old_aggregates.pop(new_aggregate.coordinates.entity, None)
+                entity = new_aggregate.coordinates.entity
+                # All contributions to the entity have been read at this point
+                assert tallies[entity] <= actual_tallies[entity], entity
+                old_aggregate = old_aggregates.pop(entity, None)
                 new_aggregate.version = None if old_aggregate is None else old_aggregate.version
+                batch.append(new_aggregate)
+                if len(batch) == self.aggregate_batch_size:
+                    write(batch)
+                    batch = []
+
+            # Only now that all contributions were read can we tell if any were
+            # missing. Aggregates written up to this point are consistent with
+            # the contributions they were built from, and the retry prompted by
+            # the exception will simply rebuild them.
+            self._check_tallies(tallies, actual_tallies)
 
             # Empty out the left-over, deleted aggregates
             for old_aggregate in old_aggregates.values():
                 old_aggregate.contents = {}
-                new_aggregates.append(old_aggregate)
+                batch.append(old_aggregate)
 
-            # Write new aggregates
-            writer.write(new_aggregates)
+            # Write remaining aggregates
+            if batch:
+                write(batch)
 
             # Retry writes if necessary
-            if writer.retries:
+            if retries:
                 tallies: CataloguedTallies = {
-                    aggregate.coordinates.entity: tallies[aggregate.coordinates.entity]
-                    for aggregate in new_aggregates
-                    if aggregate.coordinates in writer.retries
+                    coordinates.entity: tallies[coordinates.entity]
+                    for coordinates in retries
                 }
             else:
                 break
+        # The generation is incremented once per invocation, after the rollups
+        # were updated, so that responses computed from them can be cached. If
+        # a write raised an exception, the generation isn't incremented and the
+        # retry of the invocation will increment it instead.
+        self._increment_generations(modified_catalogs)
         writer.raise_on_errors()
 
+    def _increment_generations(self, catalogs: Iterable[CatalogName]) -> None:
+        """
+        Invalidate the responses cached by the service for the given catalogs.
+        """
+        if config.response_cache_size > 0:
+            generation_service = GenerationService()
+            for catalog in catalogs:
+                generation = generation_service.increment(catalog)
+                log.debug('Incremented generation of catalog %r to %i',
+                          catalog, generation.number)
+
+    #: The maximum number of new aggregates to hold in memory before writing
+    #: them to the index
+    #:
+    aggregate_batch_size = 256
+
+    #: The number of times ES retries the update of a summary rollup document
+    #: that was concurrently updated by another indexer invocation
+    #:
+    rollup_conflict_retry_limit = 16
+
+    def _rollup_key(self, aggregate: Aggregate) -> Optional[RollupKey]:
+        entity = aggregate.coordinates.entity
+        rollup = self.summary_rollup(entity.catalog)
+        if rollup is None or entity.entity_type not in rollup.entity_types:
+            return None
+        else:
+            source_ids = frozenset(source.id for source in aggregate.sources)
+            partition = rollup.partition(entity.entity_id)
+            return entity.catalog, entity.entity_type, source_ids, partition
+
+    def _rollup_keys(self,
+                     aggregates: Iterable[Aggregate]
+                     ) -> dict[CataloguedEntityReference, RollupKey]:
+        keys = {}
+        for aggregate in aggregates:
+            key = self._rollup_key(aggregate)
+            if key is not None:
+                keys[aggregate.coordinates.entity] = key
+        return keys
+
+    def _update_rollups(self,
+                        aggregates: Iterable[Aggregate],
+                        written: Set[DocumentCoordinates],
+                        old_keys: Mapping[CataloguedEntityReference, RollupKey]
+                        ) -> None:
+        """
+        Record the contribution of each of the given aggregates that were
+        successfully written in the summary rollup partition it belongs to.
+
+        The rollup documents are updated by a script in ES, concurrently with
+        other indexer invocations, which is why aggregates that weren't written
+        must not contribute. Recording a contribution is idempotent, so if the
+        update fails after the aggregates were written, the retry of the
+        invocation brings the rollups up to date. The exception is an
+        aggregate whose set of sources changed, and whose contribution to the
+        partition for its old set of sources can only be removed while the
+        old aggregate is still around. See :meth:`rebuild_rollups`.
+
+        :param old_keys: The partitions the previous versions of the aggregates
+                         contributed to
+        """
+        contributions: dict[RollupKey, dict[EntityID, JSON]] = defaultdict(dict)
+        for aggregate in aggregates:
+            if aggregate.coordinates in written:
+                key = self._rollup_key(aggregate)
+                if key is not None:
+                    entity = aggregate.coordinates.entity
+                    rollup = self.summary_rollup(entity.catalog)
+                    contribution = rollup.contribution(entity.entity_type, aggregate.contents)
+                    contributions[key][entity.entity_id] = contribution
+                    old_key = old_keys.get(entity)
+                    if old_key is not None and old_key != key:
+                        contributions[old_key][entity.entity_id] = {}
+        self._write_rollups(contributions)
+
+    def _write_rollups(self,
+                       contributions: Mapping[RollupKey, Mapping[EntityID, JSON]]
+                       ) -> None:
+        """
+        Set the given contributions in the ledgers of the respective rollup
+        partitions, and copy the resulting sums to the total documents of the
+        partitions.
+        """
+
+        def bulk(actions: list[JSON], keys: list[RollupKey]) -> list[JSON]:
+            response = ESClientFactory.get().bulk(body=actions)
+            items = [one(item.values()) for item in response['items']]
+            errors = [item for item in items if 'error' in item]
+            if errors:
+                raise RuntimeError('Failed to update summary rollups', errors)
+            assert len(items) == len(keys), (items, keys)
+            return items
+
+        def update(kind: str,
+                   key: RollupKey,
+                   script: str,
+                   params: JSON,
+                   upsert: JSON
+                   ) -> list[JSON]:
+            catalog, entity_type, source_ids, partition = key
+            return [
+                {
+                    'update': {
+                        '_index': SummaryRollup.index_name(catalog, entity_type),
+                        '_id': SummaryRollup.document_id(kind, source_ids, partition),
+                        'retry_on_conflict': self.rollup_conflict_retry_limit
+                    }
+                },
+                {
+                    'script': {
+                        'source': script,
+                        'lang': 'painless',
+                        'params': params
+                    },
+                    'upsert': {
+                        'kind': kind,
+                        'sources': [{'id': source_id} for source_id in sorted(source_ids)],
+                        **upsert
+                    },
+                    'scripted_upsert': True,
+                    # Only needed for the ledger, to learn the updated sum
+                    '_source': ['rollup']
+                }
+            ]
+
+        keys = list(contributions.keys())
+        if keys:
+            actions = []
+            for key in keys:
+                actions.extend(update('ledger',
+                                      key,
+                                      SummaryRollup.ledger_script,
+                                      {'contributions': contributions[key]},
+                                      {'contributions': {}, 'rollup': {}}))
+            items = bulk(actions, keys)
+            actions, total_keys = [], []
+            for key, item in zip(keys, items):
+                try:
+                    ledger = item['get']
+                except KeyError:
+                    # A ledger that would have been created empty
+                    assert item['result'] == 'noop', item
+                else:
+                    actions.extend(update('total',
+                                          key,
+                                          SummaryRollup.total_script,
+                                          {
+                                              'version': item['_version'],
+                                              'rollup': ledger['_source']['rollup']
+                                          },
+                                          {'version': 0, 'rollup': {}}))
+                    total_keys.append(key)
+            if actions:
+                bulk(actions, total_keys)
+            log.info('Updated %i summary rollup partition(s)', len(total_keys))
+
+    def rebuild_rollups(self, catalog: CatalogName) -> None:
+        """
+        Rebuild the summary rollups of the given catalog from the aggregates in
+        the index, in case they diverged. Must not be invoked while the catalog
+        is being indexed.
+        """
+        rollup = self.summary_rollup(catalog)
+        require(rollup is not None, 'Summary rollups are disabled', catalog)
+        es_client = ESClientFactory.get()
+        aggregate_cls = self.aggregate_class(catalog)
+        field_types = self.catalogued_field_types()
+        for entity_type in rollup.entity_types:
+            rollup_index = SummaryRollup.index_name(catalog, entity_type)
+            # The rollup index is missing if rollups were enabled after the
+            # catalog was indexed. Without the mapping, the upserts below would
+            # create the index with a dynamic one.
+            self._create_index(catalog, rollup_index)
+            log.info('Deleting summary rollups in index %r', rollup_index)
+            es_client.delete_by_query(index=rollup_index,
+                                      body={'query': {'match_all': {}}},
+                                      refresh=True)
+            aggregate_index = str(IndexName.create(catalog=catalog,
+                                                   entity_type=entity_type,
+                                                   doc_type=DocumentType.aggregate))
+            # The aggregates are read in the order of their entity ID so that
+            # the contributions to each partition can be written all at once
+            hits = scan(client=es_client,
+                        index=aggregate_index,
+                        query={'sort': ['entity_id.keyword']},
+                        preserve_order=True,
+                        _source_includes=[
+                            *aggregate_cls.mandatory_source_fields(),
+                            'contents'
+                        ])
+            contributions: dict[RollupKey, dict[EntityID, JSON]] = defaultdict(dict)
+            partition, num_aggregates = None, 0
+            for hit in hits:
+                coordinates = DocumentCoordinates.from_hit(hit)
+                aggregate = aggregate_cls.from_index(field_types, hit, coordinates=coordinates)
+                key = self._rollup_key(aggregate)
+                if key[-1] != partition:
+                    self._write_rollups(contributions)
+                    contributions.clear()
+                    partition = key[-1]
+                contribution = rollup.contribution(entity_type, aggregate.contents)
+                contributions[key][coordinates.entity.entity_id] = contribution
+                num_aggregates += 1
+            self._write_rollups(contributions)
+            log.info('Rebuilt summary rollups in index %r from %i aggregate(s)',
+                     rollup_index, num_aggregates)
+
+    def _check_tallies(self,
+                       tallies: CataloguedTallies,
+                       actual_tallies: CataloguedTallies):
+        if tallies.keys() != actual_tallies.keys():
+            message = 'Could not find all expected contributions.'
+            args = (tallies, actual_tallies) if config.debug else ()
+            raise EventualConsistencyException(message, *args)
+        assert all(tallies[entity] <= actual_tally
+                   for entity, actual_tally in actual_tallies.items())
+
     def _read_aggregates(self,
                          entities: CataloguedTallies
                          ) -> dict[CataloguedEntityReference, Aggregate]:
@@ -496,6 +827,9 @@ class IndexService(DocumentService):
         for catalog in catalogs:
             aggregate_cls = self.aggregate_class(catalog)
             mandatory_source_fields.update(aggregate_cls.mandatory_source_fields())
+        if config.incremental_aggregation:
+            # Incremental aggregation resumes from the existing aggregate
+            mandatory_source_fields.update(['contents', 'bundles', 'accumulators'])
         response = ESClientFactory.get().mget(body=request,
                                               _source_includes=list(mandatory_source_fields))
 
@@ -516,19 +850,23 @@ class IndexService(DocumentService):
 
         return {a.coordinates.entity: a for a in aggregates()}
 
-    def _read_contributions(self,
-                            tallies: CataloguedTallies
-                            ) -> list[CataloguedContribution]:
-        es_client = ESClientFactory.get()
+    def _contribution_index(self, entity: CataloguedEntityReference) -> str:
+        return str(IndexName.create(catalog=entity.catalog,
+                                    entity_type=entity.entity_type,
+                                    doc_type=DocumentType.contribution))
 
+    def _entity_ids_by_index(self,
+                             entities: Iterable[CataloguedEntityReference]
+                             ) -> dict[str, MutableSet[str]]:
         entity_ids_by_index: dict[str, MutableSet[str]] = defaultdict(set)
-        for entity in tallies.keys():
-            index = str(IndexName.create(catalog=entity.catalog,
-                                         entity_type=entity.entity_type,
-                                         doc_type=DocumentType.contribution))
-            entity_ids_by_index[index].add(entity.entity_id)
+        for entity in entities:
+            entity_ids_by_index[self._contribution_index(entity)].add(entity.entity_id)
+        return entity_ids_by_index
 
-        query = {
+    def _contributions_query(self,
+                             entity_ids_by_index: Mapping[str, MutableSet[str]]
+                             ) -> JSON:
+        return {
             'bool': {
                 'should': [
                     {
@@ -551,34 +889,187 @@ class IndexService(DocumentService):
             }
         }
 
+    def _read_contributions(self,
+                            tallies: CataloguedTallies
+                            ) -> Iterator[CataloguedContribution]:
+        """
+        Lazily read all contributions to the entities in the given tallies. The
+        contributions to any given entity are yielded consecutively.
+        """
+        entity_ids_by_index = self._entity_ids_by_index(tallies.keys())
+        query = self._contributions_query(entity_ids_by_index)
         index = sorted(list(entity_ids_by_index.keys()))
         num_contributions = sum(tallies.values())
         log.info('Reading %i expected contribution(s)', num_contributions)
+        contributions = self._search_contributions(index, query, num_contributions)
+        num_contributions = 0
+        for contribution in contributions:
+            num_contributions += 1
+            yield contribution
+        log.info('Read %i contribution(s)', num_contributions)
+
+    #: The sort order of contributions read from the index. It guarantees that
+    #: the contributions to any given entity are consecutive.
+    #:
+    contribution_sort = ['_index', 'entity_id.keyword', 'document_id.keyword']
+
+    #: The upper bound for the number of slices in which contributions are read
+    #: concurrently. Each slice occupies a connection to ES, and the client's
+    #: connection pool is limited to ten connections per host by default.
+    #:
+    max_contribution_slices = 8
+
+    #: How long ES should retain the search context of a sliced scroll between
+    #: requests for successive pages of a slice
+    #:
+    contribution_scroll_keep_alive = '5m'
+
+    def _search_contributions(self,
+                              index: list[str],
+                              query: JSON,
+                              num_contributions: int
+                              ) -> Iterator[CataloguedContribution]:
+        """
+        Lazily read the contributions matching the given query, ordered by
+        index, entity ID and document ID.
 
-        def pages() -> Iterable[JSONs]:
-            body = dict(query=query)
-            while True:
-                response = es_client.search(index=index,
-                                            sort=['_index', 'document_id.keyword'],
-                                            body=body,
-                                            size=config.contribution_page_size,
-                                            track_total_hits=False,
-                                            seq_no_primary_term=Contribution.needs_seq_no_primary_term)
-                hits = response['hits']['hits']
-                log.debug('Read a page with %i contribution(s)', len(hits))
-                if hits:
-                    yield hits
-                    body['search_after'] = hits[-1]['sort']
-                else:
-                    break
+        :param index: The names of the contribution indices to search
 
-        contributions = [
-            Contribution.from_index(self.catalogued_field_types(), hit)
-            for hits in pages()
-            for hit in hits
-        ]
+        :param query: The query matching the contributions
 
-        log.info('Read %i contribution(s)', len(contributions))
+        :param num_contributions: The expected number of matching
+                                  contributions. If that number exceeds the
+                                  page size, the contributions are read
+                                  concurrently in multiple slices.
+        """
+        num_slices = self._num_contribution_slices(index, num_contributions)
+        if num_slices > 1:
+            hits = self._search_contribution_slices(index, query, num_slices)
+        else:
+            hits = self._search_contribution_pages(index, query)
+        field_types = self.catalogued_field_types()
+        for hit in hits:
+            yield Contribution.from_index(field_types, hit)
+
+    def _num_contribution_slices(self,
+                                 index: list[str],
+                                 num_contributions: int
+                                 ) -> int:
+        """
+        The number of slices in which to read the given number of contributions
+        from the given indices. Slicing is most efficient when the number of
+        slices doesn't exceed the number of shards in any of the indices. There
+        is no point in reading fewer than a page of contributions per slice.
+        """
+        num_pages = -(-num_contributions // config.contribution_page_size)
+        if num_pages <= 1:
+            return 1
+        num_shards = min(
+            self.settings(index_name)['index']['number_of_shards']
+            for index_name in index
+        )
+        return min(num_pages, num_shards, self.max_contribution_slices)
+
+    def _search_contribution_pages(self,
+                                   index: list[str],
+                                   query: JSON
+                                   ) -> Iterator[JSON]:
+        """
+        Lazily read the hits for the contributions matching the given query,
+        one page at a time, using `search_after`.
+        """
+        es_client = ESClientFactory.get()
+        body = dict(query=query)
+        while True:
+            response = es_client.search(index=index,
+                                        sort=self.contribution_sort,
+                                        body=body,
+                                        size=config.contribution_page_size,
+                                        track_total_hits=False,
+                                        seq_no_primary_term=Contribution.needs_seq_no_primary_term)
+            hits = response['hits']['hits']
+            log.debug('Read a page with %i contribution(s)', len(hits))
+            if hits:
+                yield from hits
+                body['search_after'] = hits[-1]['sort']
+            else:
+                break
+
+    def _search_contribution_slices(self,
+                                    index: list[str],
+                                    query: JSON,
+                                    num_slices: int
+                                    ) -> Iterator[JSON]:
+        """
+        Lazily read the hits for the contributions matching the given query,
+        using a sliced scroll. The pages of all slices are requested
+        concurrently, with the next page of a slice being requested while the
+        current one is consumed. The slices are merged so that the hits are
+        yielded in the same order as by :meth:`_search_contribution_pages`.
+
+        A point in time (PIT) would be preferable to a scroll, but it isn't
+        supported by the OSS distribution of Elasticsearch 7.10 that backs the
+        AWS domain.
+        """
+        es_client = ESClientFactory.get()
+        page_size = config.contribution_page_size
+        keep_alive = self.contribution_scroll_keep_alive
+
+        def search(slice_id: int) -> JSON:
+            # Scrolling with track_total_hits=False is not supported by ES
+            return es_client.search(index=index,
+                                    sort=self.contribution_sort,
+                                    body={
+                                        'query': query,
+                                        'slice': {
+                                            'id': slice_id,
+                                            'max': num_slices
+                                        }
+                                    },
+                                    size=page_size,
+                                    scroll=keep_alive,
+                                    seq_no_primary_term=Contribution.needs_seq_no_primary_term)
+
+        def scroll(slice_id: int, future: Future) -> Iterator[JSON]:
+            scroll_id = None
+            try:
+                while future is not None:
+                    response = future.result()
+                    scroll_id = response['_scroll_id']
+                    hits = response['hits']['hits']
+                    log.debug('Read a page with %i contribution(s) from slice %i',
+                              len(hits), slice_id)
+                    # A short page is the last one
+                    if len(hits) < page_size:
+                        future = None
+                    else:
+                        future = tpe.submit(es_client.scroll,
+                                            scroll_id=scroll_id,
+                                            scroll=keep_alive)
+                    yield from hits
+            finally:
+                if future is not None:
+                    # Wait for the prefetched page for its scroll ID
+                    try:
+                        scroll_id = future.result()['_scroll_id']
+                    except Exception:
+                        pass
+                if scroll_id is not None:
+                    es_client.clear_scroll(scroll_id=scroll_id, ignore=(404,))
+
+        log.info('Reading contributions in %i slices', num_slices)
+        with ThreadPoolExecutor(max_workers=num_slices,
+                                thread_name_prefix='slice') as tpe:
+            # Submit the first request for every slice before consuming any
+            futures = [tpe.submit(search, slice_id) for slice_id in range(num_slices)]
+            slices = [scroll(slice_id, future) for slice_id, future in enumerate(futures)]
+            try:
+                yield from heapq.merge(*slices, key=itemgetter('sort'))
+            finally:
+                for slice_ in slices:
+                    slice_.close()
+
+    def _log_contributions(self, contributions: list[CataloguedContribution]):
         if log.isEnabledFor(logging.DEBUG):
             entity_ref = attrgetter('entity')
             log.debug(
@@ -588,24 +1079,349 @@ class IndexService(DocumentService):
                     for entity, contribution_group in groupby(sorted(contributions, key=entity_ref), key=entity_ref)
                 }
             )
-        return contributions
 
-    def _aggregate(self,
-                   contributions: list[CataloguedContribution]
-                   ) -> list[Aggregate]:
+    #: The maximum number of bundles contributing to an entity for which
+    #: contributions from additional bundles are aggregated incrementally. The
+    #: limit is imposed by the default value of the `index.max_terms_count`
+    #: setting in ES. Beyond this limit, aggregates are always rebuilt.
+    #:
+    max_incremental_bundles = 65536
+
+    #: The maximum size, in characters of serialized JSON, of the accumulator
+    #: state stored in an aggregate document. Large project aggregates can
+    #: have hundreds of thousands of inner files, each contributing a digest
+    #: and aggregator state. Beyond this limit, the state is not stored and
+    #: the aggregate is rebuilt from scratch when it is next updated.
+    #:
+    max_accumulators_size = 16 * 1024 * 1024
+
+    def _is_incremental(self, aggregate: Aggregate) -> bool:
+        return (
+            aggregate.accumulators is not None
+            and len(aggregate.accumulators['bundles']) <= self.max_incremental_bundles
+        )
+
+    def _read_new_contributions(self,
+                                tallies: CataloguedTallies,
+                                old_aggregates: Mapping[CataloguedEntityReference, Aggregate]
+                                ) -> tuple[list[CataloguedContribution], MutableCataloguedTallies]:
+        """
+        Read the contributions to the entities in the given tallies that are
+        not already incorporated into the given aggregates of those entities.
+        For entities without an aggregate, or one that doesn't support
+        incremental aggregation, all contributions are read.
+
+        :return: A tuple containing the contributions read and a dictionary
+                 with the total number of contributions to each entity,
+                 including the ones that weren't read.
+        """
+        es_client = ESClientFactory.get()
+        entity_ids_by_index = self._entity_ids_by_index(tallies.keys())
+        query = self._contributions_query(entity_ids_by_index)
+        index = sorted(list(entity_ids_by_index.keys()))
+
+        # Count the contributions to each entity
+        response = es_client.search(index=index,
+                                    body={
+                                        'query': query,
+                                        'aggs': {
+                                            'indices': {
+                                                'terms': {
+                                                    'field': '_index',
+                                                    'size': len(index)
+                                                },
+                                                'aggs': {
+                                                    'entities': {
+                                                        'terms': {
+                                                            'field': 'entity_id.keyword',
+                                                            'size': max(map(len, entity_ids_by_index.values()))
+                                                        }
+                                                    }
+                                                }
+                                            }
+                                        }
+                                    },
+                                    size=0,
+                                    track_total_hits=False)
+        entities = {
+            (self._contribution_index(entity), entity.entity_id): entity
+            for entity in tallies.keys()
+        }
+        actual_tallies: MutableCataloguedTallies = Counter()
+        for index_bucket in response['aggregations']['indices']['buckets']:
+            for entity_bucket in index_bucket['entities']['buckets']:
+                entity = entities[index_bucket['key'], entity_bucket['key']]
+                actual_tallies[entity] = entity_bucket['doc_count']
+
+        # For an entity whose aggregate has accumulator state, exclude the
+        # contributions from bundles that already contributed to it.
+        incremental = {
+            entity: aggregate.accumulators['bundles']
+            for entity, aggregate in old_aggregates.items()
+            if self._is_incremental(aggregate)
+        }
+        full_entity_ids_by_index = self._entity_ids_by_index(
+            entity for entity in tallies.keys() if entity not in incremental
+        )
+        query = self._contributions_query(full_entity_ids_by_index)
+        query['bool']['should'].extend(
+            {
+                'bool': {
+                    'must': [
+                        {
+                            'term': {
+                                '_index': self._contribution_index(entity)
+                            }
+                        },
+                        {
+                            'term': {
+                                'entity_id.keyword': entity.entity_id
+                            }
+                        }
+                    ],
+                    'must_not': [
+                        {
+                            'terms': {
+                                'bundle_uuid.keyword': bundle_uuids
+                            }
+                        }
+                    ]
+                }
+            }
+            for entity, bundle_uuids in incremental.items()
+        )
+        log.info('Reading new contributions to %i entities and all '
+                 'contributions to %i entities, out of %i expected '
+                 'contribution(s) in total',
+                 len(incremental), len(tallies) - len(incremental),
+                 sum(actual_tallies.values()))
+        num_new_contributions = sum(actual_tallies.values()) - sum(
+            old_aggregates[entity].num_contributions
+            for entity in incremental
+        )
+        contributions = self._search_contributions(index, query, max(0, num_new_contributions))
+        contributions = list(contributions)
+        log.info('Read %i contribution(s)', len(contributions))
+        self._log_contributions(contributions)
+        return contributions, actual_tallies
+
+    def _aggregate_incrementally(self,
+                                 contributions: list[CataloguedContribution],
+                                 tallies: CataloguedTallies,
+                                 old_aggregates: Mapping[CataloguedEntityReference, Aggregate]
+                                 ) -> Iterator[Aggregate]:
+        """
+        Merge the given contributions into the given aggregates of the entities
+        they contribute to, rebuilding the aggregates for which that isn't
+        possible.
+
+        :param contributions: The contributions returned by
+                              :meth:`_read_new_contributions`
+
+        :param tallies: The total number of contributions to each entity, also
+                        returned by :meth:`_read_new_contributions`
+
+        :param old_aggregates: The existing aggregates
+        """
+        contributions_by_entity: dict[CataloguedEntityReference,
+                                      list[CataloguedContribution]] = defaultdict(list)
+        for contribution in contributions:
+            contributions_by_entity[contribution.coordinates.entity].append(contribution)
+
+        full_contributions = []
+        rebuilds: MutableCataloguedTallies = {}
+        for entity, num_contributions in tallies.items():
+            entity_contributions = contributions_by_entity.get(entity, [])
+            old_aggregate = old_aggregates.get(entity)
+            if old_aggregate is None or not self._is_incremental(old_aggregate):
+                # All contributions to the entity were read
+                full_contributions.extend(entity_contributions)
+            else:
+                aggregate = None
+                # Contributions from bundles that already contributed to the
+                # entity, typically deletions, can only be accounted for by
+                # rebuilding the aggregate. Since those contributions were
+                # excluded when reading, we detect them by their number.
+                num_old_contributions = old_aggregate.num_contributions
+                if num_old_contributions + len(entity_contributions) == num_contributions:
+                    aggregate = self._merge_aggregate(old_aggregate,
+                                                      entity_contributions,
+                                                      num_contributions)
+                if aggregate is None:
+                    log.info('Rebuilding aggregate for %s with %i contribution(s)',
+                             entity, num_contributions)
+                    rebuilds[entity] = num_contributions
+                else:
+                    log.info('Merged %i contribution(s) into aggregate for %s',
+                             len(entity_contributions), entity)
+                    yield aggregate
+        yield from self._aggregate(full_contributions)
+        if rebuilds:
+            yield from self._aggregate(self._read_contributions(rebuilds))
+
+    def _merge_aggregate(self,
+                         old_aggregate: Aggregate,
+                         contributions: list[CataloguedContribution],
+                         num_contributions: int
+                         ) -> Optional[Aggregate]:
+        """
+        Incorporate the given contributions into a copy of the given aggregate,
+        or return None if that's not possible. All contributions must come from
+        bundles that don't already contribute to the aggregate.
+        """
+        entity = old_aggregate.coordinates.entity
+        state = old_aggregate.accumulators
+        old_bundle_uuids = set(state['bundles'])
+        assert not any(
+            c.coordinates.bundle.uuid in old_bundle_uuids
+            for c in contributions
+        ), (entity, contributions)
+        transformer = self._transformers()[entity.catalog, entity.entity_type]
+        contributions_by_entity, _ = self._select_contributions(contributions)
+        contributions = contributions_by_entity.get(entity, [])
+        new_contents = self._reconcile(transformer, contributions) if contributions else {}
+
+        # Only inner entities that are new to the aggregate need to be
+        # accumulated. An inner entity that was already accumulated would have
+        # to be reconciled with the new copy, which is only possible if the
+        # copies are identical.
+        digests = {
+            entity_type: dict(entity_digests)
+            for entity_type, entity_digests in state['entities'].items()
+        }
+        additions: dict[EntityType, Entities] = {}
+        for entity_type, entities in new_contents.items():
+            these_digests = digests.setdefault(entity_type, {})
+            these_additions = additions.setdefault(entity_type, [])
+            for inner_entity in entities:
+                inner_entity_id = transformer.inner_entity_id(entity_type, inner_entity)
+                digest = self._digest(inner_entity)
+                old_digest = these_digests.get(inner_entity_id)
+                if old_digest is None:
+                    these_digests[inner_entity_id] = digest
+                    these_additions.append(inner_entity)
+                elif old_digest != digest:
+                    log.info('Inner entity %s/%s of %s differs from the one '
+                             'already incorporated into the aggregate',
+                             entity_type, inner_entity_id, entity)
+                    return None
+
+        contents, aggregator_states = {}, {}
+        inner_entity_types = transformer.inner_entity_types()
+        old_contents = old_aggregate.contents
+        entity_types = [*old_contents.keys(), *additions.keys() - old_contents.keys()]
+        for entity_type in entity_types:
+            entities = additions.get(entity_type, [])
+            aggregator = None if entity_type in inner_entity_types else transformer.aggregator(entity_type)
+            if aggregator is None:
+                entities = [*old_contents.get(entity_type, []), *entities]
+                if entity_type in inner_entity_types:
+                    assert len(entities) <= 1
+            else:
+                aggregator_state = state['aggregators'].get(entity_type)
+                entities, aggregator_state = aggregator.resume(aggregator_state, entities)
+                if aggregator_state is None:
+                    return None
+                aggregator_states[entity_type] = aggregator_state
+            contents[entity_type] = entities
+
+        new_bundle_uuids = {c.coordinates.bundle.uuid for c in contributions}
+        bundles = old_aggregate.bundles + [
+            BundleFQIDJSON(uuid=c.coordinates.bundle.uuid,
+                           version=c.coordinates.bundle.version)
+            for c in contributions
+        ]
+        aggregate_cls = self.aggregate_class(entity.catalog)
+        if TYPE_CHECKING:  # work around https://youtrack.jetbrains.com/issue/PY-44728
+            aggregate_cls = Aggregate
+        return aggregate_cls(coordinates=old_aggregate.coordinates,
+                             version=old_aggregate.version,
+                             sources=old_aggregate.sources | {c.source for c in contributions},
+                             contents=contents,
+                             bundles=bundles[:self.max_aggregated_bundles],
+                             num_contributions=num_contributions,
+                             accumulators=self._accumulators(entity,
+                                                             bundle_uuids=old_bundle_uuids | new_bundle_uuids,
+                                                             digests=digests,
+                                                             aggregator_states=aggregator_states))
+
+    def _accumulators(self,
+                      entity: CataloguedEntityReference,
+                      *,
+                      bundle_uuids: Iterable[BundleUUID],
+                      digests: Mapping[EntityType, Mapping[EntityID, str]],
+                      aggregator_states: Mapping[EntityType, AnyJSON]
+                      ) -> Optional[JSON]:
+        """
+        Return the accumulator state to be stored in the aggregate for the
+        given entity, or None if the state exceeds
+        :attr:`max_accumulators_size`.
+        """
+        accumulators = {
+            # The UUIDs of all bundles that contributed to the entity,
+            # including those whose contributions were superseded or deleted
+            'bundles': sorted(bundle_uuids),
+            # A digest of every reconciled inner entity, by type and ID
+            'entities': digests,
+            # The state of the aggregator for every inner entity type that
+            # requires aggregation
+            'aggregators': aggregator_states
+        }
+        size = len(json.dumps(accumulators))
+        if size > self.max_accumulators_size:
+            log.warning('Not storing %i characters of accumulator state for %r, '
+                        'exceeding the limit of %i. The aggregate will be rebuilt '
+                        'from scratch when it is next updated.',
+                        size, entity, self.max_accumulators_size)
+            return None
+        else:
+            log.debug('Storing %i characters of accumulator state for %r', size, entity)
+            return accumulators
+
+    @classmethod
+    def _digest(cls, entity: JSON) -> str:
+        entity = json.dumps(entity, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(entity.encode()).hexdigest()
+
+    @cache
+    def _transformers(self) -> Mapping[tuple[CatalogName, EntityType], Type[Transformer]]:
+        """
+        A lookup for transformer by catalog and entity type
+        """
+        return {
+            (catalog, transformer_cls.entity_type()): transformer_cls
+            for catalog in config.catalogs
+            for transformer_cls in self.transformer_types(catalog)
+        }
+
+    # FIXME: Replace hard coded limit with a config property
+    #       https://github.com/DataBiosphere/azul/issues/3725
+    max_aggregated_bundles = 100
+
+    def _select_contributions(self,
+                              contributions: list[CataloguedContribution]
+                              ) -> tuple[dict[CataloguedEntityReference, list[CataloguedContribution]],
+                                         dict[CataloguedEntityReference, set[BundleUUID]]]:
+        """
+        For each entity and bundle, select the most recent contribution that is
+        not a deletion.
+
+        :return: A tuple of two dictionaries, the first containing the selected
+                 contributions to each entity, the second containing the UUIDs
+                 of all bundles contributing to each entity, regardless of
+                 whether any contribution by a bundle was selected.
+        """
         # Group contributions by entity and bundle UUID
         contributions_by_bundle: Mapping[
             tuple[CataloguedEntityReference, BundleUUID],
             list[CataloguedContribution]
         ] = defaultdict(list)
-        tallies: MutableCataloguedTallies = Counter()
+        bundle_uuids: dict[CataloguedEntityReference, set[BundleUUID]] = defaultdict(set)
         for contribution in contributions:
             entity = contribution.coordinates.entity
             bundle_uuid = contribution.coordinates.bundle.uuid
             contributions_by_bundle[entity, bundle_uuid].append(contribution)
-            # Track the raw, unfiltered number of contributions per entity.
-            assert isinstance(contribution.coordinates.entity, CataloguedEntityReference)
-            tallies[contribution.coordinates.entity] += 1
+            bundle_uuids[entity].add(bundle_uuid)
 
         # For each entity and bundle, find the most recent contribution that is
         # not a deletion
@@ -623,37 +1439,57 @@ class IndexService(DocumentService):
                     assert entity == contribution.coordinates.entity
                     contributions_by_entity[entity].append(contribution)
                     break
-        log.info('Selected %i contribution(s) to be aggregated.',
-                 sum(len(contributions) for contributions in contributions_by_entity.values()))
-        if log.isEnabledFor(logging.DEBUG):
-            log.debug(
-                'Number of contributions selected for aggregation, by entity: %r',
-                {
-                    f'{entity.entity_type}/{entity.entity_id}': len(contributions)
-                    for entity, contributions in sorted(contributions_by_entity.items())
-                }
-            )
+        return contributions_by_entity, bundle_uuids
 
-        # Create lookup for transformer by entity type
-        transformers: dict[tuple[CatalogName, str], Type[Transformer]] = {
-            (catalog, transformer_cls.entity_type()): transformer_cls
-            for catalog in config.catalogs
-            for transformer_cls in self.transformer_types(catalog)
-        }
+    def _group_contributions(self,
+                             contributions: Iterable[CataloguedContribution]
+                             ) -> Iterator[tuple[CataloguedEntityReference,
+                                                 list[CataloguedContribution]]]:
+        """
+        Group the given contributions by the entity they contribute to. The
+        contributions to any given entity must be consecutive. Only the
+        contributions to one entity are held in memory at any given time.
+        """
+        entities = set()
+        for entity, group in groupby(contributions, key=attrgetter('coordinates.entity')):
+            assert isinstance(entity, CataloguedEntityReference)
+            assert entity not in entities, ('Contributions not grouped by entity', entity)
+            entities.add(entity)
+            yield entity, list(group)
 
-        # Aggregate contributions for the same entity
-        aggregates = []
-        for entity, contributions in contributions_by_entity.items():
-            transformer = transformers[entity.catalog, entity.entity_type]
-            contents = self._aggregate_entity(transformer, contributions)
+    def _aggregate(self,
+                   contributions: Iterable[CataloguedContribution]
+                   ) -> Iterator[Aggregate]:
+        """
+        Aggregate the given contributions, yielding the aggregate for an entity
+        as soon as the last contribution to that entity was consumed. The
+        contributions to any given entity must be consecutive.
+        """
+        num_read, num_selected = 0, 0
+        for entity, contributions in self._group_contributions(contributions):
+            # Track the raw, unfiltered number of contributions to the entity
+            num_contributions = len(contributions)
+            contributions_by_entity, bundle_uuids = self._select_contributions(contributions)
+            contributions = contributions_by_entity.get(entity, [])
+            num_read += num_contributions
+            num_selected += len(contributions)
+            log.debug('Selected %i out of %i contribution(s) to %s/%s for aggregation',
+                      len(contributions), num_contributions,
+                      entity.entity_type, entity.entity_id)
+            if not contributions:
+                continue
+            transformer = self._transformers()[entity.catalog, entity.entity_type]
+            contents, accumulators = self._aggregate_entity(transformer, contributions)
+            if accumulators is not None:
+                accumulators = self._accumulators(entity,
+                                                  bundle_uuids=bundle_uuids[entity],
+                                                  **accumulators)
             bundles = [
                 BundleFQIDJSON(uuid=c.coordinates.bundle.uuid,
                                version=c.coordinates.bundle.version)
                 for c in contributions
             ]
-            # FIXME: Replace hard coded limit with a config property
-            #       https://github.com/DataBiosphere/azul/issues/3725
-            max_bundles = 100
+            max_bundles = self.max_aggregated_bundles
             if len(bundles) > max_bundles:
                 log.warning('Only aggregating %i out of %i bundles for outer entity %r',
                             max_bundles, len(bundles), entity)
@@ -662,24 +1498,34 @@ class IndexService(DocumentService):
             aggregate_cls = self.aggregate_class(entity.catalog)
             if TYPE_CHECKING:  # work around https://youtrack.jetbrains.com/issue/PY-44728
                 aggregate_cls = Aggregate
-            aggregate = aggregate_cls(coordinates=AggregateCoordinates(entity=entity),
-                                      version=None,
-                                      sources=sources,
-                                      contents=contents,
-                                      bundles=bundles,
-                                      num_contributions=tallies[entity])
-            aggregates.append(aggregate)
-
-        return aggregates
+            yield aggregate_cls(coordinates=AggregateCoordinates(entity=entity),
+                                version=None,
+                                sources=sources,
+                                contents=contents,
+                                bundles=bundles,
+                                num_contributions=num_contributions,
+                                accumulators=accumulators)
+        log.info('Aggregated %i out of %i contribution(s).', num_selected, num_read)
 
     def _aggregate_entity(self,
                           transformer: Type[Transformer],
                           contributions: list[Contribution]
-                          ) -> JSON:
+                          ) -> tuple[JSON, Optional[MutableJSON]]:
+        """
+        Aggregate the given contributions to an entity.
+
+        :return: A tuple containing the contents of the aggregate and, if
+                 incremental aggregation is enabled and supported by all
+                 aggregators involved, the keyword arguments to
+                 :meth:`_accumulators` other than `bundle_uuids`. Otherwise,
+                 the second element is None.
+        """
         contents = self._reconcile(transformer, contributions)
         aggregate_contents = {}
         inner_entity_types = transformer.inner_entity_types()
         inner_entity_counts = []
+        incremental = config.incremental_aggregation
+        aggregator_states = {}
         for entity_type, entities in contents.items():
             num_entities = len(entities)
             if entity_type in inner_entity_types:
@@ -688,11 +1534,29 @@ class IndexService(DocumentService):
             else:
                 aggregator = transformer.aggregator(entity_type)
                 if aggregator is not None:
-                    entities = aggregator.aggregate(entities)
+                    if incremental:
+                        entities, aggregator_state = aggregator.resume(None, entities)
+                        if aggregator_state is None:
+                            incremental = False
+                        else:
+                            aggregator_states[entity_type] = aggregator_state
+                    else:
+                        entities = aggregator.aggregate(entities)
             aggregate_contents[entity_type] = entities
         if inner_entity_counts:
             assert sum(inner_entity_counts) > 0
-        return aggregate_contents
+        if incremental:
+            digests = {
+                entity_type: {
+                    transformer.inner_entity_id(entity_type, entity): self._digest(entity)
+                    for entity in entities
+                }
+                for entity_type, entities in contents.items()
+            }
+            accumulators = dict(digests=digests, aggregator_states=aggregator_states)
+        else:
+            accumulators = None
+        return aggregate_contents, accumulators
 
     def _reconcile(self,
                    transformer: Type[Transformer],
@@ -774,36 +1638,28 @@ class IndexWriter:
         self.errors: dict[DocumentCoordinates, int] = defaultdict(int)
         self.conflicts: dict[DocumentCoordinates, int] = defaultdict(int)
         self.retries: Optional[MutableSet[DocumentCoordinates]] = None
+        self.written: Optional[MutableSet[DocumentCoordinates]] = None
+        self.stats: Optional[IndexWriterStats] = None
 
-    bulk_threshold = 32
+    #: The chunk size is shared by all writers in a process so that what is
+    #: learned about the cluster's responsiveness isn't lost between the
+    #: invocations of a warm Lambda function.
+    #:
+    chunk_sizer: 'BulkChunkSizer'
 
     def write(self, documents: list[Document]):
         """
         Make an attempt to write the documents into the index, updating local
-        state with failures and conflicts
+        state with failures and conflicts. The documents are always written
+        using the ``_bulk`` API, even if there are only a few of them, in as
+        few requests as the adaptive chunk size permits. The counters for the
+        attempt are recorded in :attr:`stats`.
 
         :param documents: Documents to index
         """
         self.retries = set()
-        if len(documents) < self.bulk_threshold:
-            self._write_individually(documents)
-        else:
-            self._write_bulk(documents)
-
-    def _write_individually(self, documents: Iterable[Document]):
-        log.info('Writing documents individually')
-        for doc in documents:
-            try:
-                method = self.es_client.delete if doc.delete else self.es_client.index
-                method(refresh=self.refresh, **doc.to_index(self.catalog, self.field_types))
-            except ConflictError as e:
-                self._on_conflict(doc, e)
-            except ElasticsearchException as e:
-                self._on_error(doc, e)
-            else:
-                self._on_success(doc)
-
-    def _write_bulk(self, documents: Iterable[Document]):
+        self.written = set()
+        self.stats = IndexWriterStats()
         # FIXME: document this quirk
         documents: dict[DocumentCoordinates, Document] = {
             doc.coordinates.with_catalog(self.catalog): doc
@@ -812,43 +1668,113 @@ class IndexWriter:
             doc.coordinates: doc
             for doc in documents
         }
-        actions = [
-            doc.to_index(self.catalog, self.field_types, bulk=True)
-            for doc in documents.values()
-        ]
-        log.info('Writing documents using streaming_bulk().')
-        # We cannot use parallel_bulk() for 1024+ actions because Lambda doesn't
-        # support shared memory. See the issue below for details.
-        #
-        # https://github.com/DataBiosphere/azul/issues/3200
-        #
-        # Another caveat to keep in mind is that streaming_bulk() may still
-        # exceed the maximum request size if one or more actions exceed it.
-        # There is no way to split a single action and hence a single document
-        # into multiple requests.
-        #
-        response = streaming_bulk(client=self.es_client,
-                                  actions=actions,
-                                  refresh=self.refresh,
-                                  raise_on_error=False,
-                                  max_chunk_bytes=config.max_chunk_size)
-        for success, info in response:
-            op_type, info = one(info.items())
-            assert op_type in ('index', 'create', 'delete')
-            coordinates = DocumentCoordinates.from_hit(info)
-            doc = documents[coordinates]
-            if success:
-                self._on_success(doc)
-            else:
-                if info['status'] == 409:
+        chunks = self._chunk(documents.values())
+        if self.max_concurrent_chunks == 1:
+            for chunk in chunks:
+                self._on_chunk(documents, chunk, self._send_chunk(chunk))
+        else:
+            # Lambda lacks the shared memory needed by parallel_bulk(), which
+            # is based on multiprocessing, so we use a thread pool instead.
+            # The callbacks are invoked on this thread, in the order of the
+            # documents, just like they are when writing sequentially.
+            #
+            # https://github.com/DataBiosphere/azul/issues/3200
+            #
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_chunks,
+                                    thread_name_prefix='bulk') as tpe:
+                futures: deque[tuple[BulkChunk, Future[BulkResult]]] = deque()
+
+                def process_oldest():
+                    chunk, future = futures.popleft()
+                    self._on_chunk(documents, chunk, future.result())
+
+                for chunk in chunks:
+                    if len(futures) == self.max_concurrent_chunks:
+                        process_oldest()
+                    futures.append((chunk, tpe.submit(self._send_chunk, chunk)))
+                while futures:
+                    process_oldest()
+        log.info('Wrote %i document(s) totalling %i byte(s) in %i bulk '
+                 'request(s) taking %.3fs combined', self.stats.documents,
+                 self.stats.bytes, self.stats.requests, self.stats.duration)
+
+    #: The maximum number of bulk requests in flight at any given time. Each
+    #: request occupies a connection to ES, and the client's connection pool
+    #: is limited to `config.es_pool_size` connections per host. Specify 1 to
+    #: write the chunks sequentially on the calling thread.
+    #:
+    max_concurrent_chunks = 4
+
+    def _chunk(self, documents: Iterable[Document]) -> Iterator['BulkChunk']:
+        # Note that a chunk may still exceed the maximum request size if a
+        # single action does. There is no way to split a single action and
+        # hence a single document into multiple requests.
+        serializer = self.es_client.transport.serializer
+        # The limits may change while the chunks are written
+        max_bytes, max_actions = self.chunk_sizer.limits()
+        chunk = BulkChunk()
+        for doc in documents:
+            action, source = expand_action(doc.to_index(self.catalog,
+                                                        self.field_types,
+                                                        bulk=True))
+            lines = [serializer.dumps(action)]
+            if source is not None:
+                lines.append(serializer.dumps(source))
+            # +1 for the trailing newline of each line
+            size = sum(len(line.encode()) + 1 for line in lines)
+            if chunk.lines and (chunk.size + size > max_bytes
+                                or len(chunk.documents) == max_actions):
+                chunk.full = True
+                yield chunk
+                chunk = BulkChunk()
+                max_bytes, max_actions = self.chunk_sizer.limits()
+            chunk.documents.append(doc)
+            chunk.lines.extend(lines)
+            chunk.size += size
+        if chunk.lines:
+            yield chunk
+
+    def _send_chunk(self, chunk: 'BulkChunk') -> 'BulkResult':
+        start = time.perf_counter()
+        try:
+            response = self.es_client.bulk(body='\n'.join(chunk.lines) + '\n',
+                                           refresh=self.refresh)
+        except ElasticsearchException as e:
+            duration = time.perf_counter() - start
+            if isinstance(e, ConnectionTimeout):
+                self.chunk_sizer.on_timeout(chunk)
+            return BulkResult(error=e, duration=duration)
+        else:
+            duration = time.perf_counter() - start
+            self.chunk_sizer.on_response(chunk, duration)
+            return BulkResult(items=response['items'], duration=duration)
+
+    def _on_chunk(self,
+                  documents: Mapping[DocumentCoordinates, Document],
+                  chunk: 'BulkChunk',
+                  result: 'BulkResult'):
+        self.stats.record(chunk, result.duration)
+        if result.error is None:
+            assert len(result.items) == len(chunk.documents)
+            for item in result.items:
+                op_type, info = one(item.items())
+                assert op_type in ('index', 'create', 'delete'), op_type
+                doc = documents[DocumentCoordinates.from_hit(info)]
+                if 200 <= info.get('status', 500) < 300:
+                    self._on_success(doc)
+                elif info['status'] == 409:
                     self._on_conflict(doc, info)
                 else:
                     self._on_error(doc, info)
+        else:
+            for doc in chunk.documents:
+                self._on_error(doc, result.error)
 
     def _on_success(self, doc: Document):
         coordinates = doc.coordinates
         self.conflicts.pop(coordinates, None)
         self.errors.pop(coordinates, None)
+        self.written.add(coordinates)
         if isinstance(doc, Aggregate):
             log.debug('Successfully wrote %s with %i contribution(s).',
                       coordinates, doc.num_contributions)
@@ -890,5 +1816,144 @@ class IndexWriter:
                                (len(self.errors), len(self.conflicts)))
 
 
+@attrs.define(kw_only=True)
+class BulkChunk:
+    """
+    The serialized actions for the documents in a single ``_bulk`` request
+    """
+    documents: list[Document] = attrs.field(factory=list)
+    lines: list[str] = attrs.field(factory=list)
+    size: int = 0
+
+    #: True, if the chunk was cut short by the chunk size limits, as opposed
+    #: to running out of documents.
+    #:
+    full: bool = False
+
+
+@attrs.frozen(kw_only=True)
+class BulkResult:
+    """
+    The outcome of a single ``_bulk`` request
+    """
+    #: The items of the response, one per action in the request
+    #:
+    items: Optional[JSONs] = None
+
+    #: The exception raised by the request, if it failed as a whole
+    #:
+    error: Optional[ElasticsearchException] = None
+
+    duration: float
+
+
+@attrs.define(kw_only=True)
+class IndexWriterStats:
+    """
+    Counters for an attempt at writing documents to the index. The duration
+    is the sum of the durations of all requests, which exceeds the elapsed
+    time if requests were made concurrently.
+    """
+    documents: int = 0
+    bytes: int = 0
+    requests: int = 0
+    duration: float = 0.0
+
+    def record(self, chunk: BulkChunk, duration: float):
+        self.documents += len(chunk.documents)
+        self.bytes += chunk.size
+        self.requests += 1
+        self.duration += duration
+
+
+class BulkChunkSizer:
+    """
+    Determines the maximum size of ``_bulk`` requests from the observed
+    throughput, such that a request is expected to take no longer than
+    :attr:`target_duration`. The size is bounded by :attr:`min_chunk_size` and
+    the maximum request size permitted by the cluster.
+
+    Only full chunks contribute to the throughput estimate since the duration
+    of smaller requests is dominated by latency, not by the amount of data
+    transferred. A timeout halves the chunk size.
+
+    >>> sizer = BulkChunkSizer(max_chunk_size=1000, min_chunk_size=10)
+    >>> sizer.limits()
+    (1000, 500)
+
+    >>> sizer.target_duration = 1.0
+    >>> sizer.on_response(BulkChunk(size=1000, full=True), 4.0)
+    >>> sizer.limits()
+    (250, 500)
+
+    >>> sizer.on_response(BulkChunk(size=5, full=False), 10.0)
+    >>> sizer.limits()
+    (250, 500)
+
+    >>> sizer.on_timeout(BulkChunk(size=250))
+    >>> sizer.limits()
+    (125, 500)
+
+    >>> for _ in range(10):
+    ...     sizer.on_timeout(BulkChunk(size=125))
+    >>> sizer.limits()
+    (10, 500)
+    """
+
+    #: The desired duration of a single ``_bulk`` request in seconds
+    #:
+    target_duration = 10.0
+
+    #: The weight of the most recent observation in the exponentially
+    #: weighted moving average of the throughput
+    #:
+    smoothing = 0.5
+
+    #: The maximum number of actions in a request, the default of the
+    #: ``streaming_bulk()`` helper
+    #:
+    max_actions = 500
+
+    def __init__(self, *, max_chunk_size: int, min_chunk_size: int):
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_size = min_chunk_size
+        self._lock = threading.Lock()
+        self._chunk_size = max_chunk_size
+        self._throughput: Optional[float] = None
+
+    def limits(self) -> tuple[int, int]:
+        """
+        The current maximum number of bytes and actions in a request
+        """
+        with self._lock:
+            return self._chunk_size, self.max_actions
+
+    def on_response(self, chunk: BulkChunk, duration: float):
+        if chunk.full and duration > 0:
+            with self._lock:
+                throughput = chunk.size / duration
+                if self._throughput is not None:
+                    a = self.smoothing
+                    throughput = a * throughput + (1 - a) * self._throughput
+                self._throughput = throughput
+                self._resize(int(throughput * self.target_duration))
+
+    def on_timeout(self, chunk: BulkChunk):
+        with self._lock:
+            self._throughput = None
+            self._resize(min(self._chunk_size, chunk.size) // 2)
+
+    def _resize(self, chunk_size: int):
+        chunk_size = max(self.min_chunk_size, min(self.max_chunk_size, chunk_size))
+        if chunk_size != self._chunk_size:
+            log.info('Changing maximum size of bulk requests from %i to %i bytes',
+                     self._chunk_size, chunk_size)
+            self._chunk_size = chunk_size
+
+
+IndexWriter.chunk_sizer = BulkChunkSizer(max_chunk_size=config.max_chunk_size,
+                                         min_chunk_size=256 * 1024)
+
+
 class EventualConsistencyException(RuntimeError):
     pass
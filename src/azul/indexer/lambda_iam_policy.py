@@ -123,6 +123,46 @@ policy = {
                 f"arn:aws:s3:::{config.s3_bucket}/health/*",
             ]
         },
+        *(
+            [
+                {
+                    "Effect": "Allow",
+                    "Action": [
+                        "s3:GetObject",
+                        "s3:PutObject"
+                    ],
+                    "Resource": [
+                        f"arn:aws:s3:::{config.tdr_lineage_cache_s3_path}*"
+                    ]
+                },
+                {
+                    "Effect": "Allow",
+                    "Action": [
+                        "s3:ListBucket"  # Without this, GetObject yields 403 for missing keys, not 404
+                    ],
+                    "Resource": [
+                        f"arn:aws:s3:::{config.tdr_lineage_cache_s3_path.partition('/')[0]}"
+                    ],
+                    "Condition": {
+                        "StringLike": {
+                            "s3:prefix": [
+                                f"{config.tdr_lineage_cache_s3_path.partition('/')[2]}*"
+                            ]
+                        }
+                    }
+                }
+            ] if config.tdr_lineage_cache_s3_path is not None else []
+        ),
+        {
+            "Effect": "Allow",
+            "Action": [
+                "dynamodb:UpdateItem"
+            ],
+            "Resource": [
+                f"arn:aws:dynamodb:{aws.region_name}:{aws.account}:table/"
+                f"{config.dynamo_generations_table_name}"
+            ]
+        },
         {
             "Effect": "Allow",
             "Action": [
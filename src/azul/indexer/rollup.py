@@ -0,0 +1,340 @@
+from abc import (
+    ABCMeta,
+    abstractmethod,
+)
+from collections.abc import (
+    Iterable,
+    Mapping,
+    Sequence,
+)
+import hashlib
+import json
+from typing import (
+    TYPE_CHECKING,
+)
+
+import attrs
+
+from azul import (
+    CatalogName,
+    config,
+)
+from azul.indexer.document import (
+    DocumentType,
+    EntityID,
+    EntityType,
+    IndexName,
+)
+from azul.plugins import (
+    FieldPath,
+    MetadataPlugin,
+)
+from azul.types import (
+    AnyJSON,
+    JSON,
+    MutableJSON,
+)
+
+if TYPE_CHECKING:
+    # Only needed for type hints, would otherwise introduce a circular import
+    from azul.indexer.document_service import (
+        DocumentService,
+    )
+
+
+def merge_rollup(rollup: MutableJSON, delta: JSON, factor: int = 1) -> None:
+    """
+    Add the numbers in the given delta, multiplied by the given factor, to the
+    corresponding numbers in the given rollup, modifying the rollup in place.
+    Numbers that become zero are removed from the rollup, and so are nested
+    dictionaries that become empty. This function mirrors the `merge` function
+    of the Painless script in :attr:`SummaryRollup.ledger_script`.
+
+    >>> r = {}
+    >>> merge_rollup(r, {'docs': 2, 'formats': {'bam': {'docs': 2, 'size': 9}}})
+    >>> r
+    {'docs': 2, 'formats': {'bam': {'docs': 2, 'size': 9}}}
+
+    >>> merge_rollup(r, {'docs': 1, 'formats': {'fastq': {'docs': 1, 'size': 0}}})
+    >>> r
+    {'docs': 3, 'formats': {'bam': {'docs': 2, 'size': 9}, 'fastq': {'docs': 1}}}
+
+    >>> merge_rollup(r, {'docs': 2, 'formats': {'bam': {'docs': 2, 'size': 9}}}, -1)
+    >>> r
+    {'docs': 1, 'formats': {'fastq': {'docs': 1}}}
+
+    >>> merge_rollup(r, r, -1)
+    >>> r
+    {}
+    """
+    for key, value in list(delta.items()):
+        if isinstance(value, dict):
+            inner = rollup.setdefault(key, {})
+            merge_rollup(inner, value, factor)
+            if not inner:
+                del rollup[key]
+        else:
+            assert isinstance(value, (int, float)), value
+            value = rollup.get(key, 0) + factor * value
+            if value == 0:
+                rollup.pop(key, None)
+            else:
+                rollup[key] = value
+
+
+def _flatten(values: Iterable[AnyJSON]) -> Iterable[AnyJSON]:
+    for value in values:
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+
+def field_values(contents: JSON, path: FieldPath) -> list[AnyJSON]:
+    """
+    The values of the field at the given path into the given aggregate
+    contents, with lists flattened the way ES flattens them when indexing the
+    contents.
+
+    >>> field_values({'f': [{'s': 1}, {'s': [2, None]}, {}]}, ('f', 's'))
+    [1, 2, None]
+
+    >>> field_values({'f': [{'s': 1}]}, ('g', 's'))
+    []
+    """
+    values = [contents]
+    for element in path:
+        values = [
+            value[element]
+            for value in _flatten(values)
+            if element in value
+        ]
+    return list(_flatten(values))
+
+
+@attrs.frozen(kw_only=True)
+class SummaryRollup(metaclass=ABCMeta):
+    """
+    A precomputed summary of the aggregates of some of the entity types in a
+    catalog. Every aggregate contributes a dictionary of numbers to the rollup.
+    These contributions are additive.
+
+    The rollup for an entity type is split into partitions, one for every set
+    of sources an aggregate belongs to and every prefix of the entity ID, so
+    that concurrent indexer invocations rarely update the same partition. The
+    contributions to a partition are recorded in its ledger document, by
+    entity ID, along with their sum. The indexer sets the contribution of
+    every aggregate it writes in the ledger, which is idempotent, and then
+    copies the sum to the total document of the partition. The service
+    answers summary requests that are only restricted by source by adding up
+    the total documents of the partitions for the requested sources.
+    """
+    service: 'DocumentService'
+    catalog: CatalogName
+
+    #: The length of the entity ID prefix that determines the partition an
+    #: aggregate contributes to. Longer prefixes mean smaller ledgers and fewer
+    #: conflicts between concurrent updates, but more total documents to add up
+    #: for every summary.
+    #:
+    partition_prefix_length = 2
+
+    #: Sets the contributions, by entity ID, passed as a parameter in the ledger
+    #: document and adjusts the sum of the contributions accordingly, creating
+    #: the document if necessary. An empty contribution removes the entity from
+    #: the ledger. Integers are added as longs so that large sums don't
+    #: overflow.
+    #:
+    ledger_script = '''
+void merge(Map rollup, Map delta, long factor) {
+    for (entry in delta.entrySet()) {
+        def key = entry.getKey();
+        def value = entry.getValue();
+        if (value instanceof Map) {
+            Map inner = rollup.computeIfAbsent(key, k -> new HashMap());
+            merge(inner, value, factor);
+            if (inner.isEmpty()) {
+                rollup.remove(key);
+            }
+        } else {
+            def current = rollup.getOrDefault(key, 0);
+            boolean integral = (current instanceof Integer || current instanceof Long)
+                               && (value instanceof Integer || value instanceof Long);
+            def sum = integral ? (long) current + factor * (long) value
+                               : (double) current + factor * (double) value;
+            if (sum == 0) {
+                rollup.remove(key);
+            } else {
+                rollup.put(key, sum);
+            }
+        }
+    }
+}
+Map contributions = ctx._source.contributions;
+Map rollup = ctx._source.rollup;
+boolean modified = false;
+for (entry in params.contributions.entrySet()) {
+    def entityId = entry.getKey();
+    Map contribution = entry.getValue();
+    Map old = contributions.get(entityId);
+    if (old == null ? !contribution.isEmpty() : !old.equals(contribution)) {
+        if (old != null) {
+            merge(rollup, old, -1);
+        }
+        if (contribution.isEmpty()) {
+            contributions.remove(entityId);
+        } else {
+            merge(rollup, contribution, 1);
+            contributions.put(entityId, contribution);
+        }
+        modified = true;
+    }
+}
+if (!modified) {
+    ctx.op = 'noop';
+}
+'''
+
+    #: Replaces the sum in the total document of a partition with the sum in
+    #: the given version of the ledger document, unless the total document
+    #: already reflects a later version of the ledger.
+    #:
+    total_script = '''
+if (params.version >= ctx._source.version) {
+    ctx._source.version = params.version;
+    ctx._source.rollup = params.rollup;
+} else {
+    ctx.op = 'noop';
+}
+'''
+
+    #: The mapping of the rollup indices. The contents of ledger and total
+    #: documents are opaque to ES. Like aggregates, ledger and total documents
+    #: list their sources, so that deindexing a source removes the partitions
+    #: of all aggregates it contributed to.
+    #:
+    mapping = {
+        'properties': {
+            'kind': {
+                'type': 'keyword'
+            },
+            'sources': {
+                'properties': {
+                    'id': MetadataPlugin.string_mapping
+                }
+            },
+            'version': {
+                'type': 'long'
+            },
+            'contributions': {
+                'type': 'object',
+                'enabled': False
+            },
+            'rollup': {
+                'type': 'object',
+                'enabled': False
+            }
+        }
+    }
+
+    @classmethod
+    def index_name(cls, catalog: CatalogName, entity_type: EntityType) -> str:
+        return str(IndexName.create(catalog=catalog,
+                                    entity_type=entity_type,
+                                    doc_type=DocumentType.rollup))
+
+    @classmethod
+    def partition(cls, entity_id: EntityID) -> str:
+        """
+        The partition the aggregate of the entity with the given ID contributes
+        to, within the rollup for its set of sources.
+
+        >>> SummaryRollup.partition('6b7a9c3e-1b52-4e1f-a4f1-2b0b6c5a3a5d')
+        '6b'
+        """
+        return entity_id[:cls.partition_prefix_length]
+
+    @classmethod
+    def document_id(cls,
+                    kind: str,
+                    source_ids: Iterable[str],
+                    partition: str
+                    ) -> str:
+        """
+        The ID of the ledger or total document of the partition for the given
+        set of sources.
+
+        :param kind: Either 'ledger' or 'total'
+
+        >>> f = SummaryRollup.document_id
+        >>> f('total', ['b', 'a'], '6b') == f('total', ['a', 'b', 'a'], '6b')
+        True
+
+        >>> f('total', ['a'], '6b') == f('ledger', ['a'], '6b')
+        False
+        """
+        assert kind in ('ledger', 'total'), kind
+        key = json.dumps([kind, sorted(set(source_ids)), partition])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    @property
+    @abstractmethod
+    def entity_types(self) -> Sequence[EntityType]:
+        """
+        The entity types whose aggregates contribute to the rollup
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def contribution(self, entity_type: EntityType, contents: JSON) -> MutableJSON:
+        """
+        The contribution of an aggregate of the given entity type and with the
+        given contents to the rollup. An aggregate without contents does not
+        contribute to the rollup. In order to keep the size of the ledgers in
+        check, the contribution should not depend on how many aggregates share
+        a value. Counting distinct values shared by many aggregates is better
+        left to a `cardinality` aggregation.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def aggregations(self, rollups: Mapping[EntityType, JSON]) -> MutableJSON:
+        """
+        Translate the given rollups, one per entity type, to the aggregations
+        expected by the summary response stage of the metadata plugin for the
+        authorities that are covered by the rollup.
+        """
+        raise NotImplementedError
+
+    def _keys(self, contents: JSON, path: FieldPath) -> set[str]:
+        """
+        The distinct values of the field at the given path into the given
+        aggregate contents, in the form they are indexed in.
+        """
+        field_type = self.service.field_type(self.catalog, ('contents', *path))
+        return set(map(field_type.to_index, field_values(contents, path)))
+
+    def _sum(self, contents: JSON, path: FieldPath) -> int | float:
+        """
+        The sum of the values of the field at the given path into the given
+        aggregate contents, ignoring null values, like a `sum` aggregation on
+        the shadow copy of the field would.
+        """
+        return sum(value for value in field_values(contents, path) if value is not None)
+
+    def _terms(self,
+               path: FieldPath,
+               doc_counts: Mapping[str, int]
+               ) -> list[tuple[AnyJSON, str, int]]:
+        """
+        Return a tuple of value, indexed key and document count for each of
+        the given document counts by indexed key of the field at the given
+        path, in the order in which ES returns the buckets of a `terms`
+        aggregation and limited to the same number of buckets.
+        """
+        field_type = self.service.field_type(self.catalog, ('contents', *path))
+        terms = sorted(doc_counts.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            (field_type.from_index(key), key, doc_count)
+            for key, doc_count in terms[:config.terms_aggregation_size]
+        ]
@@ -1,3 +1,7 @@
+from collections.abc import (
+    Iterator,
+    Mapping,
+)
 from copy import (
     copy,
     deepcopy,
@@ -195,3 +199,36 @@ def json_head(n: int, o: AnyJSON) -> str:
         if buf.tell() > n:
             break
     return buf.getvalue()[:n]
+
+
+def json_chunks(o: Mapping[str, Union[AnyJSON, Iterator[AnyJSON]]]) -> Iterator[str]:
+    """
+    Serialize the given JSON object in chunks, without whitespace between
+    tokens. The value of a top-level property of the object can be an iterator
+    in place of a JSON array. The iterator's elements are consumed and
+    serialized one at a time so that the array never needs to exist in memory
+    in its entirety. Any other value is serialized in one chunk.
+
+    >>> list(json_chunks({'a': iter([{'b': [1, 2]}, None]), 'c': {'d': 'e'}}))
+    ['{', '"a":', '[', '{"b":[1,2]}', ',', 'null', ']', ',"c":', '{"d":"e"}', '}']
+
+    >>> ''.join(json_chunks({'a': iter([])}))
+    '{"a":[]}'
+
+    >>> json.loads(''.join(json_chunks({'a': iter(range(3)), 'b': None})))
+    {'a': [0, 1, 2], 'b': None}
+    """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    yield '{'
+    for i, (k, v) in enumerate(o.items()):
+        yield (',' if i else '') + encode(k) + ':'
+        if isinstance(v, Iterator):
+            yield '['
+            for j, e in enumerate(v):
+                if j:
+                    yield ','
+                yield encode(e)
+            yield ']'
+        else:
+            yield encode(v)
+    yield '}'
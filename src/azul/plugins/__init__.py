@@ -65,6 +65,9 @@ from azul.types import (
 )
 
 if TYPE_CHECKING:
+    from azul.indexer.rollup import (
+        SummaryRollup,
+    )
     from azul.service.elasticsearch_service import (
         AggregationStage,
         FilterStage,
@@ -293,7 +296,12 @@ class MetadataPlugin(Plugin[BUNDLE]):
                 # > is required, it is advised to duplicate the content of the _id
                 # > field into another field that has doc_values enabled.
                 #
-                'entity_id': self.string_mapping
+                'entity_id': self.string_mapping,
+                # The state of incremental aggregation is opaque to ES
+                'accumulators': {
+                    'type': 'object',
+                    'enabled': False
+                }
             },
             'dynamic_templates': [
                 {
@@ -411,6 +419,15 @@ class MetadataPlugin(Plugin[BUNDLE]):
     def search_response_stage(self) -> 'Type[SearchResponseStage]':
         raise NotImplementedError
 
+    @property
+    @abstractmethod
+    def summary_rollup(self) -> 'Optional[Type[SummaryRollup]]':
+        """
+        The class of the summary rollups maintained by the indexer, or None if
+        summaries can only be computed from the aggregates.
+        """
+        raise NotImplementedError
+
     @property
     @abstractmethod
     def summary_aggregation_stage(self) -> 'Type[AggregationStage]':
@@ -581,6 +598,17 @@ class RepositoryPlugin(Plugin[BUNDLE],
         """
         raise NotImplementedError
 
+    def fetch_bundles(self, bundle_fqids: Sequence[BUNDLE_FQID]) -> list[BUNDLE]:
+        """
+        Fetch the given bundles, in the given order. Subclasses should override
+        this method if they can fetch multiple bundles more efficiently than
+        one at a time, which is what the default implementation does.
+
+        :param bundle_fqids: The fully qualified IDs of the bundles to fetch,
+                             including their source.
+        """
+        return [self.fetch_bundle(bundle_fqid) for bundle_fqid in bundle_fqids]
+
     @abstractmethod
     def portal_db(self) -> JSONs:
         """
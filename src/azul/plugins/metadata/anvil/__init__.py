@@ -289,6 +289,10 @@ class Plugin(MetadataPlugin[AnvilBundle]):
     def search_response_stage(self) -> 'Type[AnvilSearchResponseStage]':
         return AnvilSearchResponseStage
 
+    @property
+    def summary_rollup(self) -> None:
+        return None
+
     @property
     def summary_aggregation_stage(self) -> 'Type[AnvilSummaryAggregationStage]':
         return AnvilSummaryAggregationStage
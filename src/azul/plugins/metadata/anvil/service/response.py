@@ -85,7 +85,7 @@ class AnvilSearchResponseStage(SearchResponseStage):
     def process_response(self, response: ResponseTriple) -> MutableJSON:
         hits, pagination, aggs = response
         return dict(
-            hits=list(map(self._make_hit, hits)),
+            hits=map(self._make_hit, hits),
             pagination=pagination,
             termFacets=dict(zip(aggs.keys(), map(self._make_terms, aggs.values())))
         )
@@ -24,6 +24,9 @@ from azul.plugins.metadata.hca.bundle import (
 from azul.plugins.metadata.hca.indexer.aggregate import (
     HCAAggregate,
 )
+from azul.plugins.metadata.hca.indexer.rollup import (
+    HCASummaryRollup,
+)
 from azul.plugins.metadata.hca.indexer.transform import (
     BaseTransformer,
     BundleTransformer,
@@ -400,6 +403,10 @@ class Plugin(MetadataPlugin[HCABundle]):
     def search_response_stage(self) -> Type[HCASearchResponseStage]:
         return HCASearchResponseStage
 
+    @property
+    def summary_rollup(self) -> Type[HCASummaryRollup]:
+        return HCASummaryRollup
+
     @property
     def summary_aggregation_stage(self) -> Type[HCASummaryAggregationStage]:
         return HCASummaryAggregationStage
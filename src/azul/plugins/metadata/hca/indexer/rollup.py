@@ -0,0 +1,156 @@
+from collections.abc import (
+    Mapping,
+    Sequence,
+)
+
+from azul.indexer.document import (
+    EntityType,
+)
+from azul.indexer.rollup import (
+    SummaryRollup,
+    field_values,
+)
+from azul.plugins import (
+    FieldPath,
+)
+from azul.types import (
+    JSON,
+    MutableJSON,
+)
+
+
+class HCASummaryRollup(SummaryRollup):
+    """
+    Mirrors the aggregations made by the summary aggregation stage of the HCA
+    plugin for files, projects and cell suspensions. Sums and document counts
+    are added up as they are, the cardinality of laboratories is maintained as
+    the number of aggregates per laboratory so that laboratories can be
+    removed again. The aggregations for samples include the cardinality of
+    donors and specimens, most of which only occur in a handful of aggregates.
+    Maintaining those as part of the rollup would require state proportional
+    to the number of donors and specimens, so samples are left to the summary
+    aggregation stage.
+    """
+
+    @property
+    def entity_types(self) -> Sequence[EntityType]:
+        return 'files', 'projects', 'cell_suspensions'
+
+    def contribution(self, entity_type: EntityType, contents: JSON) -> MutableJSON:
+        if not contents:
+            return {}
+
+        def doc_counts(*path: str) -> MutableJSON:
+            return dict.fromkeys(self._keys(contents, path), 1)
+
+        if entity_type == 'files':
+            size = self._sum(contents, ('files', 'size'))
+            matrix_cell_count = self._sum(contents, ('files', 'matrix_cell_count'))
+            return {
+                'docs': 1,
+                'size': size,
+                'formats': {
+                    key: {
+                        'docs': 1,
+                        'size': size,
+                        'matrix_cell_count': matrix_cell_count
+                    }
+                    for key in self._keys(contents, ('files', 'file_format'))
+                }
+            }
+        elif entity_type == 'projects':
+            project_cells = ('projects', 'estimated_cell_count')
+            cell_suspension_cells = ('cell_suspensions', 'total_estimated_cells')
+            return {
+                'docs': 1,
+                'labs': doc_counts('projects', 'laboratory'),
+                'cellSuspensionCellCount': {
+                    self._bucket(contents, cell_suspension_cells): self._sum(contents, project_cells)
+                },
+                'projectCellCount': {
+                    self._bucket(contents, project_cells): self._sum(contents, cell_suspension_cells)
+                }
+            }
+        elif entity_type == 'cell_suspensions':
+            cells = self._sum(contents, ('cell_suspensions', 'total_estimated_cells'))
+            return {
+                'organs': {
+                    key: {
+                        'docs': 1,
+                        'cells': cells
+                    }
+                    for key in self._keys(contents, ('cell_suspensions', 'organ'))
+                }
+            }
+        else:
+            assert False, entity_type
+
+    def _bucket(self, contents: JSON, path: FieldPath) -> str:
+        """
+        The `filters` bucket the aggregate with the given contents falls into,
+        see :meth:`HCASummaryAggregationStage.prepare_request`.
+        """
+        values = field_values(contents, path)
+        has_some = bool(values) and not any(value is None or value == 0 for value in values)
+        return 'hasSome' if has_some else 'hasNone'
+
+    def aggregations(self, rollups: Mapping[EntityType, JSON]) -> MutableJSON:
+        files, projects, cell_suspensions = (
+            rollups.get(entity_type, {})
+            for entity_type in self.entity_types
+        )
+
+        def doc_counts(rollup: Mapping[str, JSON]) -> Mapping[str, int]:
+            return {key: value.get('docs', 0) for key, value in rollup.items()}
+
+        def cardinality(rollup: JSON, name: str) -> JSON:
+            return {'value': len(rollup.get(name, {}))}
+
+        def cell_counts(parent: str, child: str) -> JSON:
+            sums = projects.get(parent + 'CellCount', {})
+            return {
+                'buckets': {
+                    bucket: {child + 'CellCount': {'value': float(sums.get(bucket, 0))}}
+                    for bucket in ('hasSome', 'hasNone')
+                }
+            }
+
+        formats = files.get('formats', {})
+        organs = cell_suspensions.get('organs', {})
+        return {
+            'totalFileSize': {'value': float(files.get('size', 0))},
+            'fileFormat': {
+                'doc_count': files.get('docs', 0),
+                'myTerms': {
+                    'buckets': [
+                        {
+                            'key': value,
+                            'doc_count': doc_count,
+                            'size_by_type': {
+                                'value': float(formats[key].get('size', 0))
+                            },
+                            'matrix_cell_count_by_type': {
+                                'value': float(formats[key].get('matrix_cell_count', 0))
+                            }
+                        }
+                        for value, key, doc_count in self._terms(('files', 'file_format'),
+                                                                 doc_counts(formats))
+                    ]
+                }
+            },
+            'project': {'doc_count': projects.get('docs', 0)},
+            'labCount': cardinality(projects, 'labs'),
+            'cellSuspensionCellCount': cell_counts('cellSuspension', 'project'),
+            'projectCellCount': cell_counts('project', 'cellSuspension'),
+            'cellCountSummaries': {
+                'buckets': [
+                    {
+                        'key': value,
+                        'doc_count': doc_count,
+                        'cellCount': {'value': float(organs[key].get('cells', 0))}
+                    }
+                    for value, key, doc_count in self._terms(('cell_suspensions', 'organ'),
+                                                             doc_counts(organs))
+                ]
+            }
+        }
@@ -17,6 +17,9 @@ from datetime import (
 from enum import (
     Enum,
 )
+from functools import (
+    wraps,
+)
 import logging
 import re
 from typing import (
@@ -447,6 +450,32 @@ class Entity(Protocol):
     document_id: api.UUID4
 
 
+InnerEntityFactory = Callable[['BaseTransformer', api.Entity], MutableJSON]
+
+
+def _memoized(f: InnerEntityFactory) -> InnerEntityFactory:
+    """
+    Decorate a method converting an entity into an inner entity such that it
+    is invoked at most once per entity and transformer instance. Entities like
+    donors and specimens are typically shared by many files in a bundle and
+    transformer instances are short-lived, being specific to a bundle.
+
+    Callers must not modify the returned inner entity.
+    """
+
+    @wraps(f)
+    def wrapper(self: 'BaseTransformer', entity: api.Entity) -> MutableJSON:
+        key = f.__name__, entity.document_id
+        try:
+            inner_entity = self._inner_entities[key]
+        except KeyError:
+            inner_entity = f(self, entity)
+            self._inner_entities[key] = inner_entity
+        return inner_entity
+
+    return wrapper
+
+
 class DatedEntity(Entity, Protocol):
     submission_date: datetime
     update_date: datetime
@@ -493,6 +522,53 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
         else:
             return SimpleAggregator()
 
+    @cached_property
+    def _inner_entities(self) -> dict[tuple[str, api.UUID4], MutableJSON]:
+        """
+        Memoized inner entities, by name of the method that created them and
+        document ID of the entity they represent, see :func:`_memoized`
+        """
+        return {}
+
+    @cached_property
+    def _ancestor_cache(self) -> dict[api.UUID4, Mapping[api.UUID4, api.LinkedEntity]]:
+        return {}
+
+    @cached_property
+    def _ancestor_sample_cache(self) -> dict[api.UUID4, Mapping[str, Sample]]:
+        return {}
+
+    def _ancestors(self,
+                   entity: api.LinkedEntity
+                   ) -> Mapping[api.UUID4, api.LinkedEntity]:
+        """
+        The distinct ancestors of the given entity, by document ID and in the
+        order in which :meth:`api.LinkedEntity.ancestors` first visits them.
+        The result is memoized so that the ancestors shared by many entities in
+        a bundle are only traversed once.
+        """
+        try:
+            return self._ancestor_cache[entity.document_id]
+        except KeyError:
+            ancestors = {}
+            for parent in entity.parents.values():
+                for ancestor_id, ancestor in self._ancestors(parent).items():
+                    ancestors.setdefault(ancestor_id, ancestor)
+                ancestors.setdefault(parent.document_id, parent)
+            self._ancestor_cache[entity.document_id] = ancestors
+            return ancestors
+
+    def _visit_ancestors(self,
+                         entity: api.LinkedEntity,
+                         visitor: api.EntityVisitor
+                         ) -> None:
+        """
+        Equivalent to ``entity.ancestors(visitor)`` but visits every ancestor
+        only once.
+        """
+        for ancestor in self._ancestors(entity).values():
+            visitor.visit(ancestor)
+
     def _find_ancestor_samples(self,
                                entity: api.LinkedEntity,
                                samples: dict[str, Sample]
@@ -507,16 +583,25 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
         :param samples: the dictionary into which to place found ancestor
                         samples, by their document ID
         """
-        if isinstance(entity, sample_types):
-            samples[str(entity.document_id)] = entity
-        else:
-            for parent in entity.parents.values():
-                self._find_ancestor_samples(parent, samples)
+        samples.update(self._ancestor_samples(entity))
+
+    def _ancestor_samples(self, entity: api.LinkedEntity) -> Mapping[str, Sample]:
+        try:
+            return self._ancestor_sample_cache[entity.document_id]
+        except KeyError:
+            if isinstance(entity, sample_types):
+                samples = {str(entity.document_id): entity}
+            else:
+                samples = {}
+                for parent in entity.parents.values():
+                    samples.update(self._ancestor_samples(parent))
+            self._ancestor_sample_cache[entity.document_id] = samples
+            return samples
 
     def _visit_file(self, file):
         visitor = TransformerVisitor()
         file.accept(visitor)
-        file.ancestors(visitor)
+        self._visit_ancestors(file, visitor)
         samples: dict[str, Sample] = dict()
         self._find_ancestor_samples(file, samples)
         return visitor, samples
@@ -655,6 +740,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'estimated_cell_count': null_int
         }
 
+    @_memoized
     def _project(self, project: api.Project) -> MutableJSON:
         # Store lists of all values of each of these facets to allow facet filtering
         # and term counting on the webservice
@@ -712,6 +798,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             '_type': null_str
         }
 
+    @_memoized
     def _specimen(self, specimen: api.SpecimenFromOrganism) -> MutableJSON:
         return {
             **self._biomaterial(specimen),
@@ -740,6 +827,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'organ_part': [null_str]
         }
 
+    @_memoized
     def _cell_suspension(self, cell_suspension: api.CellSuspension) -> MutableJSON:
         organs = set()
         organ_parts = set()
@@ -778,6 +866,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'model_organ': null_str
         }
 
+    @_memoized
     def _cell_line(self, cell_line: api.CellLine) -> MutableJSON:
         # noinspection PyDeprecation
         return {
@@ -800,6 +889,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'donor_count': null_int
         }
 
+    @_memoized
     def _donor(self, donor: api.DonorOrganism) -> MutableJSON:
         if donor.organism_age is None:
             require(donor.organism_age_unit is None)
@@ -835,6 +925,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'model_organ_part': null_str
         }
 
+    @_memoized
     def _organoid(self, organoid: api.Organoid) -> MutableJSON:
         return {
             **self._biomaterial(organoid),
@@ -957,6 +1048,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'workflow': null_str
         }
 
+    @_memoized
     def _analysis_protocol(self, protocol: api.AnalysisProtocol) -> MutableJSON:
         return {
             **self._entity(protocol),
@@ -971,6 +1063,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'assay_type': pass_thru_json
         }
 
+    @_memoized
     def _imaging_protocol(self, protocol: api.ImagingProtocol) -> MutableJSON:
         return {
             **self._entity(protocol),
@@ -985,6 +1078,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'nucleic_acid_source': null_str
         }
 
+    @_memoized
     def _library_preparation_protocol(self,
                                       protocol: api.LibraryPreparationProtocol
                                       ) -> MutableJSON:
@@ -1002,6 +1096,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'paired_end': null_bool
         }
 
+    @_memoized
     def _sequencing_protocol(self, protocol: api.SequencingProtocol) -> MutableJSON:
         return {
             **self._entity(protocol),
@@ -1015,6 +1110,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             **cls._entity_types(),
         }
 
+    @_memoized
     def _sequencing_process(self, process: api.Process) -> MutableJSON:
         return {
             **self._entity(process),
@@ -1027,6 +1123,7 @@ class BaseTransformer(Transformer, metaclass=ABCMeta):
             'sequencing_input_type': null_str,
         }
 
+    @_memoized
     def _sequencing_input(self, sequencing_input: api.Biomaterial) -> MutableJSON:
         return {
             **self._biomaterial(sequencing_input),
@@ -1512,7 +1609,7 @@ class CellSuspensionTransformer(PartitionedTransformer):
             self._find_ancestor_samples(cell_suspension, samples)
             visitor = TransformerVisitor()
             cell_suspension.accept(visitor)
-            cell_suspension.ancestors(visitor)
+            self._visit_ancestors(cell_suspension, visitor)
             contents = dict(self._samples(samples.values()),
                             sequencing_inputs=list(
                                 map(self._sequencing_input, visitor.sequencing_inputs.values())
@@ -1557,7 +1654,7 @@ class SampleTransformer(PartitionedTransformer):
         for sample in samples:
             visitor = TransformerVisitor()
             sample.accept(visitor)
-            sample.ancestors(visitor)
+            self._visit_ancestors(sample, visitor)
             contents = dict(self._samples([sample]),
                             sequencing_inputs=list(
                                 map(self._sequencing_input, visitor.sequencing_inputs.values())
@@ -1631,11 +1728,11 @@ class SingletonTransformer(BaseTransformer, metaclass=ABCMeta):
         visitor = TransformerVisitor()
         for specimen in self.api_bundle.specimens:
             specimen.accept(visitor)
-            specimen.ancestors(visitor)
+            self._visit_ancestors(specimen, visitor)
         samples: dict[str, Sample] = dict()
         for file in self.api_bundle.files.values():
             file.accept(visitor)
-            file.ancestors(visitor)
+            self._visit_ancestors(file, visitor)
             self._find_ancestor_samples(file, samples)
         matrices = [
             self._matrix(file)
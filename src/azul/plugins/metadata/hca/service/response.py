@@ -1,4 +1,6 @@
 from collections.abc import (
+    Iterable,
+    Iterator,
     Mapping,
     Sequence,
 )
@@ -23,6 +25,10 @@ from more_itertools import (
 from azul import (
     CatalogName,
 )
+from azul.plugins import (
+    DocumentSlice,
+    FieldGlobs,
+)
 from azul.plugins.metadata.hca.service.contributor_matrices import (
     make_stratification_tree,
 )
@@ -113,7 +119,9 @@ class SummarizedHit(Hit):
 
 
 class SearchResponse(TypedDict):
-    hits: list[Union[SummarizedHit, CompleteHit]]
+    #: An iterator if the response is to be serialized incrementally
+    hits: Union[list[Union[SummarizedHit, CompleteHit]],
+                Iterator[Union[SummarizedHit, CompleteHit]]]
     pagination: ResponsePagination
     termFacets: dict[str, Terms]
 
@@ -267,6 +275,10 @@ class SummaryResponseFactory:
 
 class HCASearchResponseStage(SearchResponseStage):
 
+    @property
+    def document_slice(self) -> DocumentSlice:
+        return DocumentSlice(includes=SearchResponseFactory.field_globs(self.entity_type))
+
     def process_response(self, response: ResponseTriple) -> SearchResponse:
         hits, pagination, aggs = response
         factory = SearchResponseFactory(hits=hits,
@@ -274,7 +286,7 @@ class HCASearchResponseStage(SearchResponseStage):
                                         aggs=aggs,
                                         entity_type=self.entity_type,
                                         catalog=self.catalog)
-        return factory.make_response()
+        return factory.make_response(lazy=True)
 
 
 # FIXME: Merge into HCASearchResponseStage
@@ -284,7 +296,7 @@ class SearchResponseFactory:
 
     def __init__(self,
                  *,
-                 hits: JSONs,
+                 hits: Iterable[JSON],
                  pagination: ResponsePagination,
                  aggs: JSON,
                  entity_type: str,
@@ -296,10 +308,120 @@ class SearchResponseFactory:
         self.entity_type = entity_type
         self.catalog = catalog
 
-    def make_response(self) -> SearchResponse:
+    def make_response(self, *, lazy: bool = False) -> SearchResponse:
+        """
+        :param lazy: If True, the hits in the response are an iterator that
+                     makes each hit as it is consumed, otherwise they are a
+                     list.
+        """
         return SearchResponse(pagination=self.pagination,
                               termFacets=self.make_facets(),
-                              hits=self.make_hits())
+                              hits=self.iter_hits() if lazy else self.make_hits())
+
+    @classmethod
+    def field_globs(cls, entity_type: str) -> FieldGlobs:
+        """
+        The properties of the aggregate documents of the given entity type
+        that are read by :meth:`make_hit`. Any changes to the properties read
+        by the methods below must be reflected here.
+        """
+
+        def contents(inner_entity_type: str, *field_names: str) -> FieldGlobs:
+            return [
+                f'contents.{inner_entity_type}.{field_name}'
+                for field_name in field_names
+            ]
+
+        specimen_fields = [
+            'biomaterial_id',
+            'organ',
+            'organ_part',
+            'disease',
+            'preservation_method',
+            '_source'
+        ]
+        cell_line_fields = ['biomaterial_id', 'cell_line_type', 'model_organ']
+        organoid_fields = ['biomaterial_id', 'model_organ', 'model_organ_part']
+        globs = [
+            'entity_id',
+            'sources.id',
+            'sources.spec',
+            *contents('analysis_protocols', 'workflow'),
+            *contents('imaging_protocols', 'assay_type'),
+            *contents('library_preparation_protocols',
+                      'library_construction_approach',
+                      'nucleic_acid_source'),
+            *contents('sequencing_protocols',
+                      'instrument_manufacturer_model',
+                      'paired_end'),
+            *contents('dates',
+                      'aggregate_last_modified_date',
+                      'aggregate_submission_date',
+                      'aggregate_update_date',
+                      'last_modified_date',
+                      'submission_date',
+                      'update_date'),
+            *contents('projects',
+                      'document_id',
+                      'project_title',
+                      'project_short_name',
+                      'laboratory',
+                      'estimated_cell_count'),
+            *contents('specimens', *specimen_fields),
+            *contents('cell_suspensions', *(v for _, v in cls.cell_suspension_fields)),
+            *contents('cell_lines', *cell_line_fields),
+            *contents('donors',
+                      'biomaterial_id',
+                      'donor_count',
+                      'development_stage',
+                      'genus_species',
+                      'organism_age',
+                      'organism_age_range',
+                      'biological_sex',
+                      'diseases'),
+            *contents('organoids', *organoid_fields),
+            *contents('sample_specimens', 'document_id', *specimen_fields),
+            *contents('sample_cell_lines', 'document_id', *cell_line_fields),
+            *contents('sample_organoids', 'document_id', *organoid_fields)
+        ]
+        if entity_type == 'projects':
+            globs.extend([
+                *contents('projects',
+                          'project_description',
+                          'contributors',
+                          'publications',
+                          'supplementary_links',
+                          'accessions'),
+                'contents.matrices',
+                'contents.contributed_analyses'
+            ])
+        if entity_type in ('files', 'bundles'):
+            globs.extend([
+                'bundles.uuid',
+                'bundles.version',
+                *contents('files',
+                          'content_description',
+                          'file_format',
+                          'is_intermediate',
+                          'name',
+                          'sha256',
+                          'size',
+                          'file_source',
+                          'uuid',
+                          'version',
+                          'matrix_cell_count',
+                          'drs_uri')
+            ])
+        else:
+            globs.extend(contents('files',
+                                  'count',
+                                  'file_source',
+                                  'size',
+                                  'matrix_cell_count',
+                                  'file_format',
+                                  'is_intermediate',
+                                  'content_description'))
+        return globs
 
     def make_bundles(self, entry) -> MutableJSONs:
         return [
@@ -509,7 +631,10 @@ class SearchResponseFactory:
         ]
 
     def make_hits(self) -> MutableJSONs:
-        return list(map(self.make_hit, self.hits))
+        return list(self.iter_hits())
+
+    def iter_hits(self) -> Iterator[MutableJSON]:
+        return map(self.make_hit, self.hits)
 
     def make_hit(self, es_hit) -> MutableJSON:
         hit = Hit(protocols=self.make_protocols(es_hit),
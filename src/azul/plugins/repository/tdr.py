@@ -213,6 +213,15 @@ class TDRPlugin(RepositoryPlugin[BUNDLE, SOURCE_SPEC, SOURCE_REF, BUNDLE_FQID]):
                  time.time() - now, bundle.uuid, bundle.version)
         return bundle
 
+    def fetch_bundles(self, bundle_fqids: Sequence[TDRBundleFQID]) -> list[TDRBundle]:
+        for bundle_fqid in bundle_fqids:
+            self._assert_source(bundle_fqid.source)
+        now = time.time()
+        bundles = self._emulate_bundles(bundle_fqids)
+        log.info('It took %.003fs to download %i bundle(s)',
+                 time.time() - now, len(bundles))
+        return bundles
+
     def portal_db(self) -> Sequence[JSON]:
         return []
 
@@ -237,6 +246,14 @@ class TDRPlugin(RepositoryPlugin[BUNDLE, SOURCE_SPEC, SOURCE_REF, BUNDLE_FQID]):
     def _emulate_bundle(self, bundle_fqid: TDRBundleFQID) -> TDRBundle:
         raise NotImplementedError
 
+    def _emulate_bundles(self, bundle_fqids: Sequence[TDRBundleFQID]) -> list[TDRBundle]:
+        """
+        Emulate the given bundles, in the given order. Subclasses should
+        override this method if they can share the work of emulating multiple
+        bundles, e.g., by combining the queries made for each bundle.
+        """
+        return [self._emulate_bundle(bundle_fqid) for bundle_fqid in bundle_fqids]
+
     def drs_client(self,
                    authentication: Optional[Authentication] = None
                    ) -> DRSClient:
@@ -4,6 +4,13 @@ from collections import (
 from concurrent.futures import (
     ThreadPoolExecutor,
 )
+from contextlib import (
+    contextmanager,
+)
+from contextvars import (
+    ContextVar,
+    copy_context,
+)
 from itertools import (
     groupby,
     islice,
@@ -11,14 +18,21 @@ from itertools import (
 import json
 import logging
 from operator import (
+    attrgetter,
     itemgetter,
 )
+from threading import (
+    Lock,
+)
+import time
 from typing import (
     Any,
     ClassVar,
     Iterable,
+    Iterator,
     Mapping,
     Optional,
+    Sequence,
     Union,
     cast,
 )
@@ -61,6 +75,10 @@ from azul.plugins.repository.tdr import (
     TDRBundleFQID,
     TDRPlugin,
 )
+from azul.plugins.repository.tdr_hca.lineage import (
+    LineageIndex,
+    LineageStore,
+)
 from azul.terra import (
     SourceRef as TDRSourceRef,
     TDRSourceSpec,
@@ -298,6 +316,49 @@ class TDRHCABundle(HCABundle[TDRBundleFQID], TDRBundle):
             return None
 
 
+@attr.s(auto_attribs=True, kw_only=True)
+class BundleQueryReport:
+    """
+    The cost and latency of the BigQuery queries made while emulating a single
+    bundle. Every query pays the startup latency of a BigQuery job, and
+    on-demand pricing bills a minimum of 10 MiB for every table referenced by
+    a query, so the number of queries and table references are a measure of
+    the cost of emulating a bundle.
+    """
+    latencies: list[float] = attr.ib(factory=list)
+    num_tables: int = 0
+    num_rows: int = 0
+    _lock: Lock = attr.ib(factory=Lock, eq=False, repr=False)
+
+    def record(self, *, num_tables: int, num_rows: int, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.num_tables += num_tables
+            self.num_rows += num_rows
+
+    @property
+    def num_queries(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def latency(self) -> float:
+        return sum(self.latencies)
+
+    def to_json(self) -> JSON:
+        return {
+            'queries': self.num_queries,
+            'tables': self.num_tables,
+            'rows': self.num_rows,
+            'latency': round(self.latency, 3),
+            'latencies': [round(latency, 3) for latency in self.latencies]
+        }
+
+
+#: The report for the bundle currently being emulated
+#:
+_current_query_report: ContextVar[BundleQueryReport] = ContextVar('_current_query_report')
+
+
 class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]):
 
     def list_partitions(self,
@@ -340,7 +401,7 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
                               query: str,
                               group_by: str
                               ) -> list[BigQueryRow]:
-        iter_rows = self._run_sql(query)
+        iter_rows = self._run_entity_sql(query)
         key = itemgetter(group_by)
         groups = groupby(sorted(iter_rows, key=key), key=key)
         return [self._choose_one_version(source, group) for _, group in groups]
@@ -354,57 +415,157 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
         else:
             return max(versioned_items, key=itemgetter('version'))
 
+    @contextmanager
+    def _query_report(self, bundle_fqids: Sequence[TDRBundleFQID]) -> Iterator[BundleQueryReport]:
+        """
+        Record the cost and latency of the queries made in the body of the
+        context, including those made by worker threads started with a copy of
+        the current context, and log a report about them afterwards.
+        """
+        report = BundleQueryReport()
+        token = _current_query_report.set(report)
+        try:
+            yield report
+        finally:
+            _current_query_report.reset(token)
+        if len(bundle_fqids) == 1:
+            bundle_fqid = one(bundle_fqids)
+            subject = f'bundle {bundle_fqid.uuid}.{bundle_fqid.version}'
+        else:
+            subject = f'{len(bundle_fqids)} bundles'
+        log.info('Emulating %s took %i BigQuery queries referencing %i '
+                 'table(s) and returning %i row(s) in %.3fs: %s',
+                 subject, report.num_queries, report.num_tables,
+                 report.num_rows, report.latency, json.dumps(report.to_json()))
+
     def _emulate_bundle(self, bundle_fqid: TDRBundleFQID) -> TDRHCABundle:
-        bundle = TDRHCABundle(fqid=bundle_fqid,
-                              manifest=[],
-                              metadata_files={})
-        entities, root_entities, links_jsons = self._stitch_bundles(bundle)
-        bundle.add_entity(entity_key='links.json',
-                          entity_type='links',
-                          entity_row=self._merge_links(links_jsons),
-                          is_stitched=False)
+        return one(self._emulate_bundles([bundle_fqid]))
+
+    def _emulate_bundles(self, bundle_fqids: Sequence[TDRBundleFQID]) -> list[TDRHCABundle]:
+        """
+        Emulate the given bundles, sharing the queries for links, upstream
+        bundles and entities between all bundles from the same source.
+        """
+        bundles: dict[TDRBundleFQID, TDRHCABundle] = {}
+        key = attrgetter('source.id')
+        with self._query_report(bundle_fqids):
+            for _, group in groupby(sorted(bundle_fqids, key=key), key=key):
+                bundles.update(self._emulate_bundles_from_source(list(group)))
+        return [bundles[bundle_fqid] for bundle_fqid in bundle_fqids]
+
+    def _emulate_bundles_from_source(self,
+                                     bundle_fqids: Sequence[TDRBundleFQID]
+                                     ) -> dict[TDRBundleFQID, TDRHCABundle]:
+        source = one({bundle_fqid.source.spec for bundle_fqid in bundle_fqids})
+        stitched_bundles = self._stitch_bundles(bundle_fqids)
+        # Retrieve the entities of all bundles at once
+        entities: EntitiesByType = defaultdict(set)
+        for bundle_entities, _, _ in stitched_bundles.values():
+            for entity_type, entity_ids in bundle_entities.items():
+                entities[entity_type].update(entity_ids)
+        rows_by_type = self._retrieve_all_entities(source, entities)
+        bundles = {}
+        for bundle_fqid, stitched_bundle in stitched_bundles.items():
+            bundle_entities, root_entities, links_jsons = stitched_bundle
+            bundle = TDRHCABundle(fqid=bundle_fqid,
+                                  manifest=[],
+                                  metadata_files={})
+            bundle.add_entity(entity_key='links.json',
+                              entity_type='links',
+                              entity_row=self._merge_links(links_jsons),
+                              is_stitched=False)
+            for entity_type, entity_ids in bundle_entities.items():
+                pk_column = entity_type + '_id'
+                rows = [
+                    row
+                    for row in rows_by_type[entity_type]
+                    if row[pk_column] in entity_ids
+                ]
+                for i, row in enumerate(rows):
+                    is_stitched = EntityReference(entity_id=row[pk_column],
+                                                  entity_type=entity_type) not in root_entities
+                    bundle.add_entity(entity_key=f'{entity_type}_{i}.json',
+                                      entity_type=entity_type,
+                                      entity_row=row,
+                                      is_stitched=is_stitched)
+            bundle.manifest.sort(key=itemgetter('uuid'))
+            bundles[bundle_fqid] = bundle
+        return bundles
 
+    def _retrieve_all_entities(self,
+                               source: TDRSourceSpec,
+                               entities: EntitiesByType
+                               ) -> dict[EntityType, list[BigQueryRow]]:
+        """
+        Retrieve the given entities using the configured number of queries
+        and return the rows for each entity type, sorted by entity ID.
+        """
+        num_queries = config.num_tdr_entity_queries
+        if num_queries == 0:
+            batches = [{entity_type: entity_ids} for entity_type, entity_ids in entities.items()]
+        else:
+            batches = self._batch_entity_types(entities, num_queries)
         with ThreadPoolExecutor(max_workers=config.num_tdr_workers) as executor:
-            futures = {
-                entity_type: executor.submit(self._retrieve_entities,
-                                             bundle.fqid.source.spec,
-                                             entity_type,
-                                             entity_ids)
-                for entity_type, entity_ids in entities.items()
-            }
-            for entity_type, future in futures.items():
+            futures = [
+                # Propagate the query report to the worker thread
+                executor.submit(copy_context().run, self._retrieve_entities_by_type, source, batch)
+                for batch in batches
+            ]
+            rows_by_type: dict[EntityType, list[BigQueryRow]] = {}
+            for batch, future in zip(batches, futures):
                 e = future.exception()
                 if e is None:
-                    rows = future.result()
-                    pk_column = entity_type + '_id'
-                    rows.sort(key=itemgetter(pk_column))
-                    for i, row in enumerate(rows):
-                        is_stitched = EntityReference(entity_id=row[pk_column],
-                                                      entity_type=entity_type) not in root_entities
-                        bundle.add_entity(entity_key=f'{entity_type}_{i}.json',
-                                          entity_type=entity_type,
-                                          entity_row=row,
-                                          is_stitched=is_stitched)
+                    rows_by_type.update(future.result())
                 else:
-                    log.error('TDR worker failed to retrieve entities of type %r',
-                              entity_type, exc_info=e)
+                    log.error('TDR worker failed to retrieve entities of type(s) %r',
+                              sorted(batch.keys()), exc_info=e)
                     raise e
-        bundle.manifest.sort(key=itemgetter('uuid'))
-        return bundle
+        for entity_type, rows in rows_by_type.items():
+            rows.sort(key=itemgetter(entity_type + '_id'))
+        return rows_by_type
+
+    def _batch_entity_types(self,
+                            entities: EntitiesByType,
+                            num_batches: int
+                            ) -> list[EntitiesByType]:
+        """
+        Distribute the entity types over at most the given number of batches
+        such that the number of entities in each batch is roughly the same.
+
+        >>> plugin = Plugin(sources=set())
+        >>> plugin._batch_entity_types({'a': {1, 2, 3}, 'b': {4}, 'c': {5, 6}}, 2)
+        [{'a': {1, 2, 3}}, {'c': {5, 6}, 'b': {4}}]
+
+        >>> plugin._batch_entity_types({'a': {1}}, 2)
+        [{'a': {1}}]
+        """
+        assert num_batches > 0, num_batches
+        batches: list[EntitiesByType] = [{} for _ in range(min(num_batches, len(entities)))]
+        by_size = sorted(entities.items(), key=lambda item: (-len(item[1]), item[0]))
+        for entity_type, entity_ids in by_size:
+            batch = min(batches, key=lambda b: sum(map(len, b.values())))
+            batch[entity_type] = entity_ids
+        return batches
 
     def _stitch_bundles(self,
-                        root_bundle: 'TDRHCABundle'
-                        ) -> tuple[EntitiesByType, Entities, list[JSON]]:
+                        root_fqids: Sequence[TDRBundleFQID]
+                        ) -> dict[TDRBundleFQID, tuple[EntitiesByType, Entities, list[JSON]]]:
         """
         Recursively follow dangling inputs to collect entities from upstream
-        bundles, ensuring that no bundle is processed more than once.
+        bundles, ensuring that no bundle is processed more than once, even if
+        it is upstream of more than one of the given root bundles, all of which
+        must be from the same source.
+
+        :return: A dictionary mapping the FQID of each root bundle to the
+                 entities in the root bundle and its upstream bundles, the
+                 entities in just the root bundle, and the `links` rows of the
+                 root bundle and its upstream bundles, the root bundle's first.
         """
-        source = root_bundle.fqid.source
-        entities: EntitiesByType = defaultdict(set)
-        root_entities = None
-        unprocessed: set[TDRBundleFQID] = {root_bundle.fqid}
+        source = one({fqid.source for fqid in root_fqids})
+        unprocessed: set[TDRBundleFQID] = set(root_fqids)
         processed: set[TDRBundleFQID] = set()
-        stitched_links: list[JSON] = []
+        links_jsons: dict[TDRBundleFQID, JSON] = {}
+        links_by_fqid: dict[TDRBundleFQID, Links] = {}
         # Retrieving links in batches eliminates the risk of exceeding
         # BigQuery's maximum query size. Using a batches size 1000 appears to be
         # equally performant as retrieving the links without batching.
@@ -414,19 +575,13 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
             links = self._retrieve_links(batch)
             processed.update(batch)
             unprocessed -= batch
-            stitched_links.extend(links.values())
             all_dangling_inputs: set[EntityReference] = set()
             for links_id, links_json in links.items():
                 project = EntityReference(entity_type='project',
                                           entity_id=links_json['project_id'])
-                links = Links.from_json(project, links_json['content'])
-                linked_entities = links.all_entities()
-                dangling_inputs = links.dangling_inputs()
-                if links_id == root_bundle.fqid:
-                    assert root_entities is None
-                    root_entities = linked_entities - dangling_inputs
-                for entity in linked_entities:
-                    entities[entity.entity_type].add(entity.entity_id)
+                links_jsons[links_id] = links_json
+                links_by_fqid[links_id] = Links.from_json(project, links_json['content'])
+                dangling_inputs = links_by_fqid[links_id].dangling_inputs()
                 if dangling_inputs:
                     log.info('There are %i dangling inputs in bundle %r', len(dangling_inputs), links_id)
                     log.debug('Dangling inputs in bundle %r: %r', links_id, dangling_inputs)
@@ -437,12 +592,33 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
                 upstream = self._find_upstream_bundles(source, all_dangling_inputs)
                 unprocessed |= upstream - processed
 
-        assert root_entities is not None
-        processed.remove(root_bundle.fqid)
-        if processed:
-            arg = f': {processed!r}' if log.isEnabledFor(logging.DEBUG) else ''
-            log.info('Stitched %i bundle(s)%s', len(processed), arg)
-        return entities, root_entities, stitched_links
+        # The upstream bundles of a bundle are those that produce its dangling
+        # inputs, as determined by _find_upstream_bundles()
+        producers: dict[EntityID, set[TDRBundleFQID]] = defaultdict(set)
+        for fqid, links in links_by_fqid.items():
+            for output in links.outputs:
+                producers[output.entity_id].add(fqid)
+
+        result = {}
+        for root_fqid in root_fqids:
+            stitched = [root_fqid]
+            for fqid in stitched:
+                for dangling_input in sorted(links_by_fqid[fqid].dangling_inputs()):
+                    for upstream_fqid in sorted(producers[dangling_input.entity_id]):
+                        if upstream_fqid not in stitched:
+                            stitched.append(upstream_fqid)
+            entities: EntitiesByType = defaultdict(set)
+            for fqid in stitched:
+                for entity in links_by_fqid[fqid].all_entities():
+                    entities[entity.entity_type].add(entity.entity_id)
+            root_links = links_by_fqid[root_fqid]
+            root_entities = root_links.all_entities() - root_links.dangling_inputs()
+            if len(stitched) > 1:
+                arg = f': {stitched[1:]!r}' if log.isEnabledFor(logging.DEBUG) else ''
+                log.info('Stitched %i bundle(s) to bundle %r%s',
+                         len(stitched) - 1, root_fqid, arg)
+            result[root_fqid] = entities, root_entities, [links_jsons[fqid] for fqid in stitched]
+        return result
 
     def _retrieve_links(self,
                         links_ids: set[TDRBundleFQID]
@@ -464,6 +640,108 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
             links_json['content'] = json.loads(links_json['content'])
         return links
 
+    def _retrieve_entities_by_type(self,
+                                   source: TDRSourceSpec,
+                                   entities: EntitiesByType
+                                   ) -> dict[EntityType, list[BigQueryRow]]:
+        """
+        Retrieve entities of one or more types from BigQuery in a single query.
+        The rows for the individual entity types are combined using UNION ALL.
+        Since the entity tables differ in their columns, each of the combined
+        rows has the union of all columns, padded with NULL where a table lacks
+        a column. The rows are then restored to the shape they would have if
+        they were retrieved by :meth:`_retrieve_entities`.
+        """
+        if len(entities) == 1:
+            entity_type, entity_ids = one(entities.items())
+            return {entity_type: self._retrieve_entities(source, entity_type, entity_ids)}
+        version_column = 'version'
+        aliases = sorted({
+            self._column_alias(column)
+            for entity_type in entities
+            for column in self._non_pk_columns(entity_type)
+        })
+        assert version_column in aliases, aliases
+        subqueries = []
+        for entity_type, entity_ids in sorted(entities.items()):
+            assert entity_type != 'links', entity_type
+            pk_column = entity_type + '_id'
+            columns = {
+                self._column_alias(column): column
+                for column in self._non_pk_columns(entity_type)
+            }
+            select = ', '.join([
+                f"'{entity_type}' AS entity_type",
+                f'{pk_column} AS entity_id',
+                *(columns.get(alias, f'{self._null("STRING")} AS {alias}') for alias in aliases)
+            ])
+            subqueries.append(f'''
+                SELECT {select}
+                FROM {backtick(self._full_table_name(source, entity_type))}
+                WHERE {self._in((pk_column,), ((f"'{entity_id}'",) for entity_id in entity_ids))}
+            ''')
+        query = self._union_all(subqueries)
+        num_entities = sum(map(len, entities.values()))
+        log.debug('Retrieving %i entities of types %r ...', num_entities, sorted(entities.keys()))
+        rows_by_key = defaultdict(list)
+        for row in self._run_entity_sql(query, num_tables=len(entities)):
+            rows_by_key[row['entity_type'], row['entity_id']].append(row)
+        log.debug('Retrieved %i entities of types %r', len(rows_by_key), sorted(entities.keys()))
+        result = {}
+        for entity_type, entity_ids in entities.items():
+            pk_column = entity_type + '_id'
+            columns = list(map(self._column_alias, self._non_pk_columns(entity_type)))
+            rows = result[entity_type] = []
+            for entity_id in entity_ids:
+                versions = rows_by_key.get((entity_type, entity_id))
+                if versions is not None:
+                    row = self._choose_one_version(source, versions)
+                    rows.append({
+                        pk_column: entity_id,
+                        **{column: row[column] for column in columns}
+                    })
+            missing = entity_ids - {row[pk_column] for row in rows}
+            require(not missing,
+                    f'Required entities not found in '
+                    f'{backtick(self._full_table_name(source, entity_type))}: {missing}')
+        return result
+
+    def _non_pk_columns(self, entity_type: EntityType) -> set[str]:
+        return (
+            TDRHCABundle.links_columns if entity_type == 'links'
+            else TDRHCABundle.data_columns if entity_type.endswith('_file')
+            else TDRHCABundle.metadata_columns
+        )
+
+    def _column_alias(self, column: str) -> str:
+        """
+        The name of the given column in the rows returned by BigQuery
+
+        >>> plugin = Plugin(sources=set())
+        >>> plugin._column_alias('JSON_EXTRACT_SCALAR(content, "$.schema_type") AS schema_type')
+        'schema_type'
+
+        >>> plugin._column_alias('content')
+        'content'
+        """
+        return column.rpartition(' AS ')[2]
+
+    def _run_entity_sql(self, query: str, *, num_tables: int = 1) -> list[BigQueryRow]:
+        """
+        Run the given query, recording its cost and latency in the report for
+        the bundle currently being emulated, if any.
+
+        :param num_tables: The number of tables referenced by the query
+        """
+        report = _current_query_report.get(None)
+        start = time.perf_counter()
+        rows = list(self._run_sql(query))
+        if report is not None:
+            report.record(num_tables=num_tables,
+                          num_rows=len(rows),
+                          latency=time.perf_counter() - start)
+        return rows
+
     def _retrieve_entities(self,
                            source: TDRSourceSpec,
                            entity_type: EntityType,
@@ -481,11 +759,7 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
         """
         pk_column = entity_type + '_id'
         version_column = 'version'
-        non_pk_columns = (
-            TDRHCABundle.links_columns if entity_type == 'links'
-            else TDRHCABundle.data_columns if entity_type.endswith('_file')
-            else TDRHCABundle.metadata_columns
-        )
+        non_pk_columns = self._non_pk_columns(entity_type)
         assert version_column in non_pk_columns
         table_name = backtick(self._full_table_name(source, entity_type))
         entity_id_type = one(set(map(type, entity_ids)))
@@ -535,6 +809,22 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
 
         return join(columns) + ' IN ' + join(map(join, values))
 
+    def _union_all(self, queries: Iterable[str]) -> str:
+        """
+        >>> plugin = Plugin(sources=set())
+        >>> plugin._union_all(['SELECT 1', 'SELECT 2'])
+        'SELECT 1 UNION ALL SELECT 2'
+        """
+        return ' UNION ALL '.join(query.strip() for query in queries)
+
+    def _null(self, type_: str) -> str:
+        """
+        >>> plugin = Plugin(sources=set())
+        >>> plugin._null('STRING')
+        'CAST(NULL AS STRING)'
+        """
+        return f'CAST(NULL AS {type_})'
+
     def _find_upstream_bundles(self,
                                source: TDRSourceRef,
                                outputs: Entities) -> set[TDRBundleFQID]:
@@ -543,26 +833,59 @@ class Plugin(TDRPlugin[TDRHCABundle, TDRSourceSpec, TDRSourceRef, TDRBundleFQID]
         entities.
         """
         output_ids = [output.entity_id for output in outputs]
+        location = config.tdr_lineage_cache
+        # The contents of a dataset can change without its ID changing, so only
+        # the lineage of snapshots can be cached
+        if location is not None and source.spec.is_snapshot:
+            store = LineageStore.for_location(location)
+            lineage = store.get(source.id, lambda: self._build_lineage(source))
+            return {
+                TDRBundleFQID(source=source, uuid=uuid, version=version)
+                for uuid, version in lineage.upstream_bundles(output_ids)
+            }
+        else:
+            rows = self._query_lineage(source, output_ids)
+            bundles = set()
+            outputs_found = set()
+            for row in rows:
+                bundles.add(TDRBundleFQID(source=source,
+                                          uuid=row['links_id'],
+                                          version=self.format_version(row['version'])))
+                outputs_found.add(row['output_id'])
+            missing = set(output_ids) - outputs_found
+            require(not missing,
+                    f'Dangling inputs not found in any bundle: {missing}')
+            return bundles
+
+    def _build_lineage(self, source: TDRSourceRef) -> LineageIndex:
+        rows = self._query_lineage(source)
+        return LineageIndex.from_rows(
+            dict(row, version=self.format_version(row['version']))
+            for row in rows
+        )
+
+    def _query_lineage(self,
+                       source: TDRSourceRef,
+                       output_ids: Optional[list[EntityID]] = None
+                       ) -> list[BigQueryRow]:
+        """
+        Return a row for every output of every process link in the given
+        source, optionally restricted to outputs with the given IDs, containing
+        the output's ID and the UUID and version of the bundle with the link.
+        """
         output_id = 'JSON_EXTRACT_SCALAR(link_output, "$.output_id")'
-        rows = self._run_sql(f'''
+        if output_ids is None:
+            output_filter = 'TRUE'
+        else:
+            output_filter = f'{output_id} IN UNNEST({output_ids})'
+        return self._run_entity_sql(f'''
             SELECT links_id, version, {output_id} AS output_id
             FROM {backtick(self._full_table_name(source.spec, 'links'))} AS links
                 JOIN UNNEST(JSON_EXTRACT_ARRAY(links.content, '$.links')) AS content_links
                     ON JSON_EXTRACT_SCALAR(content_links, '$.link_type') = 'process_link'
                 JOIN UNNEST(JSON_EXTRACT_ARRAY(content_links, '$.outputs')) AS link_output
-                    ON {output_id} IN UNNEST({output_ids})
+                    ON {output_filter}
         ''')
-        bundles = set()
-        outputs_found = set()
-        for row in rows:
-            bundles.add(TDRBundleFQID(source=source,
-                                      uuid=row['links_id'],
-                                      version=self.format_version(row['version'])))
-            outputs_found.add(row['output_id'])
-        missing = set(output_ids) - outputs_found
-        require(not missing,
-                f'Dangling inputs not found in any bundle: {missing}')
-        return bundles
 
     def _merge_links(self, links_jsons: JSONs) -> JSON:
         """
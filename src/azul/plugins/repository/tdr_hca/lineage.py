@@ -0,0 +1,282 @@
+from abc import (
+    ABCMeta,
+    abstractmethod,
+)
+from functools import (
+    cache,
+)
+import gzip
+import json
+import logging
+import os
+from pathlib import (
+    Path,
+)
+from threading import (
+    Lock,
+)
+from typing import (
+    Callable,
+    Iterable,
+    Mapping,
+    Optional,
+)
+
+import attr
+from furl import (
+    furl,
+)
+
+from azul import (
+    require,
+)
+from azul.bigquery import (
+    BigQueryRow,
+)
+from azul.deployment import (
+    aws,
+)
+from azul.indexer.document import (
+    EntityID,
+)
+
+log = logging.getLogger(__name__)
+
+#: The UUID and version of a bundle
+BundleKey = tuple[str, str]
+
+
+@attr.s(frozen=True, auto_attribs=True, kw_only=True)
+class LineageIndex:
+    """
+    Maps the ID of every entity that is an output of a process in a TDR
+    snapshot to the bundles containing a link to that process. The index is
+    built from a single scan of the snapshot's ``links`` table and replaces the
+    per-bundle search for the bundles producing the dangling inputs of a
+    subgraph.
+    """
+    producers: Mapping[EntityID, frozenset[BundleKey]]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[BigQueryRow]) -> 'LineageIndex':
+        """
+        >>> rows = [
+        ...     dict(links_id='b1', version='v1', output_id='e1'),
+        ...     dict(links_id='b2', version='v2', output_id='e1'),
+        ...     dict(links_id='b2', version='v2', output_id='e2'),
+        ... ]
+        >>> index = LineageIndex.from_rows(rows)
+        >>> sorted(index.producers['e1'])
+        [('b1', 'v1'), ('b2', 'v2')]
+        >>> sorted(index.producers['e2'])
+        [('b2', 'v2')]
+        """
+        producers: dict[EntityID, set[BundleKey]] = {}
+        for row in rows:
+            bundle = (row['links_id'], row['version'])
+            producers.setdefault(row['output_id'], set()).add(bundle)
+        return cls(producers={k: frozenset(v) for k, v in producers.items()})
+
+    def upstream_bundles(self, output_ids: Iterable[EntityID]) -> set[BundleKey]:
+        """
+        The bundles producing any of the given entities.
+
+        >>> rows = [
+        ...     dict(links_id='b1', version='v1', output_id='e1'),
+        ...     dict(links_id='b2', version='v2', output_id='e2'),
+        ... ]
+        >>> index = LineageIndex.from_rows(rows)
+        >>> sorted(index.upstream_bundles(['e1', 'e2']))
+        [('b1', 'v1'), ('b2', 'v2')]
+
+        >>> index.upstream_bundles(['e1', 'e3'])
+        Traceback (most recent call last):
+        ...
+        azul.RequirementError: Dangling inputs not found in any bundle: {'e3'}
+        """
+        output_ids = set(output_ids)
+        missing = output_ids - self.producers.keys()
+        require(not missing,
+                f'Dangling inputs not found in any bundle: {missing}')
+        return {
+            bundle
+            for output_id in output_ids
+            for bundle in self.producers[output_id]
+        }
+
+    def to_json(self) -> dict[EntityID, list[list[str]]]:
+        return {
+            output_id: sorted(map(list, bundles))
+            for output_id, bundles in self.producers.items()
+        }
+
+    @classmethod
+    def from_json(cls, json: Mapping[EntityID, list[list[str]]]) -> 'LineageIndex':
+        """
+        >>> index = LineageIndex.from_rows([dict(links_id='b', version='v', output_id='e')])
+        >>> LineageIndex.from_json(index.to_json()) == index
+        True
+        """
+        return cls(producers={
+            output_id: frozenset((uuid, version) for uuid, version in bundles)
+            for output_id, bundles in json.items()
+        })
+
+
+class LineageStore(metaclass=ABCMeta):
+    """
+    A persistent cache of lineage indices, one per snapshot. Since the contents
+    of a snapshot never change, an index never needs to be updated. A new
+    snapshot has a different ID and therefore gets a new index.
+
+    Besides persisting the indices, the store also retains the indices it
+    loaded or built in memory, so that subsequent bundles indexed by the same
+    process don't need to load them again.
+    """
+
+    @classmethod
+    @cache
+    def for_location(cls, location: str) -> 'LineageStore':
+        """
+        Return the store at the given location, either an S3 URL of the form
+        ``s3://bucket/prefix`` or a ``file://`` URL of a local directory. The
+        same store instance is returned for equal locations.
+
+        >>> LineageStore.for_location('s3://foo/bar/')
+        S3LineageStore(bucket='foo', prefix='bar/')
+
+        >>> LineageStore.for_location('file:///tmp/lineage')
+        FileLineageStore(path=PosixPath('/tmp/lineage'))
+
+        >>> LineageStore.for_location('gs://foo/bar')
+        Traceback (most recent call last):
+        ...
+        azul.RequirementError: ('Unsupported lineage cache location', 'gs://foo/bar')
+        """
+        url = furl(location)
+        if url.scheme == 's3':
+            return S3LineageStore(bucket=url.netloc, prefix=str(url.path).lstrip('/'))
+        elif url.scheme == 'file':
+            return FileLineageStore(path=Path(str(url.path)))
+        else:
+            require(False, 'Unsupported lineage cache location', location)
+
+    def __init__(self):
+        self._indices: dict[str, LineageIndex] = {}
+        self._lock = Lock()
+
+    def get(self,
+            snapshot_id: str,
+            build: Callable[[], LineageIndex]
+            ) -> LineageIndex:
+        """
+        Return the lineage index for the snapshot with the given ID, loading it
+        from the store or, if the store doesn't have it, building it by
+        invoking the given callable and saving the result to the store.
+        """
+        # Holding the lock while building prevents multiple threads in the same
+        # process from building the same index concurrently. Processes don't
+        # coordinate. If more than one of them builds the index, the last one
+        # to save it wins, but all of them build the same index.
+        with self._lock:
+            try:
+                return self._indices[snapshot_id]
+            except KeyError:
+                pass
+            key = snapshot_id + '.json.gz'
+            data = self._load(key)
+            if data is None:
+                log.info('Building lineage index for snapshot %r', snapshot_id)
+                index = build()
+                data = gzip.compress(json.dumps(index.to_json()).encode())
+                self._save(key, data)
+                log.info('Saved lineage index with %i output(s) for snapshot %r '
+                         'as %i bytes to %r',
+                         len(index.producers), snapshot_id, len(data), self)
+            else:
+                index = LineageIndex.from_json(json.loads(gzip.decompress(data)))
+                log.info('Loaded lineage index with %i output(s) for snapshot %r '
+                         'from %r',
+                         len(index.producers), snapshot_id, self)
+            self._indices[snapshot_id] = index
+            return index
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[bytes]:
+        """
+        Return the object with the given key, or None if there is no such
+        object.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def _save(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+
+class S3LineageStore(LineageStore):
+
+    def __init__(self, *, bucket: str, prefix: str):
+        super().__init__()
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(bucket={self.bucket!r}, prefix={self.prefix!r})'
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix.rstrip('/') + '/' + key if self.prefix else key
+
+    def _load(self, key: str) -> Optional[bytes]:
+        try:
+            response = aws.s3.get_object(Bucket=self.bucket,
+                                         Key=self._object_key(key))
+        except aws.s3.exceptions.ClientError as e:
+            code = e.response['Error']['Code']
+            if code == 'NoSuchKey':
+                return None
+            elif code == 'AccessDenied':
+                # Without s3:ListBucket, S3 responds with 403 instead of 404
+                # for a missing key, so a denial can't be told apart from a
+                # miss. If the denial is genuine, saving the index will fail.
+                log.warning('Access to lineage index %r in %r denied, '
+                            'treating it as missing', key, self)
+                return None
+            else:
+                raise
+        else:
+            return response['Body'].read()
+
+    def _save(self, key: str, data: bytes) -> None:
+        aws.s3.put_object(Bucket=self.bucket,
+                          Key=self._object_key(key),
+                          Body=data,
+                          ContentType='application/gzip')
+
+
+class FileLineageStore(LineageStore):
+    """
+    A stand-in for :class:`S3LineageStore` that stores the indices in a local
+    directory, for use in tests and local deployments.
+    """
+
+    def __init__(self, *, path: Path):
+        super().__init__()
+        self.path = path
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(path={self.path!r})'
+
+    def _load(self, key: str) -> Optional[bytes]:
+        try:
+            return (self.path / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _save(self, key: str, data: bytes) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see
+        # a partially written index
+        tmp_path = self.path / f'{key}.{os.getpid()}.tmp'
+        tmp_path.write_bytes(data)
+        tmp_path.replace(self.path / key)
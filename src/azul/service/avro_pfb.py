@@ -1,12 +1,17 @@
 from collections import (
-    defaultdict,
+    OrderedDict,
 )
 from collections.abc import (
     Iterable,
 )
+import hashlib
+from io import (
+    BytesIO,
+)
 from itertools import (
     chain,
 )
+import json
 import logging
 from operator import (
     attrgetter,
@@ -14,7 +19,7 @@ from operator import (
 )
 from typing import (
     ClassVar,
-    MutableSet,
+    IO,
 )
 from uuid import (
     UUID,
@@ -58,6 +63,7 @@ from azul.plugins.metadata.hca.indexer.transform import (
 )
 from azul.types import (
     JSON,
+    JSONs,
     MutableJSON,
 )
 
@@ -68,22 +74,47 @@ renamed_fields = {
 }
 
 
-def write_pfb_entities(entities: Iterable[JSON], pfb_schema: JSON, path: str):
+def pfb_header(pfb_schema: JSON) -> bytes:
+    """
+    The Avro header of a PFB with the given schema. The header includes a sync
+    marker that is derived from the schema, so the PFB entities of different
+    partitions of the same manifest can be written separately and concatenated
+    after a single header.
+
+    >>> schema = {'type': 'record', 'name': 'Entity', 'fields': []}
+    >>> header = pfb_header(schema)
+    >>> header[:4], header == pfb_header(schema)
+    (b'Obj\\x01', True)
+    """
     assert isinstance(pfb_schema, dict)
+    schema_json = json.dumps(pfb_schema, sort_keys=True).encode()
+    sync_marker = hashlib.sha256(schema_json).digest()[:16]
+    with BytesIO() as fh:
+        fastavro.writer(fh, fastavro.parse_schema(pfb_schema), [], sync_marker=sync_marker)
+        return fh.getvalue()
+
+
+def write_pfb_entities(entities: Iterable[JSON], pfb_schema: JSON, fh: IO[bytes]):
+    """
+    Append the given entities to the given stream. The stream must be readable
+    and seekable, and it must contain the header returned by :func:`pfb_header`
+    for the given schema, possibly followed by other entities.
+    """
+    assert isinstance(pfb_schema, dict)
+    assert fh.tell() > 0, 'Missing PFB header'
     parsed_schema = fastavro.parse_schema(pfb_schema)
-    with open(path, 'w+b') as fh:
-        # Writing the entities one at a time is ~2.5 slower, but makes it clear
-        # which entities fail, which is useful for debugging.
-        if config.debug > 1:
-            log.info('Writing PFB entities individually')
-            for entity in entities:
-                try:
-                    fastavro.writer(fh, parsed_schema, [entity], validator=True)
-                except ValidationError:
-                    log.error('Failed to write Avro entity: %r', entity)
-                    raise
-        else:
-            fastavro.writer(fh, parsed_schema, entities, validator=True)
+    # Writing the entities one at a time is ~2.5 slower, but makes it clear
+    # which entities fail, which is useful for debugging.
+    if config.debug > 1:
+        log.info('Writing PFB entities individually')
+        for entity in entities:
+            try:
+                fastavro.writer(fh, parsed_schema, [entity], validator=True)
+            except ValidationError:
+                log.error('Failed to write Avro entity: %r', entity)
+                raise
+    else:
+        fastavro.writer(fh, parsed_schema, entities, validator=True)
 
 
 # FIXME: Unit tests do not cover PFB handover using an AnVIL catalog
@@ -92,22 +123,33 @@ class PFBConverter:
     """
     Converts documents from Elasticsearch into PFB entities. A document's inner
     entities correspond to PFB entities which are normalized and linked via
-    Relations.
+    Relations. Documents are converted one at a time so that the resulting
+    entities can be written as they are produced. To bound the amount of memory
+    used, the converter only remembers the most recently converted inner
+    entities. An inner entity that is shared by documents far enough apart is
+    converted again, as an identical duplicate.
     """
 
     entity_type = 'files'
 
+    #: The maximum number of inner entities to remember
+    #:
+    max_seen_entities = 100_000
+
     def __init__(self, schema: JSON, repository_plugin: RepositoryPlugin):
         self.schema = schema
         self.repository_plugin = repository_plugin
-        self._entities: dict[PFBEntity, MutableSet[PFBRelation]] = defaultdict(set)
+        self._seen_entities: OrderedDict[str, None] = OrderedDict()
 
-    def add_doc(self, doc: JSON):
+    def convert_doc(self, doc: JSON) -> JSONs:
         """
-        Add an Elasticsearch document to be transformed.
+        Convert an Elasticsearch document to PFB entities. The returned entities
+        are in the order they must be written in: the inner entities that are
+        new to this converter, followed by the file entities referencing them.
         """
         doc_copy = copy_json(doc, 'contents', self.entity_type)
         contents = doc_copy['contents']
+        pfb_entities = []
         file_relations = set()
         for entity_type, entities in contents.items():
             # copy_json is expected to only deep copy a subset of the document
@@ -126,9 +168,11 @@ class PFBConverter:
                     pfb_entity = PFBEntity.from_json(name=entity_type,
                                                      object_=entity,
                                                      schema=self.schema)
-                    if pfb_entity not in self._entities:
-                        self._entities[pfb_entity] = set()
+                    if self._is_new(pfb_entity):
+                        pfb_entities.append(pfb_entity.to_json([]))
                     file_relations.add(PFBRelation.to_entity(pfb_entity))
+        # Sort relations to make entities consistent for easy diffing
+        file_relations = sorted(file_relations, key=attrgetter('dst_name', 'dst_id'))
         file_entity: MutableJSON = one(contents[self.entity_type])
         related_files = file_entity.pop('related_files', [])
         for entity in chain([file_entity], related_files):
@@ -137,16 +181,22 @@ class PFBConverter:
             pfb_entity = PFBEntity.from_json(name=self.entity_type,
                                              object_=entity,
                                              schema=self.schema)
-            assert pfb_entity not in self._entities
             # Terra streams PFBs and requires entities be defined before they are
             # referenced. Thus we add the file entity after all the entities
             # it relates to.
-            self._entities[pfb_entity] = file_relations
+            pfb_entities.append(pfb_entity.to_json(file_relations))
+        return pfb_entities
 
-    def entities(self) -> Iterable[JSON]:
-        for entity, relations in self._entities.items():
-            # Sort relations to make entities consistent for easy diffing
-            yield entity.to_json(sorted(relations, key=attrgetter('dst_name', 'dst_id')))
+    def _is_new(self, entity: 'PFBEntity') -> bool:
+        try:
+            self._seen_entities.move_to_end(entity.id)
+        except KeyError:
+            self._seen_entities[entity.id] = None
+            if len(self._seen_entities) > self.max_seen_entities:
+                self._seen_entities.popitem(last=False)
+            return True
+        else:
+            return False
 
 
 def _reversible_join(joiner: str, parts: Iterable[str]) -> str:
@@ -2,14 +2,20 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+import asyncio
 from collections import (
     defaultdict,
 )
 from collections.abc import (
+    Coroutine,
     Iterable,
+    Iterator,
     Mapping,
     Sequence,
 )
+from functools import (
+    partial,
+)
 import json
 import logging
 from typing import (
@@ -18,6 +24,7 @@ from typing import (
     Optional,
     TypeVar,
     TypedDict,
+    Union,
 )
 
 import attr
@@ -52,6 +59,7 @@ from azul import (
 )
 from azul.es import (
     ESClientFactory,
+    event_loop,
 )
 from azul.indexer.document import (
     DocumentType,
@@ -118,6 +126,8 @@ class ElasticsearchStage(Generic[R1, R2], metaclass=ABCMeta):
 
 R0 = TypeVar('R0')
 
+T = TypeVar('T')
+
 
 @attr.s(frozen=True, auto_attribs=True, kw_only=True)
 class ElasticsearchChain(ElasticsearchStage[R0, R2]):
@@ -218,41 +228,64 @@ class FilterStage(_ElasticsearchStage[Response, Response]):
         """
         Converts the given filters into an Elasticsearch DSL Query object.
         """
-        filter_list = []
-        for field_path, relation_and_values in self.prepared_filters.items():
-            if field_path not in skip_field_paths:
-                relation, values = one(relation_and_values.items())
-                if relation == 'is':
-                    field_type = self.service.field_type(self.catalog, field_path)
-                    if isinstance(field_type, Nested):
-                        term_queries = []
-                        for nested_field, nested_value in one(values).items():
-                            nested_body = {dotted(field_path, nested_field, 'keyword'): nested_value}
-                            term_queries.append(Q('term', **nested_body))
-                        query = Q('nested', path=dotted(field_path), query=Q('bool', must=term_queries))
-                    else:
-                        query = Q('terms', **{dotted(field_path, 'keyword'): values})
-                        translated_none = field_type.to_index(None)
-                        if translated_none in values:
-                            # Note that at this point None values in filters have already
-                            # been translated e.g. {'is': ['~null']} and if the filter has a
-                            # None our query needs to find fields with None values as well
-                            # as absent fields
-                            absent_query = Q('bool', must_not=[Q('exists', field=dotted(field_path))])
-                            query = Q('bool', should=[query, absent_query])
-                    filter_list.append(query)
-                elif relation in ('contains', 'within', 'intersects'):
-                    for value in values:
-                        value = value | {'relation': relation}
-                        filter_list.append(Q('range', **{dotted(field_path): value}))
-                else:
-                    assert False
-
         # Each iteration will AND the contents of the list
-        query_list = [Q('constant_score', filter=f) for f in filter_list]
-
+        query_list = [
+            query
+            for field_path, queries in self._filter_queries.items()
+            if field_path not in skip_field_paths
+            for query in queries
+        ]
         return Q('bool', must=query_list)
 
+    @cached_property
+    def _filter_queries(self) -> Mapping[FieldPath, Sequence[Query]]:
+        """
+        The queries for the filter on each field path. The aggregation stage
+        requests one query per facet, each omitting the filter on that facet.
+        The queries for the individual filters are therefore only built once
+        per request and shared between the query for the filter stage and the
+        queries for the facets.
+        """
+        return {
+            field_path: [
+                Q('constant_score', filter=query)
+                for query in self._filter_query(field_path, relation_and_values)
+            ]
+            for field_path, relation_and_values in self.prepared_filters.items()
+        }
+
+    def _filter_query(self,
+                      field_path: FieldPath,
+                      relation_and_values: Mapping[str, Sequence[PrimitiveJSON]]
+                      ) -> list[Query]:
+        relation, values = one(relation_and_values.items())
+        if relation == 'is':
+            field_type = self.service.field_type(self.catalog, field_path)
+            if isinstance(field_type, Nested):
+                term_queries = []
+                for nested_field, nested_value in one(values).items():
+                    nested_body = {dotted(field_path, nested_field, 'keyword'): nested_value}
+                    term_queries.append(Q('term', **nested_body))
+                query = Q('nested', path=dotted(field_path), query=Q('bool', must=term_queries))
+            else:
+                query = Q('terms', **{dotted(field_path, 'keyword'): values})
+                translated_none = field_type.to_index(None)
+                if translated_none in values:
+                    # Note that at this point None values in filters have already
+                    # been translated e.g. {'is': ['~null']} and if the filter has a
+                    # None our query needs to find fields with None values as well
+                    # as absent fields
+                    absent_query = Q('bool', must_not=[Q('exists', field=dotted(field_path))])
+                    query = Q('bool', should=[query, absent_query])
+            return [query]
+        elif relation in ('contains', 'within', 'intersects'):
+            return [
+                Q('range', **{dotted(field_path): value | {'relation': relation}})
+                for value in values
+            ]
+        else:
+            assert False
+
 
 @attr.s(frozen=True, auto_attribs=True, kw_only=True)
 class AggregationStage(_ElasticsearchStage[MutableJSON, MutableJSON]):
@@ -393,24 +426,32 @@ class SlicingStage(_ElasticsearchStage[Response, Response]):
     Augments the request with a document slice (known as a *source filter* in
     Elasticsearch land) to restrict the set of properties in each hit in the
     response. If the given document slice is None, the default one from the
-    plugin is used. If that is None, too, each hit will contain all properties.
+    plugin is used. If that is None, too, each hit will contain all properties
+    except those that are only used by the indexer.
     """
     document_slice: Optional[DocumentSlice]
 
+    #: Properties of aggregates that are never part of a response. The state
+    #: of incremental aggregation is only read by the indexer.
+    #:
+    excludes = ['accumulators']
+
     def prepare_request(self, request: Search) -> Search:
         document_slice = self._prepared_slice()
-        if document_slice is not None:
-            request = request.source(**document_slice)
+        request = request.source(**document_slice)
         return request
 
     def process_response(self, response: Response) -> Response:
         return response
 
-    def _prepared_slice(self) -> Optional[DocumentSlice]:
+    def _prepared_slice(self) -> DocumentSlice:
         if self.document_slice is None:
-            return self.plugin.document_slice(self.entity_type)
+            document_slice = self.plugin.document_slice(self.entity_type)
         else:
-            return None
+            document_slice = self.document_slice
+        document_slice = DocumentSlice(**(document_slice or {}))
+        document_slice['excludes'] = [*document_slice.get('excludes', []), *self.excludes]
+        return document_slice
 
 
 # FIXME: Elminate Eliminate reliance on Elasticsearch DSL
@@ -437,6 +478,10 @@ class Pagination:
     search_before: Optional[SortKey] = None
     search_after: Optional[SortKey] = None
 
+    #: True, if the total number of hits must be exact, False, if it may be a
+    #: lower bound, or None to let the server decide.
+    exact_total: Optional[bool] = None
+
     def __attrs_post_init__(self):
         self._check_sort_key(self.search_before)
         self._check_sort_key(self.search_after)
@@ -472,6 +517,8 @@ class Pagination:
 class ResponsePagination(TypedDict):
     count: int
     total: int
+    #: 'eq' if `total` is exact, 'gte' if it is a lower bound
+    totalRelation: str
     size: int
     pages: int
     next: Optional[str]
@@ -480,7 +527,8 @@ class ResponsePagination(TypedDict):
     order: str
 
 
-ResponseTriple = tuple[JSONs, ResponsePagination, JSON]
+#: The hits, lazily translated, the pagination and the aggregations
+ResponseTriple = tuple[Iterator[MutableJSON], ResponsePagination, JSON]
 
 
 @attr.s(frozen=True, auto_attribs=True, kw_only=True)
@@ -542,9 +590,7 @@ class PaginationStage(_ElasticsearchStage[JSON, ResponseTriple]):
         else:
             request = request.sort(*sort(sort_order))
 
-        # FIXME: Remove this or change to 10000 (the default)
-        #        https://github.com/DataBiosphere/azul/issues/3770
-        request = request.extra(track_total_hits=True)
+        request = request.extra(track_total_hits=self._track_total_hits())
 
         assert isinstance(self.peek_ahead, bool), type(self.peek_ahead)
         # fetch one more than needed to see if there's a "next page".
@@ -552,6 +598,22 @@ class PaginationStage(_ElasticsearchStage[JSON, ResponseTriple]):
 
         return request
 
+    def _track_total_hits(self) -> Union[bool, int]:
+        """
+        The value of the `track_total_hits` request property. Counting the hits
+        exactly requires visiting all of them, which is expensive for searches
+        matching many documents.
+        """
+        exact_total = self.pagination.exact_total
+        if exact_total is None:
+            # Deep pages and unfiltered searches typically match many hits.
+            # Clients paging through the results already know the total from
+            # the first page.
+            deep = not (self.pagination.search_after is None
+                        and self.pagination.search_before is None)
+            exact_total = not deep and bool(self.filters.explicit)
+        return True if exact_total else config.total_hits_limit
+
     def process_response(self, response: JSON) -> ResponseTriple:
         """
         Returns hits and pagination as dict
@@ -572,14 +634,22 @@ class PaginationStage(_ElasticsearchStage[JSON, ResponseTriple]):
         return hits
 
     def _translate_hits(self, hits):
-        hits = self.service.translate_fields(self.catalog, hits, forward=False)
-        return hits
+        # Each hit is translated only when it is consumed, so that the
+        # translated hits don't need to be retained all at once. The hits are
+        # parsed from the response for this request alone and can therefore
+        # be translated in place.
+        translate = partial(self.service.translate_fields,
+                            self.catalog,
+                            forward=False,
+                            in_place=True)
+        return map(translate, hits)
 
     def _process_pagination(self, response: JSON) -> MutableJSON:
         total = response['hits']['total']
-        # FIXME: Handle other relations
-        #        https://github.com/DataBiosphere/azul/issues/3770
-        assert total['relation'] == 'eq'
+        # If the number of hits exceeds the value of `track_total_hits`, the
+        # total and the resulting number of pages are lower bounds. The links
+        # to the next and previous page don't depend on the total.
+        assert total['relation'] in ('eq', 'gte'), total
         pages = -(-total['value'] // self.pagination.size)
 
         # ... else use search_after/search_before pagination
@@ -620,6 +690,7 @@ class PaginationStage(_ElasticsearchStage[JSON, ResponseTriple]):
 
         return ResponsePagination(count=count,
                                   total=total['value'],
+                                  totalRelation=total['relation'],
                                   size=pagination.size,
                                   next=page_link(previous=False),
                                   previous=page_link(previous=True),
@@ -670,3 +741,29 @@ class ElasticsearchService(DocumentService):
                       index=str(IndexName.create(catalog=catalog,
                                                  entity_type=entity_type,
                                                  doc_type=DocumentType.aggregate)))
+
+    async def execute_async(self, request: Search) -> Response:
+        """
+        Send the given request using the asynchronous Elasticsearch client.
+        Apart from not blocking the event loop while waiting for the response,
+        this is equivalent to `request.execute()`.
+        """
+        if config.debug == 2 and log.isEnabledFor(logging.DEBUG):
+            log.debug('Elasticsearch request: %s', json.dumps(request.to_dict(), indent=4))
+        # Search.execute() only supports the synchronous client
+        es_client = await ESClientFactory.get_async()
+        response = await es_client.search(index=request._index,
+                                          body=request.to_dict(),
+                                          **request._params)
+        return request._response_class(request, response)
+
+    def run_concurrently(self, *coroutines: Coroutine[Any, Any, T]) -> list[T]:
+        """
+        Run the given coroutines concurrently on the event loop of the current
+        thread and return their results in the order of the coroutines.
+        """
+
+        async def gather() -> list[T]:
+            return await asyncio.gather(*coroutines)
+
+        return event_loop().run_until_complete(gather())
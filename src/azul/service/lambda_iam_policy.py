@@ -80,6 +80,18 @@ policy = {
                 f"arn:aws:s3:::{aws.shared_bucket}/*"
             ]
         },
+        # Needed to delete the slices of a manifest after they were
+        # concatenated, and to abort the upload of an empty slice
+        {
+            "Effect": "Allow",
+            "Action": [
+                "s3:DeleteObject",
+                "s3:AbortMultipartUpload"
+            ],
+            "Resource": [
+                f"arn:aws:s3:::{config.s3_bucket}/manifests/*"
+            ]
+        },
         # Needed for GetObject to work in versioned bucket
         {
             "Effect": "Allow",
@@ -140,7 +152,8 @@ policy = {
                 f"arn:aws:dynamodb:{aws.region_name}:{aws.account}:table/{table_name}"
                 for table_name in (
                     config.dynamo_object_version_table_name,
-                    config.dynamo_sources_cache_table_name
+                    config.dynamo_sources_cache_table_name,
+                    config.dynamo_generations_table_name
                 )
             ]
         },
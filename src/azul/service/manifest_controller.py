@@ -65,15 +65,19 @@ from azul.types import (
 
 manifest_state_key = 'manifest'
 
+slices_state_key = 'slices'
+
 
 class ManifestGenerationState(TypedDict, total=False):
     manifest_key: JSON
     filters: JSON
     partition: Optional[JSON]
+    slices: Optional[list[JSON]]
     manifest: Optional[JSON]
 
 
 assert manifest_state_key in get_type_hints(ManifestGenerationState)
+assert slices_state_key in get_type_hints(ManifestGenerationState)
 
 
 @attr.s(frozen=True, auto_attribs=True, kw_only=True)
@@ -91,15 +95,36 @@ class ManifestController(SourceController):
     def get_manifest(self, state: JSON) -> ManifestGenerationState:
         # We trust StepFunctions to pass
         state: ManifestGenerationState
-        partition = ManifestPartition.from_json(state['partition'])
         manifest_key = ManifestKey.from_json(state['manifest_key'])
-        result = self.service.get_manifest(format=manifest_key.format,
-                                           catalog=manifest_key.catalog,
-                                           filters=Filters.from_json(state['filters']),
-                                           partition=partition,
-                                           manifest_key=manifest_key)
-        if isinstance(result, ManifestPartition):
-            assert not result.is_last, result
+        filters = Filters.from_json(state['filters'])
+        if slices_state_key in state:
+            # The output of the step function's Map state, one item per slice,
+            # each containing the last partition of that slice
+            slices = [ManifestPartition.from_json(s['partition']) for s in state['slices']]
+            result = self.service.concatenate_slices(format=manifest_key.format,
+                                                     catalog=manifest_key.catalog,
+                                                     filters=filters,
+                                                     manifest_key=manifest_key,
+                                                     slices=slices)
+        else:
+            partition = ManifestPartition.from_json(state['partition'])
+            result = self.service.get_manifest(format=manifest_key.format,
+                                               catalog=manifest_key.catalog,
+                                               filters=filters,
+                                               partition=partition,
+                                               manifest_key=manifest_key)
+        if isinstance(result, list):
+            return {
+                'filters': state['filters'],
+                'manifest_key': state['manifest_key'],
+                # The presence of this key makes the step function generate
+                # the slices concurrently
+                slices_state_key: [partition.to_json() for partition in result]
+            }
+        elif isinstance(result, ManifestPartition):
+            # Only the last partition of a slice terminates the loop that
+            # generates that slice
+            assert not result.is_last or result.slice_index is not None, result
             return {
                 **state,
                 'partition': result.to_json()
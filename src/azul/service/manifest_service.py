@@ -2,13 +2,25 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+from array import (
+    array,
+)
 import base64
 from collections import (
     defaultdict,
 )
 from collections.abc import (
+    Callable,
     Iterable,
     Mapping,
+    Sequence,
+)
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from contextlib import (
+    nullcontext,
 )
 from copy import (
     deepcopy,
@@ -30,7 +42,6 @@ from io import (
     BytesIO,
     TextIOWrapper,
 )
-import itertools
 from itertools import (
     chain,
 )
@@ -48,6 +59,7 @@ from tempfile import (
 import time
 from typing import (
     Any,
+    ContextManager,
     IO,
     Optional,
     Protocol,
@@ -70,11 +82,13 @@ from elasticsearch_dsl import (
 )
 from elasticsearch_dsl.response import (
     Hit,
+    Response,
 )
 from furl import (
     furl,
 )
 from more_itertools import (
+    chunked,
     one,
 )
 import msgpack
@@ -137,6 +151,7 @@ from azul.service.elasticsearch_service import (
 )
 from azul.service.storage_service import (
     AWS_S3_DEFAULT_MINIMUM_PART_SIZE,
+    MULTIPART_UPLOAD_MAX_WORKERS,
     StorageService,
 )
 from azul.types import (
@@ -478,7 +493,9 @@ class ManifestPartition:
     #: have to be.
     multipart_upload_id: Optional[str] = None
 
-    #: The S3 ETag of each partition; the current one and all the ones before it
+    #: The S3 ETag of each part of the multi-part upload written by the current
+    #: partition and all the ones before it. A partition may consist of more
+    #: than one part.
     part_etags: Optional[tuple[str, ...]] = attrs.field(converter=tuple_or_none,
                                                         default=None)
 
@@ -496,6 +513,21 @@ class ManifestPartition:
     #: or None if there is no current page.
     search_after: Optional[tuple[str, str]] = None
 
+    #: The 0-based index of the slice this partition is a part of, or None if
+    #: the manifest isn't sliced. The slices of a manifest are written
+    #: concurrently and independently, each as a separate sequence of
+    #: partitions, and then concatenated. The partitions of a slice are
+    #: indexed starting at 0, as are the pages of a slice.
+    slice_index: Optional[int] = None
+
+    #: The lowest entity ID of the files in this partition's slice, or None
+    #: if the slice is unbounded below
+    slice_start: Optional[str] = None
+
+    #: The entity ID above the highest entity ID of the files in this
+    #: partition's slice, or None if the slice is unbounded above
+    slice_end: Optional[str] = None
+
     @classmethod
     def from_json(cls, partition: JSON) -> 'ManifestPartition':
         return cls(**{
@@ -511,9 +543,29 @@ class ManifestPartition:
         return cls(index=0,
                    is_last=False)
 
+    @classmethod
+    def first_of_slice(cls,
+                       slice_index: int,
+                       slice_start: Optional[str],
+                       slice_end: Optional[str]
+                       ) -> 'ManifestPartition':
+        return cls(index=0,
+                   is_last=False,
+                   slice_index=slice_index,
+                   slice_start=slice_start,
+                   slice_end=slice_end)
+
     @property
     def is_first(self):
-        return not (self.index or self.page_index)
+        return self.slice_index is None and not (self.index or self.page_index)
+
+    @property
+    def is_first_page(self) -> bool:
+        """
+        True if the current page is the first page of the entire manifest, as
+        opposed to just the first page of a slice.
+        """
+        return self.page_index == 0 and not self.slice_index
 
     def with_config(self, config: AnyJSON):
         return attrs.evolve(self, config=config)
@@ -546,12 +598,12 @@ class ManifestPartition:
     def last_page(self):
         return attrs.evolve(self, is_last_page=True)
 
-    def next(self, part_etag: str) -> 'ManifestPartition':
+    def next(self, *part_etags: str) -> 'ManifestPartition':
         return attrs.evolve(self,
                             index=self.index + 1,
-                            part_etags=(*self.part_etags, part_etag))
+                            part_etags=(*self.part_etags, *part_etags))
 
-    def last(self, file_name: str) -> 'ManifestPartition':
+    def last(self, file_name: Optional[str]) -> 'ManifestPartition':
         return attrs.evolve(self,
                             file_name=file_name,
                             is_last=True)
@@ -576,11 +628,18 @@ class ManifestService(ElasticsearchService):
                      filters: Filters,
                      partition: ManifestPartition,
                      manifest_key: Optional[ManifestKey] = None
-                     ) -> Manifest | ManifestPartition:
+                     ) -> Manifest | ManifestPartition | list[ManifestPartition]:
         """
         Return a fully populated manifest that ends with the given partition or
         the next partition if the given partition isn't the last.
 
+        If the manifest is split into slices, the first invocation returns a
+        list containing the first partition of each slice. The partitions of
+        each slice should then be generated by repeatedly calling this method,
+        until the returned partition is the last one of its slice. Finally,
+        the last partition of every slice is passed to
+        :meth:`concatenate_slices`, which returns the manifest.
+
         If a manifest is returned, its 'location' attribute contains the
         pre-signed URL of a manifest in the given format, and containing file
         entities matching the given filter.
@@ -630,9 +689,13 @@ class ManifestService(ElasticsearchService):
                            generator: 'ManifestGenerator',
                            manifest_key: ManifestKey,
                            partition: ManifestPartition
-                           ) -> Manifest | ManifestPartition:
+                           ) -> Manifest | ManifestPartition | list[ManifestPartition]:
+        if partition.is_first and isinstance(generator, PagedManifestGenerator):
+            slices = generator.slices()
+            if slices:
+                return slices
         partition = generator.write(manifest_key, partition)
-        if partition.is_last:
+        if partition.is_last and partition.slice_index is None:
             return self._presign_manifest(generator_cls=type(generator),
                                           manifest_key=manifest_key,
                                           file_name=partition.file_name,
@@ -640,6 +703,27 @@ class ManifestService(ElasticsearchService):
         else:
             return partition
 
+    def concatenate_slices(self,
+                           *,
+                           format: ManifestFormat,
+                           catalog: CatalogName,
+                           filters: Filters,
+                           manifest_key: ManifestKey,
+                           slices: Sequence[ManifestPartition]
+                           ) -> Manifest:
+        """
+        Concatenate the slices of a manifest, given the last partition of each
+        slice, and return the resulting manifest. See :meth:`get_manifest`.
+        """
+        generator_cls = ManifestGenerator.cls_for_format(format)
+        assert issubclass(generator_cls, PagedManifestGenerator), generator_cls
+        generator = generator_cls(self, catalog, filters)
+        file_name = generator.concatenate(manifest_key, slices)
+        return self._presign_manifest(generator_cls=generator_cls,
+                                      manifest_key=manifest_key,
+                                      file_name=file_name,
+                                      was_cached=False)
+
     def get_cached_manifest(self,
                             format: ManifestFormat,
                             catalog: CatalogName,
@@ -801,6 +885,116 @@ class ManifestService(ElasticsearchService):
 
 Cells = dict[str, str]
 
+TSVConverter = Callable[[AnyJSON], str]
+
+
+@attrs.frozen(kw_only=True)
+class RowExtractor:
+    """
+    Extracts the cells for the columns in a column mapping from the entities
+    at a given field path into the documents of a manifest. The field types of
+    the columns are resolved once, when the extractor is created, rather than
+    for every row.
+    """
+    #: The field name, column name and conversion function of each column
+    columns: Sequence[tuple[str, str, TSVConverter]]
+
+    #: The string that must not occur in any cell value, or None if cell
+    #: values aren't validated
+    column_joiner: Optional[str]
+
+    #: The string to join the distinct values of a cell with
+    padded_joiner: str
+
+    #: The maximum number of values in a cell
+    max_values: int = 100
+
+    @classmethod
+    def create(cls,
+               field_types: FieldTypes,
+               field_path: FieldPath,
+               column_mapping: ColumnMapping,
+               *,
+               column_joiner: Optional[str],
+               padded_joiner: str
+               ) -> 'RowExtractor':
+        for field in field_path:
+            field_types = field_types[field]
+
+        def converter(field_name: str) -> TSVConverter:
+            try:
+                field_type = field_types[field_name]
+            except KeyError:
+                if field_name == 'file_url':
+                    field_type = null_str
+                else:
+                    # Only fail if the field actually occurs in an entity
+                    def fail(_):
+                        raise KeyError(field_name)
+
+                    return fail
+            else:
+                if isinstance(field_type, list):
+                    field_type = one(field_type)
+            return field_type.to_tsv
+
+        return cls(columns=[
+                       (field_name, column_name, converter(field_name))
+                       for field_name, column_name in column_mapping.items()
+                   ],
+                   column_joiner=column_joiner,
+                   padded_joiner=padded_joiner)
+
+    def __call__(self, entities: JSONs, row: Cells) -> None:
+        """
+        Insert the cells extracted from the given entities into the given row.
+        """
+        column_joiner = self.column_joiner
+        if len(entities) == 1:
+            # The most common case, one that doesn't require merging the
+            # values from multiple entities
+            entity = entities[0]
+            for field_name, column_name, to_tsv in self.columns:
+                assert column_name not in row, f'Column mapping defines {column_name} twice'
+                try:
+                    value = entity[field_name]
+                except KeyError:
+                    row[column_name] = ''
+                else:
+                    if isinstance(value, list):
+                        row[column_name] = self._cell({to_tsv(v) for v in value if v is not None})
+                    else:
+                        value = to_tsv(value)
+                        assert column_joiner is None or column_joiner not in value, value
+                        row[column_name] = value
+        else:
+            for field_name, column_name, to_tsv in self.columns:
+                assert column_name not in row, f'Column mapping defines {column_name} twice'
+                values = set()
+                for entity in entities:
+                    try:
+                        value = entity[field_name]
+                    except KeyError:
+                        pass
+                    else:
+                        if isinstance(value, list):
+                            values.update(to_tsv(v) for v in value if v is not None)
+                        else:
+                            values.add(to_tsv(value))
+                row[column_name] = self._cell(values)
+
+    def _cell(self, values: set[str]) -> str:
+        column_joiner = self.column_joiner
+        if column_joiner is not None:
+            for value in values:
+                assert column_joiner not in value, value
+        if len(values) < 2:
+            return values.pop() if values else ''
+        else:
+            # FIXME: The slice is a hotfix. Reconsider.
+            #        https://github.com/DataBiosphere/azul/issues/2649
+            return self.padded_joiner.join(sorted(values)[:self.max_values])
+
 
 class ManifestGenerator(metaclass=ABCMeta):
     """
@@ -1070,6 +1264,34 @@ class ManifestGenerator(metaclass=ABCMeta):
     def _field_types(self) -> FieldTypes:
         return self.service.field_types(self.catalog)
 
+    @cached_property
+    def _row_extractors(self) -> dict[tuple[FieldPath, int], tuple[ColumnMapping, RowExtractor]]:
+        return {}
+
+    def _row_extractor(self,
+                       field_path: FieldPath,
+                       column_mapping: ColumnMapping
+                       ) -> RowExtractor:
+        """
+        Return the extractor for the given column mapping of the entities at
+        the given field path, creating it on first use.
+        """
+        # Column mappings aren't hashable, and computing a hashable key from
+        # one would defeat the purpose of caching the extractor. The column
+        # mapping is kept alive by the cache so that its ID can't be reused.
+        key = field_path, id(column_mapping)
+        try:
+            _, extractor = self._row_extractors[key]
+        except KeyError:
+            validate = self.catalog not in {'dcp1', 'dcp1-it'}
+            extractor = RowExtractor.create(self._field_types,
+                                            field_path,
+                                            column_mapping,
+                                            column_joiner=self.column_joiner if validate else None,
+                                            padded_joiner=self.padded_joiner)
+            self._row_extractors[key] = column_mapping, extractor
+        return extractor
+
     def _extract_fields(self,
                         *,
                         field_path: FieldPath,
@@ -1080,51 +1302,7 @@ class ManifestGenerator(metaclass=ABCMeta):
         Extract columns in `column_mapping` from `entities` and insert values
         into `row`.
         """
-        field_types = self._field_types
-        for field in field_path:
-            field_types = field_types[field]
-
-        def convert(field_name, field_value):
-            try:
-                field_type = field_types[field_name]
-            except KeyError:
-                if field_name == 'file_url':
-                    field_type = null_str
-                else:
-                    raise
-            else:
-                if isinstance(field_type, list):
-                    field_type = one(field_type)
-            return field_type.to_tsv(field_value)
-
-        def validate(field_value: str) -> str:
-            assert (
-                self.catalog in {'dcp1', 'dcp1-it'}
-                or self.column_joiner not in field_value
-            )
-            return field_value
-
-        for field_name, column_name in column_mapping.items():
-            assert column_name not in row, f'Column mapping defines {column_name} twice'
-            column_value = []
-            for entity in entities:
-                try:
-                    field_value = entity[field_name]
-                except KeyError:
-                    pass
-                else:
-                    if isinstance(field_value, list):
-                        column_value += [
-                            validate(convert(field_name, field_sub_value))
-                            for field_sub_value in field_value
-                            if field_sub_value is not None
-                        ]
-                    else:
-                        column_value.append(validate(convert(field_name, field_value)))
-            # FIXME: The slice is a hotfix. Reconsider.
-            #        https://github.com/DataBiosphere/azul/issues/2649
-            column_value = self.padded_joiner.join(sorted(set(column_value))[:100])
-            row[column_name] = column_value
+        self._row_extractor(field_path, column_mapping)(entities, row)
 
     def _get_entities(self, field_path: FieldPath, doc: JSON) -> JSONs:
         """
@@ -1220,6 +1398,23 @@ class ManifestGenerator(metaclass=ABCMeta):
         return self.service.storage_service
 
 
+@attrs.define(kw_only=True)
+class ManifestPartitionStats:
+    """
+    Counters and timings, in seconds, for writing a partition of a paged
+    manifest. Requests to ES and uploads to S3 run concurrently with the
+    formatting of the manifest, so their durations are recorded alongside the
+    time spent waiting for them.
+    """
+    pages: int = 0
+    parts: int = 0
+    es: float = 0.0
+    es_wait: float = 0.0
+    format: float = 0.0
+    upload: float = 0.0
+    upload_wait: float = 0.0
+
+
 class PagedManifestGenerator(ManifestGenerator):
     """
     A manifest generator whose output can be split over multiple concatenable
@@ -1242,6 +1437,14 @@ class PagedManifestGenerator(ManifestGenerator):
         """
         raise NotImplementedError
 
+    def _page_output(self, buffer: BytesIO) -> ContextManager[IO]:
+        """
+        Wrap the given buffer in the stream that pages are written to by
+        :meth:`write_page_to`. Unless overridden, pages are written as text,
+        encoded as UTF-8.
+        """
+        return TextIOWrapper(buffer, encoding='utf-8', write_through=True)
+
     # With the minimum part size of 5 MiB I've observed a running time of only
     # 5s per partition so to minimize step function churn we'll go with 50 MiB
     # instead.
@@ -1263,7 +1466,10 @@ class PagedManifestGenerator(ManifestGenerator):
         else:
             config = {tuple(k): v for k, v in partition.config}
             type(self).manifest_config.fset(self, config)
-        object_key = self.s3_object_key(manifest_key)
+        if partition.slice_index is None:
+            object_key = self.s3_object_key(manifest_key)
+        else:
+            object_key = self._slice_object_key(manifest_key, partition.slice_index)
         if partition.multipart_upload_id is None:
             upload = self.storage.create_multipart_upload(object_key)
             partition = partition.with_upload(upload.id)
@@ -1272,28 +1478,124 @@ class PagedManifestGenerator(ManifestGenerator):
                                                         upload_id=partition.multipart_upload_id)
         if partition.page_index is None:
             partition = partition.first_page()
-        with BytesIO() as buffer:
-            with TextIOWrapper(buffer, encoding='utf-8', write_through=True) as text_buffer:
-                while True:
-                    partition = self.write_page_to(partition, output=text_buffer)
-                    if partition.is_last_page or buffer.tell() > self.part_size:
-                        break
-
-                def upload_part():
-                    buffer.seek(0)
-                    return self.storage.upload_multipart_part(buffer, partition.index + 1, upload)
-
-                if partition.is_last_page:
-                    if buffer.tell() > 0:
-                        partition = partition.next(part_etag=upload_part())
+        index, stats = partition.index, ManifestPartitionStats()
+        start = time.perf_counter()
+        upload_part_size = min(self.upload_part_size, self.part_size)
+        part_etags: list[Future[str]] = []
+        size = 0
+
+        def upload_part(body: bytes, part_number: int) -> str:
+            start = time.perf_counter()
+            part_etag = self.storage.upload_multipart_part(BytesIO(body), part_number, upload)
+            stats.upload += time.perf_counter() - start
+            return part_etag
+
+        # Pages are prefetched by one thread and parts uploaded in order by
+        # another while the main thread formats the manifest rows
+        with (
+            ThreadPoolExecutor(max_workers=1) as prefetcher,
+            ThreadPoolExecutor(max_workers=1) as uploader
+        ):
+            self._prefetcher, self._stats = prefetcher, stats
+            try:
+                with BytesIO() as buffer:
+                    with self._page_output(buffer) as output:
+
+                        def submit_part():
+                            nonlocal size
+                            part_number = len(partition.part_etags) + len(part_etags) + 1
+                            body = buffer.getvalue()
+                            buffer.seek(0)
+                            buffer.truncate()
+                            size += len(body)
+                            stats.parts += 1
+                            part_etags.append(uploader.submit(upload_part, body, part_number))
+
+                        while True:
+                            page_start, es_wait = time.perf_counter(), stats.es_wait
+                            partition = self.write_page_to(partition, output=output)
+                            stats.pages += 1
+                            stats.format += time.perf_counter() - page_start - (stats.es_wait - es_wait)
+                            if buffer.tell() > upload_part_size:
+                                submit_part()
+                            if partition.is_last_page:
+                                if buffer.tell() > 0:
+                                    submit_part()
+                                break
+                            elif size > self.part_size:
+                                break
+            finally:
+                self._prefetcher, self._prefetched, self._stats = None, None, None
+            upload_start = time.perf_counter()
+            part_etags = [part_etag.result() for part_etag in part_etags]
+            stats.upload_wait = time.perf_counter() - upload_start
+        if part_etags:
+            partition = partition.next(*part_etags)
+        log.info('Wrote %i page(s) in %i part(s) of partition %i in %.3fs. '
+                 'ES requests took %.3fs, %.3fs of which were spent waiting. '
+                 'Formatting took %.3fs. '
+                 'Uploads took %.3fs, %.3fs of which were spent waiting.',
+                 stats.pages, stats.parts, index, time.perf_counter() - start,
+                 stats.es, stats.es_wait, stats.format, stats.upload, stats.upload_wait)
+        if partition.is_last_page:
+            if partition.slice_index is None:
+                self.storage.complete_multipart_upload(upload, partition.part_etags)
+                file_name = self.file_name(manifest_key, base_name=partition.file_name)
+                tagging = self.tagging(file_name)
+                if tagging is not None:
+                    self.storage.put_object_tagging(object_key, tagging)
+                return partition.last(file_name)
+            else:
+                # A slice that produced no output has no object to concatenate
+                if partition.part_etags:
                     self.storage.complete_multipart_upload(upload, partition.part_etags)
-                    file_name = self.file_name(manifest_key, base_name=partition.file_name)
-                    tagging = self.tagging(file_name)
-                    if tagging is not None:
-                        self.storage.put_object_tagging(object_key, tagging)
-                    return partition.last(file_name)
                 else:
-                    return partition.next(part_etag=upload_part())
+                    self.storage.abort_multipart_upload(upload)
+                # The base name is combined with that of the other slices
+                return partition.last(partition.file_name)
+        else:
+            return partition
+
+    # Each partition is uploaded in parts of at most this size so that one
+    # part can be uploaded while the next one is written
+
+    upload_part_size = 10 * 1024 * 1024
+
+    assert upload_part_size >= AWS_S3_DEFAULT_MINIMUM_PART_SIZE
+
+    _prefetcher: Optional[ThreadPoolExecutor] = None
+
+    _prefetched: Optional[tuple[Optional[tuple[str, str]], Future[tuple[Response, float]]]] = None
+
+    _stats: Optional[ManifestPartitionStats] = None
+
+    def _fetch_page(self, partition: ManifestPartition) -> tuple[Response, float]:
+        start = time.perf_counter()
+        response = self._create_paged_request(partition).execute()
+        return response, time.perf_counter() - start
+
+    def _execute_paged_request(self, partition: ManifestPartition) -> Response:
+        """
+        Return the response to the request for the current page of the given
+        partition. While a partition is being written, the request for the
+        following page is sent in the background, before this method returns.
+        """
+        start = time.perf_counter()
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched is not None and prefetched[0] == partition.search_after:
+            response, duration = prefetched[1].result()
+        else:
+            response, duration = self._fetch_page(partition)
+        stats = self._stats
+        if stats is not None:
+            stats.es += duration
+            stats.es_wait += time.perf_counter() - start
+            if response.hits:
+                search_after = tuple(response.hits[-1].meta.sort)
+                next_page = attrs.evolve(partition, search_after=search_after)
+                future = self._prefetcher.submit(self._fetch_page, next_page)
+                self._prefetched = search_after, future
+        return response
 
     page_size = 500
 
@@ -1301,7 +1603,8 @@ class PagedManifestGenerator(ManifestGenerator):
         pagination = Pagination(sort='entryId',
                                 order='asc',
                                 size=self.page_size,
-                                search_after=partition.search_after)
+                                search_after=partition.search_after,
+                                exact_total=False)
         pipeline = self._create_pipeline()
         # Only needs this to satisfy the type constraints
         pipeline = ToDictStage(service=self.service,
@@ -1317,8 +1620,144 @@ class PagedManifestGenerator(ManifestGenerator):
                                               entity_type=self.entity_type)
         # The response is processed by the generator, not the pipeline
         request = pipeline.prepare_request(request)
+        if partition.slice_index is not None:
+            bounds = {'gte': partition.slice_start, 'lt': partition.slice_end}
+            bounds = {k: v for k, v in bounds.items() if v is not None}
+            request = request.filter('range', **{'entity_id.keyword': bounds})
         return request
 
+    #: True if the output of this generator can be split into slices that are
+    #: written concurrently and then concatenated. Slices are only supported
+    #: by generators whose output for a page of hits does not depend on the
+    #: pages written before it, except for the output written at the very
+    #: beginning of the manifest.
+    sliceable = False
+
+    # The minimum number of files in each slice of a manifest
+
+    min_slice_size = 100_000
+
+    def slices(self) -> list[ManifestPartition]:
+        """
+        Return the first partition of each slice of the manifest, or an empty
+        list if the manifest shouldn't be sliced.
+        """
+        if self.sliceable and config.manifest_slices > 1:
+            request = self._create_request().extra(size=0, track_total_hits=True)
+            num_files = request.execute().hits.total.value
+            num_slices = min(config.manifest_slices, num_files // self.min_slice_size)
+            if num_slices > 1:
+                log.info('Slicing manifest with %i files into %i slices',
+                         num_files, num_slices)
+                return [
+                    ManifestPartition.first_of_slice(slice_index, slice_start, slice_end)
+                    for slice_index, (slice_start, slice_end)
+                    in enumerate(self._slice_bounds(num_slices))
+                ]
+        return []
+
+    @classmethod
+    def _slice_bounds(cls, num_slices: int) -> list[tuple[Optional[str], Optional[str]]]:
+        """
+        Split the range of entity IDs into the given number of contiguous
+        slices. The slices are of equal size if the entity IDs are hexadecimal
+        UUIDs.
+
+        >>> PagedManifestGenerator._slice_bounds(4)
+        [(None, '4000'), ('4000', '8000'), ('8000', 'c000'), ('c000', None)]
+
+        >>> PagedManifestGenerator._slice_bounds(3)
+        [(None, '5555'), ('5555', 'aaaa'), ('aaaa', None)]
+        """
+        bounds = [f'{i * 0x10000 // num_slices:04x}' for i in range(1, num_slices)]
+        return list(zip([None, *bounds], [*bounds, None]))
+
+    @classmethod
+    def _slice_object_key(cls, manifest_key: ManifestKey, slice_index: int) -> str:
+        return f'{cls.s3_object_key(manifest_key)}.slice.{slice_index}'
+
+    # The maximum size of the parts copied from the slices of a manifest when
+    # they are concatenated. S3 limits the size of a part to 5 GiB.
+
+    copy_part_size = 1024 * 1024 * 1024
+
+    def concatenate(self,
+                    manifest_key: ManifestKey,
+                    slices: Sequence[ManifestPartition]
+                    ) -> str:
+        """
+        Concatenate the slices of a manifest, each represented by its last
+        partition, store the result under the given key and return the file
+        name of the manifest. Most of the content is copied by S3. Only the
+        few bytes needed to pad parts to the minimum part size are downloaded
+        and uploaded again.
+        """
+        assert [s.slice_index for s in slices] == list(range(len(slices))), slices
+        assert all(s.is_last for s in slices), slices
+        object_key = self.s3_object_key(manifest_key)
+        slice_keys = [
+            self._slice_object_key(manifest_key, s.slice_index)
+            for s in slices
+            if s.part_etags
+        ]
+        upload = self.storage.create_multipart_upload(object_key)
+        min_part_size = AWS_S3_DEFAULT_MINIMUM_PART_SIZE
+        part_etags: list[str | Future[str]] = []
+        pending = bytearray()
+
+        def upload_pending():
+            part_etag = self.storage.upload_multipart_part(BytesIO(pending),
+                                                           len(part_etags) + 1,
+                                                           upload)
+            part_etags.append(part_etag)
+            pending.clear()
+
+        with ThreadPoolExecutor(max_workers=MULTIPART_UPLOAD_MAX_WORKERS) as tpe:
+            for slice_key in slice_keys:
+                size = self.storage.head(slice_key)['ContentLength']
+                offset = 0
+                if pending:
+                    # Pad the pending part with the beginning of this slice
+                    offset = min(min_part_size - len(pending), size)
+                    pending += self.storage.get_range(slice_key, 0, offset)
+                if size - offset < min_part_size:
+                    if offset < size:
+                        pending += self.storage.get_range(slice_key, offset, size)
+                else:
+                    if pending:
+                        upload_pending()
+                    while offset < size:
+                        end = offset + self.copy_part_size
+                        # Extend the part to the end of the slice instead of
+                        # leaving a remainder that is too small to be a part
+                        if size - end < min_part_size:
+                            end = size
+                        part_etags.append(tpe.submit(self.storage.copy_multipart_part,
+                                                     slice_key, offset, end,
+                                                     len(part_etags) + 1, upload))
+                        offset = end
+                if len(pending) >= min_part_size:
+                    upload_pending()
+            if pending:
+                upload_pending()
+            part_etags = [
+                part_etag if isinstance(part_etag, str) else part_etag.result()
+                for part_etag in part_etags
+            ]
+        self.storage.complete_multipart_upload(upload, part_etags)
+        log.info('Concatenated %i slice(s) of manifest %r in %i part(s)',
+                 len(slice_keys), object_key, len(part_etags))
+        # Slices without any hits don't affect the base name
+        base_names = {s.file_name for s in slices if s.page_index}
+        file_name = self.file_name(manifest_key,
+                                   base_name=one(base_names) if len(base_names) == 1 else None)
+        tagging = self.tagging(file_name)
+        if tagging is not None:
+            self.storage.put_object_tagging(object_key, tagging)
+        for slice_key in slice_keys:
+            self.storage.delete(slice_key)
+        return file_name
+
 
 class FileBasedManifestGenerator(ManifestGenerator):
     """
@@ -1357,6 +1796,8 @@ class FileBasedManifestGenerator(ManifestGenerator):
 
 class CurlManifestGenerator(PagedManifestGenerator):
 
+    sliceable = True
+
     @classmethod
     def format(cls) -> ManifestFormat:
         return ManifestFormat.curl
@@ -1476,7 +1917,7 @@ class CurlManifestGenerator(PagedManifestGenerator):
                 output.write(f'url={self._option(file_url)}\n'
                              f'output={self._option(output_name)}\n\n')
 
-        if partition.page_index == 0:
+        if partition.is_first_page:
             curl_options = [
                 '--create-dirs',  # Allow curl to create folders
                 '--compressed',  # Request a compressed response
@@ -1492,8 +1933,7 @@ class CurlManifestGenerator(PagedManifestGenerator):
             output.write('\n\n'.join(curl_options))
             output.write('\n\n')
 
-        request = self._create_paged_request(partition)
-        response = request.execute()
+        response = self._execute_paged_request(partition)
         if response.hits:
             hit = None
             for hit in response.hits:
@@ -1605,6 +2045,8 @@ class CurlManifestGenerator(PagedManifestGenerator):
 
 class CompactManifestGenerator(PagedManifestGenerator):
 
+    sliceable = True
+
     @classmethod
     def format(cls) -> ManifestFormat:
         return ManifestFormat.compact
@@ -1636,11 +2078,10 @@ class CompactManifestGenerator(PagedManifestGenerator):
         column_names = list(chain.from_iterable(map(dict.values, column_mappings)))
         writer = csv.DictWriter(output, column_names, dialect='excel-tab')
 
-        if partition.page_index == 0:
+        if partition.is_first_page:
             writer.writeheader()
 
-        request = self._create_paged_request(partition)
-        response = request.execute()
+        response = self._execute_paged_request(partition)
         if response.hits:
             project_short_names = set()
             hit = None
@@ -1699,7 +2140,7 @@ Bundle = dict[Qualifier, Groups]
 Bundles = dict[FQID, Bundle]
 
 
-class PFBManifestGenerator(FileBasedManifestGenerator):
+class PFBManifestGenerator(PagedManifestGenerator):
 
     @classmethod
     def format(cls) -> ManifestFormat:
@@ -1725,30 +2166,48 @@ class PFBManifestGenerator(FileBasedManifestGenerator):
         """
         return []
 
-    def _all_docs_sorted(self) -> Iterable[JSON]:
-        request = self._create_request()
-        request = request.params(preserve_order=True).sort('entity_id.keyword')
-        for hit in request.scan():
-            doc = self._hit_to_doc(hit)
-            yield doc
-
-    def create_file(self) -> tuple[str, Optional[str]]:
+    @cached_property
+    def _pfb_field_types(self) -> FieldTypes:
         transformers = self.service.transformer_types(self.catalog)
         transformer = one(t for t in transformers if t.entity_type() == 'files')
-        field_types = transformer.field_types()
-        pfb_schema = avro_pfb.pfb_schema_from_field_types(field_types)
+        return transformer.field_types()
+
+    @cached_property
+    def _pfb_schema(self) -> JSON:
+        return avro_pfb.pfb_schema_from_field_types(self._pfb_field_types)
 
-        converter = avro_pfb.PFBConverter(pfb_schema, self.repository_plugin)
-        for doc in self._all_docs_sorted():
-            converter.add_doc(doc)
+    @cached_property
+    def _pfb_converter(self) -> avro_pfb.PFBConverter:
+        return avro_pfb.PFBConverter(self._pfb_schema, self.repository_plugin)
 
-        entity = avro_pfb.pfb_metadata_entity(field_types)
-        entities = itertools.chain([entity], converter.entities())
+    def _page_output(self, buffer: BytesIO) -> ContextManager[IO]:
+        return nullcontext(buffer)
 
-        fd, path = mkstemp(suffix='.avro')
-        os.close(fd)
-        avro_pfb.write_pfb_entities(entities, pfb_schema, path)
-        return path, None
+    def write_page_to(self,
+                      partition: ManifestPartition,
+                      output: IO[bytes]
+                      ) -> ManifestPartition:
+        # The header is written only once, at the beginning of the PFB. The
+        # entities of every page are written as if they were appended to a PFB
+        # consisting of just that header, which is then stripped.
+        header = avro_pfb.pfb_header(self._pfb_schema)
+        entities = []
+        if partition.is_first_page:
+            output.write(header)
+            entities.append(avro_pfb.pfb_metadata_entity(self._pfb_field_types))
+        response = self._execute_paged_request(partition)
+        for hit in response.hits:
+            doc = self._hit_to_doc(hit)
+            entities.extend(self._pfb_converter.convert_doc(doc))
+        with BytesIO() as buffer:
+            buffer.write(header)
+            avro_pfb.write_pfb_entities(entities, self._pfb_schema, buffer)
+            output.write(buffer.getbuffer()[len(header):])
+        if response.hits:
+            search_after = tuple(response.hits[-1].meta.sort)
+            return partition.next_page(file_name=None, search_after=search_after)
+        else:
+            return partition.last_page()
 
 
 class BDBagManifestGenerator(FileBasedManifestGenerator):
@@ -1813,27 +2272,33 @@ class BDBagManifestGenerator(FileBasedManifestGenerator):
     column_path_separator = '__'
 
     @classmethod
-    def _remove_redundant_entries(cls, bundles: Bundles) -> None:
+    def _file_fingerprint(cls, file_uuid: str) -> int:
+        """
+        A compact representation of the file with the given UUID: a 64-bit
+        prefix of the hash of the UUID.
         """
-        Remove bundle entries from dict that are redundant based on the set of
-        files it contains (e.g. a primary bundle is made redundant by its derived
+        return int.from_bytes(sha256(file_uuid.encode()).digest()[:8], 'big', signed=True)
+
+    @classmethod
+    def _redundant_bundles(cls, bundle_files: Mapping[FQID, array]) -> set[FQID]:
+        """
+        Return the bundles that are redundant based on the set of files each
+        bundle contains (e.g. a primary bundle is made redundant by its derived
         analysis bundle if the primary only has a subset of files that the
         analysis bundle contains or if they both have the same files).
+
+        :param bundle_files: The sorted and distinct fingerprints of the files
+                             in each bundle, see :meth:`_file_fingerprint`
         """
         redundant_keys = set()
-        # Get a forward mapping of bundle FQID to a set of file uuid
-        bundle_to_file: dict[FQID, set[str]] = defaultdict(set)
-        for bundle_fqid, file_types in bundles.items():
-            for groups in file_types.values():
-                for group in groups:
-                    bundle_to_file[bundle_fqid].add(group['file']['file_uuid'])
-        # Get a reverse mapping of file uuid to set of bundle fqid
-        file_to_bundle = defaultdict(set)
-        for fqid, files in bundle_to_file.items():
+        # Get a reverse mapping of file fingerprint to the bundles containing
+        # the file. Fingerprints are distinct within a bundle.
+        file_to_bundle = defaultdict(list)
+        for fqid, files in bundle_files.items():
             for file in files:
-                file_to_bundle[file].add(fqid)
+                file_to_bundle[file].append(fqid)
         # Find any file sets that are subset or equal to another
-        for fqid_a, files_a in bundle_to_file.items():
+        for fqid_a, files_a in bundle_files.items():
             if fqid_a in redundant_keys:
                 continue
             related_bundles: set[FQID] = set(fqid_b
@@ -1841,32 +2306,197 @@ class BDBagManifestGenerator(FileBasedManifestGenerator):
                                              for fqid_b in file_to_bundle[file]
                                              if fqid_b != fqid_a and fqid_b not in redundant_keys)
             for fqid_b in related_bundles:
-                files_b = bundle_to_file[fqid_b]
+                files_b = bundle_files[fqid_b]
                 # If sets are equal remove the one with a lesser bundle version
                 if files_a == files_b:
                     redundant_keys.add(fqid_a if fqid_a[1] < fqid_b[1] else fqid_b)
                     break
                 # If set is a subset of another remove the subset
-                elif files_a.issubset(files_b):
+                elif len(files_a) < len(files_b) and set(files_a).issubset(files_b):
                     redundant_keys.add(fqid_a)
                     break
-        # remove the redundant entries
-        for fqid in redundant_keys:
-            del bundles[fqid]
+        return redundant_keys
+
+    def _qualifier(self, file: JSON) -> Qualifier:
+        """
+        The column qualifier for the given file. The qualifier will be used to
+        prefix the names of file-specific columns in the TSV.
+        """
+        qualifier: Qualifier = file['file_format']
+        if qualifier in ('fastq.gz', 'fastq'):
+            qualifier = f"fastq_{file['read_index']}"
+        # Terra requires column headers only contain alphanumeric
+        # characters, underscores, and dashes.
+        # See https://github.com/DataBiosphere/azul/issues/2182
+        return re.sub(r'[^A-Za-z0-9_-]', '-', qualifier)
+
+    def _bundle_fqid(self, doc_bundle: JSON) -> FQID:
+        # Versions indexed by TDR contain ':', but Terra won't allow ':'
+        # in the 'entity:participant_id' field
+        return doc_bundle['uuid'], doc_bundle['version'].replace(':', '')
+
+    def _scan_bundles(self) -> tuple[dict[FQID, array], dict[FQID, dict[Qualifier, int]]]:
+        """
+        Scan the file documents matching the filters, retrieving only the fields
+        needed to determine the bundles and columns of the TSV. Return the
+        sorted and distinct fingerprints of the files in each bundle, see
+        :meth:`_file_fingerprint`, and the number of files in each bundle by
+        qualifier.
+        """
+        bundle_files: dict[FQID, array] = defaultdict(lambda: array('q'))
+        bundle_groups: dict[FQID, dict[Qualifier, int]] = defaultdict(lambda: defaultdict(int))
+        request = self._create_request().source(includes=[
+            'contents.files.uuid',
+            'contents.files.file_format',
+            'contents.files.read_index',
+            'bundles.uuid',
+            'bundles.version'
+        ])
+        for hit in request.scan():
+            doc = self._hit_to_doc(hit)
+            file = one(cast(JSONs, doc['contents']['files']))
+            qualifier = self._qualifier(file)
+            fingerprint = self._file_fingerprint(file['uuid'])
+            for doc_bundle in doc['bundles']:
+                bundle_fqid = self._bundle_fqid(doc_bundle)
+                bundle_files[bundle_fqid].append(fingerprint)
+                bundle_groups[bundle_fqid][qualifier] += 1
+        for bundle_fqid, files in bundle_files.items():
+            bundle_files[bundle_fqid] = array('q', sorted(set(files)))
+        return bundle_files, bundle_groups
+
+    # The maximum number of bundles whose rows are assembled at the same time
+    # when writing the TSV
+
+    bundle_batch_size = 1000
 
     def _samples_tsv(self, bundle_tsv: IO[str]) -> None:
         """
-        Write `samples.tsv` to the given stream.
+        Write `samples.tsv` to the given stream. A first pass over the matching
+        file documents determines the bundles to include and the columns of the
+        TSV. A second pass writes the rows, assembling the rows of a limited
+        number of bundles at a time.
         """
         # The cast is safe because deepcopy makes a copy that we *can* modify
         other_column_mappings = cast(MutableManifestConfig, deepcopy(self.manifest_config))
         bundle_column_mapping = other_column_mappings.pop(('bundles',))
         file_column_mapping = other_column_mappings.pop(('contents', 'files'))
 
-        bundles: Bundles = defaultdict(lambda: defaultdict(list))
+        bundle_files, bundle_groups = self._scan_bundles()
+        redundant_keys = self._redundant_bundles(bundle_files)
+        del bundle_files
+
+        # Track the max number of groups for each qualifier in any bundle
+        num_groups_per_qualifier = defaultdict(int)
+        for bundle_fqid, num_groups in bundle_groups.items():
+            if bundle_fqid not in redundant_keys:
+                for qualifier, num in num_groups.items():
+                    if num > num_groups_per_qualifier[qualifier]:
+                        num_groups_per_qualifier[qualifier] = num
+        bundle_fqids = [
+            bundle_fqid
+            for bundle_fqid in bundle_groups.keys()
+            if bundle_fqid not in redundant_keys
+        ]
+        del bundle_groups
+
+        # Return a complete column name by adding a qualifier and optionally a
+        # numeric index. The index is necessary to distinguish between more than
+        # one file per file format
+        def qualify(qualifier, column_name, index=None):
+            if index is not None:
+                qualifier = f'{qualifier}_{index}'
+            return f'{self.column_path_separator}{qualifier}{self.column_path_separator}{column_name}'
+
+        # Compute the column names in deterministic order, bundle_columns first
+        # followed by other columns
+        column_names = dict.fromkeys(chain(
+            ['entity:participant_id'],
+            bundle_column_mapping.values(),
+            *map(dict.values, other_column_mappings.values())))
+
+        # Add file columns for each qualifier and group
+        for qualifier, num_groups in sorted(num_groups_per_qualifier.items()):
+            for index in range(num_groups):
+                for column_name in file_column_mapping.values():
+                    index = None if num_groups == 1 else index
+                    column_names[qualify(qualifier, column_name, index=index)] = None
+
+        # Write the TSV header. If the index changed between the two passes,
+        # the second one may yield cells for columns that aren't in the header.
+        bundle_tsv_writer = csv.DictWriter(bundle_tsv,
+                                           column_names,
+                                           dialect='excel-tab',
+                                           extrasaction='ignore')
+        bundle_tsv_writer.writeheader()
+
+        for batch in chunked(bundle_fqids, self.bundle_batch_size):
+            bundles = self._bundles(batch,
+                                    other_column_mappings=other_column_mappings,
+                                    bundle_column_mapping=bundle_column_mapping,
+                                    file_column_mapping=file_column_mapping)
+            # Write the actual rows of the TSV
+            for bundle in bundles.values():
+                row = {}
+                for qualifier, groups in bundle.items():
+                    # Sort the groups by reversed file name. This essentially
+                    # sorts by file extension and any other more general
+                    # suffixes preceding the extension. It ensures that
+                    # `patient1_qc.bam` and `patient2_qc.bam` always end up in
+                    # qualifier `bam[0]` while `patient1_metric.bam` and
+                    # `patient2_metric.bam` end up in qualifier `bam[1]`.
+                    groups.sort(key=lambda group: group['file']['file_name'][::-1])
+                    for i, group in enumerate(groups):
+                        for entity, cells in group.items():
+                            if entity == 'bundle':
+                                # The bundle-specific cells should be consistent across all files in a bundle
+                                if row:
+                                    row.update(cells)
+                                else:
+                                    assert cells.items() <= row.items()
+                            elif entity == 'other':
+                                # Cells from other entities need to be concatenated.
+                                # Note that for fields that differ between the files
+                                # in a bundle this algorithm retains the values but
+                                # loses the association between each individual
+                                # value and the respective file.
+                                for column_name, cell_value in cells.items():
+                                    row.setdefault(column_name, set()).update(cell_value.split(self.padded_joiner))
+                            elif entity == 'file':
+                                # Since file-specific cells are placed into
+                                # qualified columns, no concatenation is necessary
+                                index = None if num_groups_per_qualifier[qualifier] == 1 else i
+                                row.update((qualify(qualifier, column_name, index=index), cell)
+                                           for column_name, cell in cells.items())
+                            else:
+                                assert False
+                # Join concatenated values using the joiner
+                row = {k: self.padded_joiner.join(sorted(v)) if isinstance(v, set) else v for k, v in row.items()}
+                missing_columns = row.keys() - column_names.keys()
+                if missing_columns:
+                    log.warning('Omitting cells of bundle %r in columns missing from the '
+                                'header: %r', row['entity:participant_id'], sorted(missing_columns))
+                bundle_tsv_writer.writerow(row)
+
+    def _bundles(self,
+                 bundle_fqids: Iterable[FQID],
+                 *,
+                 other_column_mappings: ManifestConfig,
+                 bundle_column_mapping: ColumnMapping,
+                 file_column_mapping: ColumnMapping
+                 ) -> Bundles:
+        """
+        Extract the cells of the files in the given bundles, grouped by bundle
+        and qualifier.
+        """
+        bundle_fqids = set(bundle_fqids)
+        bundles: Bundles = {bundle_fqid: defaultdict(list) for bundle_fqid in bundle_fqids}
+        bundle_uuids = sorted({bundle_uuid for bundle_uuid, _ in bundle_fqids})
+        request = self._create_request()
+        request = request.filter('terms', **{'bundles.uuid.keyword': bundle_uuids})
 
         # For each outer file entity_type in the response …
-        for hit in self._create_request().scan():
+        for hit in request.scan():
             doc = self._hit_to_doc(hit)
             # Extract fields from inner entities other than bundles or files
             other_cells = {}
@@ -1886,22 +2516,14 @@ class BDBagManifestGenerator(FileBasedManifestGenerator):
                                  column_mapping=file_column_mapping,
                                  row=file_cells)
 
-            # Determine the column qualifier. The qualifier will be used to
-            # prefix the names of file-specific columns in the TSV
-            qualifier: Qualifier = file['file_format']
-            if qualifier in ('fastq.gz', 'fastq'):
-                qualifier = f"fastq_{file['read_index']}"
-            # Terra requires column headers only contain alphanumeric
-            # characters, underscores, and dashes.
-            # See https://github.com/DataBiosphere/azul/issues/2182
-            qualifier = re.sub(r'[^A-Za-z0-9_-]', '-', qualifier)
-
-            # For each bundle containing the current file …
+            qualifier = self._qualifier(file)
+
+            # For each bundle in the batch containing the current file …
             doc_bundle: JSON
             for doc_bundle in doc['bundles']:
-                # Versions indexed by TDR contain ':', but Terra won't allow ':'
-                # in the 'entity:participant_id' field
-                bundle_fqid: FQID = doc_bundle['uuid'], doc_bundle['version'].replace(':', '')
+                bundle_fqid = self._bundle_fqid(doc_bundle)
+                if bundle_fqid not in bundle_fqids:
+                    continue
 
                 bundle_cells = {'entity:participant_id': '.'.join(bundle_fqid)}
                 self._extract_fields(field_path=('bundles',),
@@ -1917,78 +2539,4 @@ class BDBagManifestGenerator(FileBasedManifestGenerator):
                     'other': other_cells
                 }
                 bundles[bundle_fqid][qualifier].append(group)
-
-        self._remove_redundant_entries(bundles)
-
-        # Return a complete column name by adding a qualifier and optionally a
-        # numeric index. The index is necessary to distinguish between more than
-        # one file per file format
-        def qualify(qualifier, column_name, index=None):
-            if index is not None:
-                qualifier = f'{qualifier}_{index}'
-            return f'{self.column_path_separator}{qualifier}{self.column_path_separator}{column_name}'
-
-        num_groups_per_qualifier = defaultdict(int)
-
-        # Track the max number of groups for each qualifier in any bundle
-        for bundle in bundles.values():
-            for qualifier, groups in bundle.items():
-                # Sort the groups by reversed file name. This essentially sorts
-                # by file extension and any other more general suffixes
-                # preceding the extension. It ensures that `patient1_qc.bam` and
-                # `patient2_qc.bam` always end up in qualifier `bam[0]` while
-                # `patient1_metric.bam` and `patient2_metric.bam` end up in
-                # qualifier `bam[1]`.
-                groups.sort(key=lambda group: group['file']['file_name'][::-1])
-                if len(groups) > num_groups_per_qualifier[qualifier]:
-                    num_groups_per_qualifier[qualifier] = len(groups)
-
-        # Compute the column names in deterministic order, bundle_columns first
-        # followed by other columns
-        column_names = dict.fromkeys(chain(
-            ['entity:participant_id'],
-            bundle_column_mapping.values(),
-            *map(dict.values, other_column_mappings.values())))
-
-        # Add file columns for each qualifier and group
-        for qualifier, num_groups in sorted(num_groups_per_qualifier.items()):
-            for index in range(num_groups):
-                for column_name in file_column_mapping.values():
-                    index = None if num_groups == 1 else index
-                    column_names[qualify(qualifier, column_name, index=index)] = None
-
-        # Write the TSV header
-        bundle_tsv_writer = csv.DictWriter(bundle_tsv, column_names, dialect='excel-tab')
-        bundle_tsv_writer.writeheader()
-
-        # Write the actual rows of the TSV
-        for bundle in bundles.values():
-            row = {}
-            for qualifier, groups in bundle.items():
-                for i, group in enumerate(groups):
-                    for entity, cells in group.items():
-                        if entity == 'bundle':
-                            # The bundle-specific cells should be consistent across all files in a bundle
-                            if row:
-                                row.update(cells)
-                            else:
-                                assert cells.items() <= row.items()
-                        elif entity == 'other':
-                            # Cells from other entities need to be concatenated.
-                            # Note that for fields that differ between the files
-                            # in a bundle this algorithm retains the values but
-                            # loses the association between each individual
-                            # value and the respective file.
-                            for column_name, cell_value in cells.items():
-                                row.setdefault(column_name, set()).update(cell_value.split(self.padded_joiner))
-                        elif entity == 'file':
-                            # Since file-specific cells are placed into
-                            # qualified columns, no concatenation is necessary
-                            index = None if num_groups_per_qualifier[qualifier] == 1 else i
-                            row.update((qualify(qualifier, column_name, index=index), cell)
-                                       for column_name, cell in cells.items())
-                        else:
-                            assert False
-            # Join concatenated values using the joiner
-            row = {k: self.padded_joiner.join(sorted(v)) if isinstance(v, set) else v for k, v in row.items()}
-            bundle_tsv_writer.writerow(row)
+        return bundles
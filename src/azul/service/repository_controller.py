@@ -14,6 +14,7 @@ from typing import (
 from chalice import (
     BadRequestError,
     NotFoundError,
+    Response,
 )
 
 from azul import (
@@ -35,6 +36,9 @@ from azul.http import (
 from azul.indexer.document import (
     FieldType,
 )
+from azul.json import (
+    json_chunks,
+)
 from azul.plugins import (
     RepositoryFileDownload,
     RepositoryPlugin,
@@ -81,7 +85,7 @@ class RepositoryController(SourceController):
                filters: Optional[str],
                pagination: Pagination,
                authentication: Authentication
-               ) -> JSON:
+               ) -> Response:
         filters = self.get_filters(catalog, authentication, filters)
         try:
             response = self.service.search(catalog=catalog,
@@ -94,7 +98,10 @@ class RepositoryController(SourceController):
             raise BadRequestError(e)
         except (EntityNotFoundError, IndexNotFoundError) as e:
             raise NotFoundError(e)
-        return cast(JSON, response)
+        # The hits are made and serialized one at a time, so that only the
+        # serialized form of the response needs to be retained in its entirety
+        body = ''.join(json_chunks(response))
+        return Response(body=body, headers={'Content-Type': 'application/json'})
 
     def summary(self,
                 *,
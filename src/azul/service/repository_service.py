@@ -6,22 +6,25 @@ from collections.abc import (
     Mapping,
     Sequence,
 )
-from concurrent.futures import (
-    ThreadPoolExecutor,
+from functools import (
+    partial,
 )
 import json
 import logging
 from typing import (
+    ClassVar,
     Optional,
     TYPE_CHECKING,
 )
 
 import elasticsearch
 from elasticsearch_dsl import (
+    MultiSearch,
     Search,
 )
 from elasticsearch_dsl.response import (
     Hit,
+    Response,
 )
 from more_itertools import (
     first,
@@ -33,7 +36,16 @@ from azul import (
     cache,
     config,
 )
+from azul.indexer.document import (
+    EntityType,
+    IndexName,
+)
+from azul.indexer.rollup import (
+    SummaryRollup,
+    merge_rollup,
+)
 from azul.plugins import (
+    DocumentSlice,
     RepositoryPlugin,
     dotted,
 )
@@ -43,6 +55,7 @@ from azul.service import (
     Filters,
 )
 from azul.service.elasticsearch_service import (
+    ElasticsearchChain,
     ElasticsearchService,
     ElasticsearchStage,
     IndexNotFoundError,
@@ -52,6 +65,9 @@ from azul.service.elasticsearch_service import (
     ToDictStage,
     _ElasticsearchStage,
 )
+from azul.service.response_cache import (
+    ResponseCache,
+)
 from azul.types import (
     AnyMutableJSON,
     JSON,
@@ -64,6 +80,9 @@ from azul.uuids import (
 log = logging.getLogger(__name__)
 
 
+FilePaths = Mapping[str, 'FilePaths']
+
+
 class EntityNotFoundError(Exception):
 
     def __init__(self, entity_type: str, entity_id: str):
@@ -73,7 +92,19 @@ class EntityNotFoundError(Exception):
 class SearchResponseStage(_ElasticsearchStage[ResponseTriple, MutableJSON],
                           metaclass=ABCMeta):
 
+    @property
+    def document_slice(self) -> Optional[DocumentSlice]:
+        """
+        The slice of each hit that is read by this stage, to be combined with
+        the slice applied by the inner stages, or None if this stage reads all
+        properties the inner stages let through.
+        """
+        return None
+
     def prepare_request(self, request: Search) -> Search:
+        document_slice = self.document_slice
+        if document_slice is not None:
+            request = request.source(**document_slice)
         return request
 
 
@@ -114,7 +145,10 @@ class RepositoryService(ElasticsearchService):
         :param file_url_func: A function that is used only when getting a *list* of files data.
         It creates the files URL based on info from the request. It should have the type
         signature `(uuid: str, **params) -> str`
-        :return: The Elasticsearch JSON response
+        :return: The Elasticsearch JSON response. Unless an item ID is given,
+                 the `hits` property of the response is an iterator that is
+                 consumed while the response is serialized, see
+                 :func:`azul.json.json_chunks`.
         """
         if item_id is not None:
             validate_uuid(item_id)
@@ -126,30 +160,24 @@ class RepositoryService(ElasticsearchService):
                                 aggregate=item_id is None,
                                 entity_type=entity_type)
 
-        for hit in response['hits']:
-            entity = one(hit[entity_type])
-            source_id = one(hit['sources'])['sourceId']
-            entity['accessible'] = source_id in filters.source_ids
+        needs_drs_uri = self.repository_plugin(catalog).file_download_class().needs_drs_uri
 
-        def inject_file_urls(node: AnyMutableJSON, *path: str) -> None:
-            if node is None:
-                pass
-            elif isinstance(node, (str, int, float, bool)):
-                pass
-            elif isinstance(node, list):
+        def inject_file_urls(node: AnyMutableJSON, paths: FilePaths) -> None:
+            if isinstance(node, list):
                 for child in node:
-                    inject_file_urls(child, *path)
+                    inject_file_urls(child, paths)
             elif isinstance(node, dict):
-                if path:
-                    try:
-                        next_node = node[path[0]]
-                    except KeyError:
-                        # Not all node trees will match the given path. (e.g. a
-                        # response from the 'files' index won't have a
-                        # 'matrices' in its 'hits[].projects' inner entities.
-                        pass
-                    else:
-                        inject_file_urls(next_node, *path[1:])
+                if paths:
+                    for key, child_paths in paths.items():
+                        try:
+                            child = node[key]
+                        except KeyError:
+                            # Not all node trees will match the given path. (e.g. a
+                            # response from the 'files' index won't have a
+                            # 'matrices' in its 'hits[].projects' inner entities.
+                            pass
+                        else:
+                            inject_file_urls(child, child_paths)
                 else:
                     try:
                         version = node['version']
@@ -157,27 +185,51 @@ class RepositoryService(ElasticsearchService):
                         drs_uri = node['drs_uri']
                     except KeyError:
                         for child in node.values():
-                            inject_file_urls(child, *path)
+                            inject_file_urls(child, paths)
                     else:
-                        plugin = self.repository_plugin(catalog)
-                        if drs_uri is None and plugin.file_download_class().needs_drs_uri:
+                        if drs_uri is None and needs_drs_uri:
                             node['url'] = None
                         else:
                             node['url'] = str(file_url_func(catalog=catalog,
                                                             fetch=False,
                                                             file_uuid=uuid,
                                                             version=version))
+            elif node is None or isinstance(node, (str, int, float, bool)):
+                pass
             else:
                 assert False
 
-        inject_file_urls(response['hits'], 'projects', 'contributedAnalyses')
-        inject_file_urls(response['hits'], 'projects', 'matrices')
-        inject_file_urls(response['hits'], 'files')
+        def process_hit(hit: MutableJSON) -> MutableJSON:
+            entity = one(hit[entity_type])
+            source_id = one(hit['sources'])['sourceId']
+            entity['accessible'] = source_id in filters.source_ids
+            inject_file_urls(hit, self.file_paths)
+            return hit
+
+        response['hits'] = map(process_hit, response['hits'])
 
         if item_id is not None:
             response = one(response['hits'], too_short=EntityNotFoundError(entity_type, item_id))
         return response
 
+    #: The paths to the nodes in each hit that contain files, as a tree. Each
+    #: key is followed into the respective child node, so that the nodes shared
+    #: by the paths are only visited once. Once a leaf of this tree is reached,
+    #: every file in the subtree below the current node gets a URL.
+    #:
+    file_paths: ClassVar[FilePaths] = {
+        'projects': {
+            'contributedAnalyses': {},
+            'matrices': {}
+        },
+        'files': {}
+    }
+
+    #: The cache of responses from this and other instances in the current
+    #: process
+    #:
+    response_cache: ClassVar[ResponseCache]
+
     def _search(self,
                 *,
                 catalog: CatalogName,
@@ -186,6 +238,36 @@ class RepositoryService(ElasticsearchService):
                 filters: Filters,
                 pagination: Pagination
                 ) -> MutableJSON:
+        key = (
+            'search',
+            entity_type,
+            aggregate,
+            self._filters_cache_key(filters),
+            # The pagination determines the URLs of the next and previous page
+            repr(pagination)
+        )
+        compute = partial(self._search_uncached,
+                          catalog=catalog,
+                          entity_type=entity_type,
+                          aggregate=aggregate,
+                          filters=filters,
+                          pagination=pagination,
+                          # Only a complete response can be cached
+                          lazy=not self.response_cache.enabled)
+        return self.response_cache.get_or_compute(catalog, key, compute)
+
+    def _filters_cache_key(self, filters: Filters) -> str:
+        return json.dumps(filters.to_json(), sort_keys=True)
+
+    def _search_uncached(self,
+                         *,
+                         catalog: CatalogName,
+                         entity_type: str,
+                         aggregate: bool,
+                         filters: Filters,
+                         pagination: Pagination,
+                         lazy: bool
+                         ) -> MutableJSON:
         """
         This function does the whole transformation process. It takes the path
         of the config file, the filters, and pagination, if any. Excluding
@@ -203,6 +285,10 @@ class RepositoryService(ElasticsearchService):
 
         :param pagination: Pagination to be used for the API
 
+        :param lazy: If True, the `hits` property of the response is an
+                     iterator that translates each hit as it is consumed,
+                     otherwise it is a list.
+
         :return: Returns the transformed request
         """
         plugin = self.metadata_plugin(catalog)
@@ -250,14 +336,24 @@ class RepositoryService(ElasticsearchService):
         except elasticsearch.NotFoundError as e:
             raise IndexNotFoundError(e.info['error']['index'])
         response = chain.process_response(response)
+        if not lazy:
+            response['hits'] = list(response['hits'])
         return response
 
     def summary(self,
                 catalog: CatalogName,
                 filters: Filters
                 ) -> MutableJSON:
-        # FIXME: Due to the fact that we run multiple requests in parallel each
-        #        in a separate chain, and the resulting need to multiplex the
+        key = ('summary', self._filters_cache_key(filters))
+        compute = partial(self._summary_uncached, catalog, filters)
+        return self.response_cache.get_or_compute(catalog, key, compute)
+
+    def _summary_uncached(self,
+                          catalog: CatalogName,
+                          filters: Filters
+                          ) -> MutableJSON:
+        # FIXME: Due to the fact that we run multiple requests, each in a
+        #        separate chain, and the resulting need to multiplex the
         #        responses, the response stage is not part of any chain.
         #        https://github.com/DataBiosphere/azul/issues/4128
         plugin = self.metadata_plugin(catalog)
@@ -265,29 +361,109 @@ class RepositoryService(ElasticsearchService):
 
         aggs_by_authority = response_stage.aggs_by_authority
 
-        def summary(entity_type):
-            return entity_type, self._summary(catalog=catalog,
-                                              entity_type=entity_type,
-                                              filters=filters)
-
-        with ThreadPoolExecutor(max_workers=len(aggs_by_authority)) as executor:
-            aggs = dict(executor.map(summary, aggs_by_authority))
+        rollup, rollups = self.summary_rollup(catalog), None
+        if rollup is not None:
+            source_ids = self._rollup_source_ids(catalog, filters)
+            if source_ids is not None:
+                rollups = self._read_rollups(rollup, source_ids)
+                # Only the aggregations not covered by the rollup are left to ES
+                aggs_by_authority = {
+                    entity_type: summary_fields
+                    for entity_type, summary_fields in aggs_by_authority.items()
+                    if entity_type not in rollup.entity_types
+                }
+
+        chains = {
+            entity_type: self._summary_chain(catalog=catalog,
+                                             entity_type=entity_type,
+                                             filters=filters)
+            for entity_type in aggs_by_authority
+        }
+        requests = {
+            entity_type: chain.prepare_request(self.create_request(catalog, entity_type))
+            for entity_type, chain in chains.items()
+        }
+        if not requests:
+            responses = []
+        elif config.es_async:
+            # The requests against the indices of the individual entity types
+            # are sent concurrently, their responses are returned in the order
+            # of the requests.
+            responses = self.run_concurrently(*map(self.execute_async, requests.values()))
+        else:
+            # The requests against the indices of the individual entity types
+            # are sent in a single round trip, their responses are returned in
+            # the order of the requests.
+            request = MultiSearch(using=self._es_client)
+            for request_ in requests.values():
+                request = request.add(request_)
+
+            if config.debug == 2 and log.isEnabledFor(logging.DEBUG):
+                log.debug('Elasticsearch request: %s', json.dumps(request.to_dict(), indent=4))
+
+            responses = request.execute()
+
+        aggs = {}
+        for (entity_type, chain), response in zip(chains.items(), responses, strict=True):
+            assert len(response.hits) == 0
+            aggs[entity_type] = chain.process_response(response)
 
         aggs = {
             agg_name: aggs[entity_type][agg_name]
             for entity_type, summary_fields in aggs_by_authority.items()
             for agg_name in summary_fields
         }
+        if rollups is not None:
+            aggs.update(rollup.aggregations(rollups))
 
         response = response_stage.process_response(aggs)
         return response
 
-    def _summary(self,
-                 *,
-                 catalog: CatalogName,
-                 entity_type: str,
-                 filters: Filters
-                 ) -> MutableJSON:
+    def _rollup_source_ids(self,
+                           catalog: CatalogName,
+                           filters: Filters
+                           ) -> Optional[set[str]]:
+        """
+        The IDs of the sources to summarize if the given filters only restrict
+        the summary by source, or None otherwise.
+        """
+        plugin = self.metadata_plugin(catalog)
+        filters = filters.reify(plugin)
+        source_filter = filters.pop(plugin.source_id_field)
+        if filters or source_filter.keys() != {'is'}:
+            return None
+        else:
+            return set(source_filter['is'])
+
+    def _read_rollups(self,
+                      rollup: SummaryRollup,
+                      source_ids: set[str]
+                      ) -> dict[EntityType, MutableJSON]:
+        """
+        Add up the total documents of the rollup partitions that any of the
+        given sources contributed to, for each entity type covered by the given
+        rollup.
+        """
+        request = Search(using=self._es_client,
+                         index=','.join(
+                             SummaryRollup.index_name(rollup.catalog, entity_type)
+                             for entity_type in rollup.entity_types
+                         ))
+        request = request.filter('term', kind='total')
+        request = request.filter('terms', **{'sources.id.keyword': sorted(source_ids)})
+        request = request.source(includes=['rollup'])
+        rollups = {entity_type: {} for entity_type in rollup.entity_types}
+        for hit in request.scan():
+            entity_type = IndexName.parse(hit.meta.index).entity_type
+            merge_rollup(rollups[entity_type], hit.to_dict()['rollup'])
+        return rollups
+
+    def _summary_chain(self,
+                       *,
+                       catalog: CatalogName,
+                       entity_type: str,
+                       filters: Filters
+                       ) -> ElasticsearchChain[Response, MutableJSON]:
         plugin = self.metadata_plugin(catalog)
         chain = self.create_chain(catalog=catalog,
                                   entity_type=entity_type,
@@ -298,17 +474,7 @@ class RepositoryService(ElasticsearchService):
                             catalog=catalog,
                             entity_type=entity_type).wrap(chain)
         chain = plugin.summary_aggregation_stage.create_and_wrap(chain)
-        request = chain.prepare_request(self.create_request(catalog, entity_type))
-
-        response = request.execute(ignore_cache=True)
-        assert len(response.hits) == 0
-
-        if config.debug == 2 and log.isEnabledFor(logging.DEBUG):
-            log.debug('Elasticsearch request: %s', json.dumps(request.to_dict(), indent=4))
-
-        result = chain.process_response(response)
-
-        return result
+        return chain
 
     def get_data_file(self,
                       catalog: CatalogName,
@@ -373,3 +539,6 @@ class RepositoryService(ElasticsearchService):
         if file_version is not None:
             assert file_version == file['version']
         return file
+
+
+RepositoryService.response_cache = ResponseCache(max_size=config.response_cache_size)
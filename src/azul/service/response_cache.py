@@ -0,0 +1,185 @@
+from collections import (
+    OrderedDict,
+)
+from collections.abc import (
+    Hashable,
+)
+import logging
+from threading import (
+    Lock,
+)
+import time
+from typing import (
+    Callable,
+    Optional,
+)
+
+import attr
+
+from azul import (
+    CatalogName,
+    cached_property,
+)
+from azul.generation_service import (
+    GenerationService,
+)
+from azul.json import (
+    copy_json,
+)
+from azul.types import (
+    JSON,
+    MutableJSON,
+)
+
+log = logging.getLogger(__name__)
+
+
+@attr.s(auto_attribs=True, kw_only=True)
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        >>> ResponseCacheStats().hit_rate
+        0.0
+        >>> ResponseCacheStats(hits=3, misses=1).hit_rate
+        0.75
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """
+    A process-local cache of JSON responses with LRU eviction. Every entry is
+    associated with the generation of the aggregate documents in a catalog and
+    can't be retrieved once that generation is superseded.
+
+    >>> from unittest.mock import patch
+    >>> from azul.generation_service import Generation
+    >>> cache = ResponseCache(max_size=2)
+    >>> generation = Generation(number=1, modified=0.0)
+    >>> with patch.object(GenerationService, 'get', return_value=generation):
+    ...     cache.get_or_compute('hca', 'a', lambda: {'a': 1})
+    ...     cache.get_or_compute('hca', 'a', lambda: {'a': 2})
+    ...     cache.get_or_compute('hca', 'b', lambda: {'b': 1})
+    ...     cache.get_or_compute('hca', 'c', lambda: {'c': 1})
+    ...     cache.get_or_compute('hca', 'a', lambda: {'a': 3})
+    {'a': 1}
+    {'a': 1}
+    {'b': 1}
+    {'c': 1}
+    {'a': 3}
+    >>> cache.stats
+    ResponseCacheStats(hits=1, misses=4, evictions=2)
+
+    A new generation invalidates all entries for the catalog.
+
+    >>> generation = Generation(number=2, modified=0.0)
+    >>> with patch.object(GenerationService, 'get', return_value=generation):
+    ...     cache.get_or_compute('hca', 'a', lambda: {'a': 4})
+    {'a': 4}
+    >>> len(cache)
+    1
+    """
+
+    def __init__(self, *, max_size: int):
+        self.max_size = max_size
+        self.stats = ResponseCacheStats()
+        self._entries: OrderedDict[tuple[CatalogName, Hashable], tuple[int, JSON]] = OrderedDict()
+        self._generations: dict[CatalogName, int] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @cached_property
+    def _generation_service(self) -> GenerationService:
+        return GenerationService()
+
+    def get_or_compute(self,
+                       catalog: CatalogName,
+                       key: Hashable,
+                       compute: Callable[[], MutableJSON]
+                       ) -> MutableJSON:
+        """
+        Return a copy of the response cached under the given key for the
+        current generation of the given catalog or, if there is no such
+        response, compute the response by invoking the given callable and
+        cache a copy of it.
+        """
+        if not self.enabled:
+            return compute()
+        generation = self._generation_service.get(catalog)
+        response = self._get(catalog, key, generation.number)
+        if response is None:
+            response = compute()
+            # A response computed before the aggregates of the current
+            # generation became visible could be obsolete
+            if generation.is_settled(time.time()):
+                self._put(catalog, key, generation.number, response)
+            return response
+        else:
+            return response
+
+    def _get(self,
+             catalog: CatalogName,
+             key: Hashable,
+             generation: int
+             ) -> Optional[MutableJSON]:
+        with self._lock:
+            if self._generations.get(catalog) != generation:
+                self._invalidate(catalog, generation)
+            try:
+                entry_generation, response = self._entries[catalog, key]
+            except KeyError:
+                response = None
+            else:
+                assert entry_generation == generation
+                self._entries.move_to_end((catalog, key))
+            if response is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            stats = attr.evolve(self.stats)
+        log.info('Response cache %s in catalog %r at generation %i, '
+                 'hit rate is %.1f%% after %i hit(s) and %i miss(es)',
+                 'miss' if response is None else 'hit', catalog, generation,
+                 stats.hit_rate * 100, stats.hits, stats.misses)
+        return None if response is None else copy_json(response)
+
+    def _put(self,
+             catalog: CatalogName,
+             key: Hashable,
+             generation: int,
+             response: JSON
+             ) -> None:
+        response = copy_json(response)
+        with self._lock:
+            # Another thread may have observed a newer generation
+            if self._generations.get(catalog) == generation:
+                self._entries[catalog, key] = generation, response
+                self._entries.move_to_end((catalog, key))
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.stats.evictions += 1
+
+    def _invalidate(self, catalog: CatalogName, generation: int) -> None:
+        obsolete = [
+            catalog_and_key
+            for catalog_and_key, (entry_generation, _) in self._entries.items()
+            if catalog_and_key[0] == catalog and entry_generation != generation
+        ]
+        for catalog_and_key in obsolete:
+            del self._entries[catalog_and_key]
+        self._generations[catalog] = generation
+        if obsolete:
+            log.info('Invalidated %i cached response(s) in catalog %r upon '
+                     'generation %i', len(obsolete), catalog, generation)
@@ -71,6 +71,19 @@ class StorageService:
     def get(self, object_key: str) -> bytes:
         return self.client.get_object(Bucket=self.bucket_name, Key=object_key)['Body'].read()
 
+    def get_range(self, object_key: str, start: int, end: int) -> bytes:
+        """
+        Return the bytes of the given object from the given start offset,
+        inclusive, to the given end offset, exclusive.
+        """
+        assert 0 <= start < end, (start, end)
+        return self.client.get_object(Bucket=self.bucket_name,
+                                      Key=object_key,
+                                      Range=f'bytes={start}-{end - 1}')['Body'].read()
+
+    def delete(self, object_key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket_name, Key=object_key)
+
     def put(self,
             object_key: str,
             data: bytes,
@@ -107,6 +120,34 @@ class StorageService:
                               upload: MultipartUpload) -> str:
         return upload.Part(part_number).upload(Body=buffer)['ETag']
 
+    def copy_multipart_part(self,
+                            object_key: str,
+                            start: int,
+                            end: int,
+                            part_number: int,
+                            upload: MultipartUpload) -> str:
+        """
+        Populate a part of the given upload with the bytes of the given object
+        from the given start offset, inclusive, to the given end offset,
+        exclusive. The copy is made by S3, without transferring the bytes.
+        Unlike the resource-based methods of this class, this method is safe
+        to be called from multiple threads concurrently.
+        """
+        assert 0 <= start < end, (start, end)
+        response = self.client.upload_part_copy(Bucket=self.bucket_name,
+                                                Key=upload.object_key,
+                                                UploadId=upload.id,
+                                                PartNumber=part_number,
+                                                CopySource={
+                                                    'Bucket': self.bucket_name,
+                                                    'Key': object_key
+                                                },
+                                                CopySourceRange=f'bytes={start}-{end - 1}')
+        return response['CopyPartResult']['ETag']
+
+    def abort_multipart_upload(self, upload: MultipartUpload) -> None:
+        upload.abort()
+
     def complete_multipart_upload(self,
                                   upload: MultipartUpload,
                                   etags: Sequence[str]) -> None:
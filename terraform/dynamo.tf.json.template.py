@@ -1,6 +1,9 @@
 from azul import (
     config,
 )
+from azul.generation_service import (
+    GenerationService,
+)
 from azul.service.source_service import (
     SourceService,
 )
@@ -44,6 +47,17 @@ emit_tf(
                             "attribute_name": SourceService.ttl_attribute,
                             "enabled": True
                         }
+                    },
+                    "generations": {
+                        "name": config.dynamo_generations_table_name,
+                        "billing_mode": "PAY_PER_REQUEST",
+                        "hash_key": GenerationService.key_attribute,
+                        "attribute": [
+                            {
+                                "name": GenerationService.key_attribute,
+                                "type": "S"
+                            }
+                        ]
                     }
                 }
             }
@@ -11,6 +11,7 @@ from azul.modules import (
 )
 from azul.service.manifest_controller import (
     manifest_state_key,
+    slices_state_key,
 )
 from azul.terraform import (
     emit_tf,
@@ -18,6 +19,8 @@ from azul.terraform import (
 
 service = load_app_module('service')
 
+generate_manifest_arn = aws.get_lambda_arn(config.service_name, service.generate_manifest.name)
+
 emit_tf({
     "resource": {
         "aws_iam_role": {
@@ -52,7 +55,7 @@ emit_tf({
                                 "lambda:InvokeFunction"
                             ],
                             "Resource": [
-                                aws.get_lambda_arn(config.service_name, service.generate_manifest.name),
+                                generate_manifest_arn,
                             ]
                         }
                     ]
@@ -74,12 +77,64 @@ emit_tf({
                                     "Variable": f"$.{manifest_state_key}",
                                     "IsPresent": True,
                                     "Next": "Done"
+                                },
+                                {
+                                    "Variable": f"$.{slices_state_key}",
+                                    "IsPresent": True,
+                                    "Next": "Slices"
                                 }
                             ],
                         },
                         "Manifest": {
                             "Type": "Task",
-                            "Resource": aws.get_lambda_arn(config.service_name, service.generate_manifest.name),
+                            "Resource": generate_manifest_arn,
+                            "Next": "Loop"
+                        },
+                        # Generates the slices of a large manifest concurrently,
+                        # each slice in its own loop. The output of this state
+                        # is a list containing the final state of each loop.
+                        "Slices": {
+                            "Type": "Map",
+                            "ItemsPath": f"$.{slices_state_key}",
+                            "ItemSelector": {
+                                "filters.$": "$.filters",
+                                "manifest_key.$": "$.manifest_key",
+                                "partition.$": "$$.Map.Item.Value"
+                            },
+                            "MaxConcurrency": config.manifest_slices,
+                            "ItemProcessor": {
+                                "ProcessorConfig": {
+                                    "Mode": "INLINE"
+                                },
+                                "StartAt": "SliceLoop",
+                                "States": {
+                                    "SliceLoop": {
+                                        "Type": "Choice",
+                                        "Default": "SliceManifest",
+                                        "Choices": [
+                                            {
+                                                "Variable": "$.partition.is_last",
+                                                "BooleanEquals": True,
+                                                "Next": "SliceDone"
+                                            }
+                                        ]
+                                    },
+                                    "SliceManifest": {
+                                        "Type": "Task",
+                                        "Resource": generate_manifest_arn,
+                                        "Next": "SliceLoop"
+                                    },
+                                    "SliceDone": {
+                                        "Type": "Succeed"
+                                    }
+                                }
+                            },
+                            "ResultPath": f"$.{slices_state_key}",
+                            "Next": "Concatenate"
+                        },
+                        "Concatenate": {
+                            "Type": "Task",
+                            "Resource": generate_manifest_arn,
                             "Next": "Loop"
                         },
                         "Done": {
@@ -0,0 +1,36 @@
+import time
+
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from indexer.test_index_writer import (
+    IndexWriterTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class BenchmarkIndexWriter(IndexWriterTestCase):
+    """
+    Not really a test but a benchmark of the throughput of concurrent bulk
+    requests. The timings are logged.
+    """
+
+    def test_benchmark(self):
+        for concurrency in 1, 2, 4, 8:
+            start = time.perf_counter()
+            writer = self._write(concurrency)
+            duration = time.perf_counter() - start
+            log.info('Writing %i document(s) in %i request(s) with %i '
+                     'concurrent request(s) took %.3fs, %.1f MiB/s',
+                     writer.stats.documents,
+                     writer.stats.requests,
+                     concurrency,
+                     duration,
+                     writer.stats.bytes / duration / 1024 / 1024)
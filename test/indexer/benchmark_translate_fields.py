@@ -0,0 +1,51 @@
+import timeit
+
+from azul.indexer.document import (
+    Document,
+)
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from indexer.test_translate_fields import (
+    TranslateFieldsTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class BenchmarkTranslateFields(TranslateFieldsTestCase):
+    """
+    Not really a test but a micro-benchmark of the compiled translators
+    against the recursive implementation. The timings are logged.
+    """
+
+    def test_benchmark(self):
+        field_types = self.index_service.field_types(self.catalog)
+        documents = self.documents
+        for forward in True, False:
+            def recursive():
+                for document in documents[forward]:
+                    Document.translate_fields(document, field_types, forward=forward)
+
+            def compiled():
+                translator = Document.translator(self.catalog, field_types, forward=forward)
+                for document in documents[forward]:
+                    translator(document)
+
+            timings = {
+                f.__name__: min(timeit.repeat(f, number=1, repeat=3))
+                for f in (recursive, compiled)
+            }
+            log.info('Translating %i documents %s took %.3fs recursively and '
+                     '%.3fs compiled, a speedup of %.1fx',
+                     len(documents[forward]),
+                     'forward' if forward else 'backward',
+                     timings['recursive'],
+                     timings['compiled'],
+                     timings['recursive'] / timings['compiled'])
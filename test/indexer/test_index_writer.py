@@ -0,0 +1,248 @@
+import copy
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+import json
+import os
+from threading import (
+    Lock,
+    Thread,
+)
+import time
+from unittest.mock import (
+    patch,
+)
+
+from azul import (
+    config,
+)
+from azul.indexer import (
+    SourcedBundleFQID,
+)
+from azul.indexer.document import (
+    Document,
+    DocumentCoordinates,
+)
+from azul.indexer.index_service import (
+    BulkChunkSizer,
+    IndexService,
+    IndexWriter,
+)
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+    silenced_es_logger,
+)
+from azul_test_case import (
+    DCP1TestCase,
+)
+from indexer import (
+    CannedBundleTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class BulkStandIn(ThreadingHTTPServer):
+    """
+    A local stand-in for the ``_bulk`` API of Elasticsearch. It simulates a
+    cluster with a fixed latency per request and a fixed throughput per
+    connection, and responds with a 409 or 500 status for the documents whose
+    ID is listed in :attr:`conflicts` or :attr:`failures`, respectively.
+    """
+    daemon_threads = True
+
+    def __init__(self, *, latency: float, throughput: float):
+        super().__init__(('localhost', 0), BulkRequestHandler)
+        self.latency = latency
+        self.throughput = throughput
+        self.conflicts: set[str] = set()
+        self.failures: set[str] = set()
+        self.lock = Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def respond(self, body: bytes) -> bytes:
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency + len(body) / self.throughput)
+            lines = iter(body.decode().splitlines())
+            items = []
+            for line in lines:
+                (op_type, action), = json.loads(line).items()
+                if op_type != 'delete':
+                    next(lines)
+                doc_id = action['_id']
+                status = (409 if doc_id in self.conflicts else
+                          500 if doc_id in self.failures else
+                          200 if op_type == 'delete' else
+                          201)
+                items.append({
+                    op_type: {
+                        '_index': action['_index'],
+                        '_id': doc_id,
+                        'status': status
+                    }
+                })
+            return json.dumps({'took': 0, 'errors': False, 'items': items}).encode()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class BulkRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: BulkStandIn
+
+    def do_POST(self):
+        assert self.path.startswith('/_bulk'), self.path
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        response = self.server.respond(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RecordingIndexWriter(IndexWriter):
+    """
+    Records the invocations of the per-document callbacks
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls: list[tuple[str, DocumentCoordinates]] = []
+
+    def _on_success(self, doc: Document):
+        self.calls.append(('success', doc.coordinates))
+        super()._on_success(doc)
+
+    def _on_error(self, doc: Document, e):
+        self.calls.append(('error', doc.coordinates))
+        super()._on_error(doc, e)
+
+    def _on_conflict(self, doc: Document, e):
+        self.calls.append(('conflict', doc.coordinates))
+        super()._on_conflict(doc, e)
+
+
+class IndexWriterTestCase(DCP1TestCase, CannedBundleTestCase):
+    """
+    Writes the contributions from a canned bundle with IndexWriter to a local
+    stand-in for Elasticsearch.
+    """
+    bundle = ('2a87dc5c-0c3c-4d91-a348-5d784ab48b92', '2018-03-29T10:39:45.437487Z')
+
+    #: The fixed size of bulk requests, small enough to yield several dozen
+    #: requests for the contributions from the canned bundle
+    #:
+    chunk_size = 512 * 1024
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = BulkStandIn(latency=0.02, throughput=64 * 1024 * 1024)
+        cls.server_thread = Thread(target=cls.server.serve_forever)
+        cls.server_thread.start()
+        try:
+            es_endpoint = cls.server.server_address[:2]
+            new_env = config.es_endpoint_env(es_endpoint=es_endpoint,
+                                             es_instance_count=1)
+            cls._env_patch = patch.dict(os.environ, **new_env)
+            cls._env_patch.start()
+            cls.index_service = IndexService()
+            uuid, version = cls.bundle
+            fqid = SourcedBundleFQID(source=cls.source, uuid=uuid, version=version)
+            bundle = cls._load_canned_bundle(fqid)
+            cls.contributions = [
+                contribution
+                for partition in cls.index_service.deep_transform(cls.catalog, bundle, delete=False)
+                for contribution in partition
+            ]
+        except BaseException:
+            cls._stop_server()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._env_patch.stop()
+        cls._stop_server()
+        super().tearDownClass()
+
+    @classmethod
+    def _stop_server(cls):
+        cls.server.shutdown()
+        cls.server_thread.join()
+        cls.server.server_close()
+
+    def setUp(self):
+        super().setUp()
+        self.server.conflicts.clear()
+        self.server.failures.clear()
+        self.server.max_in_flight = 0
+        # Pin the chunk size so that the chunks don't depend on timing
+        chunk_sizer = BulkChunkSizer(max_chunk_size=self.chunk_size,
+                                     min_chunk_size=self.chunk_size)
+        patcher = patch.object(IndexWriter, 'chunk_sizer', new=chunk_sizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, concurrency: int) -> RecordingIndexWriter:
+        writer = RecordingIndexWriter(self.catalog,
+                                      self.index_service.catalogued_field_types(),
+                                      refresh=False,
+                                      conflict_retry_limit=1,
+                                      error_retry_limit=0)
+        with patch.object(IndexWriter, 'max_concurrent_chunks', new=concurrency):
+            with silenced_es_logger():
+                # The conflict callback modifies the documents
+                writer.write(list(map(copy.copy, self.contributions)))
+        return writer
+
+
+class TestIndexWriter(IndexWriterTestCase):
+    """
+    Test the concurrent writing of bulk requests by IndexWriter against a
+    local stand-in for Elasticsearch.
+    """
+
+    def test_callbacks(self):
+        ids = [c.coordinates.document_id for c in self.contributions]
+        self.server.conflicts.update(ids[1::7])
+        self.server.failures.update(set(ids[3::11]) - self.server.conflicts)
+        expected = None
+        for concurrency in 1, 2, 4, 8:
+            with self.subTest(concurrency=concurrency):
+                writer = self._write(concurrency)
+                self.assertLessEqual(self.server.max_in_flight, concurrency)
+                self.assertEqual(len(self.contributions), writer.stats.documents)
+                self.assertGreater(writer.stats.requests, 8)
+                actual = (
+                    writer.calls,
+                    writer.retries,
+                    dict(writer.conflicts),
+                    dict(writer.errors)
+                )
+                if expected is None:
+                    expected = actual
+                    calls, retries, conflicts, errors = actual
+                    coordinates = [c.coordinates for c in self.contributions]
+                    # The callbacks are invoked once per document, in order
+                    self.assertEqual(coordinates, [c for _, c in calls])
+                    self.assertEqual(len(self.server.conflicts), len(conflicts))
+                    self.assertEqual(len(self.server.failures), len(errors))
+                    self.assertEqual(set(conflicts), retries)
+                else:
+                    self.assertEqual(expected, actual)
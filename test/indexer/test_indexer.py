@@ -30,10 +30,12 @@ from uuid import (
 )
 
 import attr
-import elasticsearch
 from elasticsearch import (
     Elasticsearch,
 )
+from elasticsearch.helpers import (
+    scan,
+)
 from more_itertools import (
     one,
 )
@@ -51,6 +53,7 @@ from azul.indexer import (
     BundlePartition,
 )
 from azul.indexer.document import (
+    Aggregate,
     CataloguedEntityReference,
     Contribution,
     ContributionCoordinates,
@@ -68,6 +71,9 @@ from azul.indexer.index_service import (
     IndexWriter,
     log as index_service_log,
 )
+from azul.indexer.rollup import (
+    SummaryRollup,
+)
 from azul.logging import (
     configure_test_logging,
     get_test_logger,
@@ -81,6 +87,12 @@ from azul.plugins.metadata.hca import (
 from azul.plugins.repository.dss import (
     DSSBundle,
 )
+from azul.service import (
+    Filters,
+)
+from azul.service.repository_service import (
+    RepositoryService,
+)
 from azul.threads import (
     Latch,
 )
@@ -140,31 +152,34 @@ class TestHCAIndexer(DCP1TestCase, IndexerTestCase):
         """
         self.maxDiff = None
         for max_partition_size in [BundlePartition.max_partition_size, 1]:
-            for page_size in (config.contribution_page_size, 1):
-                with self.subTest(page_size=page_size, max_partition_size=max_partition_size):
-                    with patch.object(BundlePartition, 'max_partition_size', new=max_partition_size):
-                        with patch.object(type(config), 'contribution_page_size', new=page_size):
-                            try:
-                                self._index_canned_bundle(self.old_bundle)
-                                expected_hits = self._load_canned_result(self.old_bundle)
-                                hits = self._get_all_hits()
-                                self.assertElasticEqual(expected_hits, hits)
-                            finally:
-                                self.index_service.delete_indices(self.catalog)
-                                self.index_service.create_indices(self.catalog)
+            for page_size, num_slices in [(config.contribution_page_size, 1), (1, 1), (1, 3)]:
+                with self.subTest(page_size=page_size,
+                                  num_slices=num_slices,
+                                  max_partition_size=max_partition_size):
+                    with (
+                        patch.object(BundlePartition, 'max_partition_size', new=max_partition_size),
+                        patch.object(type(config), 'contribution_page_size', new=page_size),
+                        patch.object(IndexService, '_num_contribution_slices', return_value=num_slices)
+                    ):
+                        try:
+                            self._index_canned_bundle(self.old_bundle)
+                            expected_hits = self._load_canned_result(self.old_bundle)
+                            hits = self._get_all_hits()
+                            self.assertElasticEqual(expected_hits, hits)
+                        finally:
+                            self.index_service.delete_indices(self.catalog)
+                            self.index_service.create_indices(self.catalog)
 
     def test_deletion(self):
         """
         Delete a bundle and check that the index contains the appropriate flags
         """
-        # Ensure that we have a bundle whose documents are written individually
-        # and another one that's written in bulk.
+        # Ensure that we have a small bundle and a large one
         bundle_sizes = {
             self.new_bundle: 6,
             self.bundle_fqid(uuid='2a87dc5c-0c3c-4d91-a348-5d784ab48b92',
                              version='2018-03-29T10:39:45.437487Z'): 258
         }
-        self.assertTrue(min(bundle_sizes.values()) < IndexWriter.bulk_threshold < max(bundle_sizes.values()))
 
         field_types = self.index_service.catalogued_field_types()
         aggregate_cls = self.metadata_plugin.aggregate_class()
@@ -287,7 +302,7 @@ class TestHCAIndexer(DCP1TestCase, IndexerTestCase):
         for tally in tallies:
             tallies[tally] = 0
         # Aggregating should not be a non-op even though tallies are all zero
-        with self.assertLogs(elasticsearch.client.logger, level='INFO') as logs:
+        with patch.object(IndexWriter, 'write', autospec=True, side_effect=IndexWriter.write) as write:
             self.index_service.aggregate(tallies)
         doc_ids = {
             '70d1af4a-82c8-478a-8960-e9028b3616ca',
@@ -296,11 +311,15 @@ class TestHCAIndexer(DCP1TestCase, IndexerTestCase):
             '0c5ac7c0-817e-40d4-b1b1-34c3d5cfecdb',
             'aaa96233-bf27-44c7-82df-b4dc15ad4d9d',
         }
-        for doc_id in doc_ids:
-            message_re = re.compile(fr'INFO:elasticsearch:'
-                                    fr'Got 201 response after [^ ]+ from PUT to '
-                                    fr'.*_aggregate/_doc/{doc_id}.*')
-            self.assertTrue(any(message_re.fullmatch(message) for message in logs.output))
+        writer, documents = one(write.call_args_list).args
+        self.assertEqual(doc_ids, {doc.coordinates.entity.entity_id for doc in documents})
+        # All aggregates are written in a single round trip
+        self.assertEqual(len(doc_ids), writer.stats.documents)
+        self.assertEqual(1, writer.stats.requests)
+        self.assertGreater(writer.stats.bytes, 0)
+        hits = self._get_all_hits()
+        aggregates = self._filter_hits(hits, DocumentType.aggregate)
+        self.assertEqual(doc_ids, {hit['_source']['entity_id'] for hit in aggregates})
 
     def test_deletion_before_addition(self):
         self._index_canned_bundle(self.new_bundle, delete=True)
@@ -398,6 +417,250 @@ class TestHCAIndexer(DCP1TestCase, IndexerTestCase):
         ]
         self.assertTrue(one(hits)['bundle_deleted'])
 
+    def test_increment_generations(self):
+        """
+        Aggregating increments the generation of the catalog once, and only if
+        aggregates were written.
+        """
+        bundle_fqid = self.bundle_fqid(uuid='8543d32f-4c01-48d5-a79f-1c5439659da3',
+                                       version='2018-03-29T14:38:28.884167Z')
+        bundle = self._load_canned_bundle(bundle_fqid)
+        with patch.object(IndexService, '_increment_generations') as increment:
+            self._index_bundle(bundle)
+            increment.assert_called_once_with({self.catalog})
+            increment.reset_mock()
+            error = RuntimeError('Write failed')
+            write = IndexWriter.write
+
+            def write_contributions(writer, documents):
+                if any(isinstance(document, Aggregate) for document in documents):
+                    raise error
+                else:
+                    return write(writer, documents)
+
+            with patch.object(IndexWriter, 'write', new=write_contributions):
+                with self.assertRaises(RuntimeError) as cm:
+                    self._index_bundle(bundle, delete=True)
+            self.assertIs(error, cm.exception)
+            increment.assert_not_called()
+
+    def test_incremental_aggregation(self):
+        """
+        Index two bundles that share entities, one after the other, and then
+        delete one of them, both with and without incremental aggregation. Other
+        than for the accumulator state, the resulting aggregates should be the
+        same.
+        """
+        bundle_fqid = self.bundle_fqid(uuid='8543d32f-4c01-48d5-a79f-1c5439659da3',
+                                       version='2018-03-29T14:38:28.884167Z')
+        bundle = self._load_canned_bundle(bundle_fqid)
+        patched_fqid = self.bundle_fqid(uuid='9654e431-4c01-48d5-a79f-1c5439659da3',
+                                        version='2018-03-29T15:38:28.884167Z')
+        patched_bundle = attr.evolve(bundle, fqid=patched_fqid)
+        self._patch_bundle(patched_bundle)
+
+        def get_aggregates() -> dict[tuple[str, str], JSON]:
+            hits = scan(client=self.es_client,
+                        index=','.join(self.index_service.index_names(self.catalog)))
+            return {
+                (hit['_index'], hit['_id']): hit['_source']
+                for hit in hits
+                if self._parse_index_name(hit)[1] is DocumentType.aggregate
+            }
+
+        # Record the aggregates merged incrementally and the entities whose
+        # aggregates were rebuilt from all of their contributions
+        merged, rebuilt = [], []
+        merge_aggregate = IndexService._merge_aggregate
+        read_contributions = IndexService._read_contributions
+
+        def _merge_aggregate(self, *args, **kwargs):
+            aggregate = merge_aggregate(self, *args, **kwargs)
+            merged.append(aggregate)
+            return aggregate
+
+        def _read_contributions(self, tallies, *args, **kwargs):
+            rebuilt.extend(tallies.keys())
+            return read_contributions(self, tallies, *args, **kwargs)
+
+        results = {}
+        for incremental in (False, True):
+            with (
+                patch.object(type(config), 'incremental_aggregation', new=incremental),
+                patch.object(IndexService, '_merge_aggregate', new=_merge_aggregate),
+                patch.object(IndexService, '_read_contributions', new=_read_contributions)
+            ):
+                try:
+                    self._index_bundle(bundle)
+                    if incremental:
+                        # Without aggregates, there is nothing to merge into
+                        self.assertEqual([], merged)
+                        self.assertEqual([], rebuilt)
+                    self._index_bundle(patched_bundle)
+                    after_addition = get_aggregates()
+                    if incremental:
+                        # The contributions from the second bundle are merged
+                        # into the existing aggregates, none is rebuilt
+                        self.assertEqual([], rebuilt)
+                        self.assertGreater(len(merged), 0)
+                        self.assertNotIn(None, merged)
+                        merged.clear()
+                    else:
+                        self.assertEqual([], merged)
+                    self._index_bundle(bundle, delete=True)
+                    after_deletion = get_aggregates()
+                    if incremental:
+                        # A deletion can only be accounted for by a rebuild
+                        self.assertEqual([], merged)
+                        self.assertGreater(len(rebuilt), 0)
+                finally:
+                    self.index_service.delete_indices(self.catalog)
+                    self.index_service.create_indices(self.catalog)
+            results[incremental] = after_addition, after_deletion
+            rebuilt.clear()
+
+        for expected, actual in zip(results[False], results[True]):
+            self.assertEqual(expected.keys(), actual.keys())
+            for key, aggregate in actual.items():
+                with self.subTest(aggregate=key):
+                    self.assertNotIn('accumulators', expected[key])
+                    accumulators = aggregate.pop('accumulators')
+                    self.assertEqual(aggregate['num_contributions'] > 1,
+                                     len(accumulators['bundles']) > 1)
+                    self.assertElasticEqual(expected[key], aggregate)
+
+    def test_incremental_aggregation_size_limit(self):
+        """
+        Accumulator state exceeding the size limit should not be stored,
+        causing the aggregate to be rebuilt when it is next updated.
+        """
+        bundle_fqid = self.bundle_fqid(uuid='8543d32f-4c01-48d5-a79f-1c5439659da3',
+                                       version='2018-03-29T14:38:28.884167Z')
+        bundle = self._load_canned_bundle(bundle_fqid)
+        patched_fqid = self.bundle_fqid(uuid='9654e431-4c01-48d5-a79f-1c5439659da3',
+                                        version='2018-03-29T15:38:28.884167Z')
+        patched_bundle = attr.evolve(bundle, fqid=patched_fqid)
+        self._patch_bundle(patched_bundle)
+        with (
+            patch.object(type(config), 'incremental_aggregation', new=True),
+            patch.object(IndexService, 'max_accumulators_size', new=0),
+            patch.object(IndexService, '_merge_aggregate') as merge_aggregate
+        ):
+            self._index_bundle(bundle)
+            hits = self._get_all_hits()
+            aggregates = [
+                hit['_source']
+                for hit in hits
+                if self._parse_index_name(hit)[1] is DocumentType.aggregate
+            ]
+            self.assertGreater(len(aggregates), 0)
+            for aggregate in aggregates:
+                self.assertNotIn('accumulators', aggregate)
+            self._index_bundle(patched_bundle)
+            merge_aggregate.assert_not_called()
+
+    def test_summary_rollups(self):
+        """
+        Index bundles that share entities and delete them again, one at a time,
+        and compare the summaries computed from the summary rollups with those
+        computed from the aggregates after every step. Then verify that the
+        rollups recover from a failure to update them, either by retrying or by
+        rebuilding them.
+        """
+        bundle_fqid = self.bundle_fqid(uuid='8543d32f-4c01-48d5-a79f-1c5439659da3',
+                                       version='2018-03-29T14:38:28.884167Z')
+        bundle = self._load_canned_bundle(bundle_fqid)
+        patched_fqid = self.bundle_fqid(uuid='9654e431-4c01-48d5-a79f-1c5439659da3',
+                                        version='2018-03-29T15:38:28.884167Z')
+        patched_bundle = attr.evolve(bundle, fqid=patched_fqid)
+        self._patch_bundle(patched_bundle)
+        other_bundle = self._load_canned_bundle(self.old_bundle)
+
+        with patch.object(type(config), 'summary_rollups', new=True):
+            self.index_service.create_indices(self.catalog)
+            try:
+                for bundle_, delete in [
+                    (bundle, False),
+                    (patched_bundle, False),
+                    (other_bundle, False),
+                    (bundle, True),
+                    (other_bundle, True)
+                ]:
+                    self._index_bundle(bundle_, delete=delete)
+                    self._assert_rollup_summaries()
+                # Updating the rollups fails after the aggregates were written,
+                # the retry of the notification catches up with the aggregates
+                with patch.object(IndexService, '_update_rollups', side_effect=RuntimeError):
+                    self.assertRaises(RuntimeError, self._index_bundle, other_bundle)
+                self._index_bundle(other_bundle)
+                self._assert_rollup_summaries()
+                # Without a retry, the rollups have to be rebuilt
+                with patch.object(IndexService, '_update_rollups', side_effect=RuntimeError):
+                    self.assertRaises(RuntimeError, self._index_bundle, bundle)
+                self._refresh_indices()
+                self.index_service.rebuild_rollups(self.catalog)
+                self._assert_rollup_summaries()
+            finally:
+                self.index_service.delete_indices(self.catalog)
+        self.index_service.create_indices(self.catalog)
+
+    def test_summary_rollups_rebuild(self):
+        """
+        Rebuild the summary rollups of a catalog that was indexed before the
+        rollups were enabled, and whose rollup indices therefore don't exist.
+        """
+        for bundle_fqid in self.new_bundle, self.old_bundle:
+            self._index_canned_bundle(bundle_fqid)
+        try:
+            with patch.object(type(config), 'summary_rollups', new=True):
+                rollup = self.index_service.summary_rollup(self.catalog)
+                for entity_type in rollup.entity_types:
+                    rollup_index = SummaryRollup.index_name(self.catalog, entity_type)
+                    self.assertFalse(self.es_client.indices.exists(index=rollup_index))
+                self.index_service.rebuild_rollups(self.catalog)
+                for entity_type in rollup.entity_types:
+                    rollup_index = SummaryRollup.index_name(self.catalog, entity_type)
+                    mapping = self.es_client.indices.get_mapping(index=rollup_index)
+                    properties = mapping[rollup_index]['mappings']['properties']
+                    # A dynamic mapping would index the contents of the rollup
+                    self.assertEqual(SummaryRollup.mapping['properties']['rollup'],
+                                     properties['rollup'])
+                self._assert_rollup_summaries()
+        finally:
+            with patch.object(type(config), 'summary_rollups', new=True):
+                self.index_service.delete_indices(self.catalog)
+        self.index_service.create_indices(self.catalog)
+
+    def _refresh_indices(self):
+        self.es_client.indices.refresh(index=','.join(self.index_service.index_names(self.catalog)))
+
+    def _assert_rollup_summaries(self):
+        """
+        Assert that the summaries computed from the summary rollups are equal
+        to those computed from the aggregates.
+        """
+        self._refresh_indices()
+        service = RepositoryService()
+        rollup = service.summary_rollup(self.catalog)
+        summary_chain = RepositoryService._summary_chain
+
+        def rollup_summary_chain(self_, *, entity_type, **kwargs):
+            # Only aggregations not covered by the rollup are left to ES
+            self.assertNotIn(entity_type, rollup.entity_types)
+            return summary_chain(self_, entity_type=entity_type, **kwargs)
+
+        source_filter = {self.metadata_plugin.source_id_field: {'is': [self.source.id]}}
+        for explicit in ({}, source_filter):
+            filters = Filters(explicit=explicit, source_ids={self.source.id})
+            with self.subTest(explicit=explicit):
+                with patch.object(RepositoryService, '_read_rollups') as read_rollups:
+                    read_rollups.side_effect = AssertionError
+                    with patch.object(type(config), 'summary_rollups', new=False):
+                        expected = service._summary_uncached(self.catalog, filters)
+                with patch.object(RepositoryService, '_summary_chain', new=rollup_summary_chain):
+                    actual = service._summary_uncached(self.catalog, filters)
+                self.assertEqual(expected, actual)
+
     def _patch_bundle(self, bundle: Bundle) -> str:
         new_file_uuid = str(uuid4())
         bundle.manifest = copy.deepcopy(bundle.manifest)
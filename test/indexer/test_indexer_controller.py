@@ -315,6 +315,43 @@ class TestIndexController(DCP1TestCase, IndexerTestCase, SqsTestCase):
         self.assertEqual([], self._read_queue(self._tallies_retry_queue))
         self.assertEqual([], self._read_queue(self._tallies_queue))
 
+    def test_contribute_batch(self):
+        """
+        A message listing multiple bundles is handled by fetching the bundles
+        together and contributing them in one invocation.
+        """
+        self._create_mock_queues()
+        source = DSSSourceRef.for_dss_source('foo_source:/0')
+        fqids = [
+            DSSBundleFQID(source=source,
+                          uuid='56a338fe-7554-4b5d-96a2-7df127a7640b',
+                          version='2018-03-28T15:10:23.074974Z'),
+            DSSBundleFQID(source=source,
+                          uuid='b2216048-7eaa-45f4-8077-5a3fb4204953',
+                          version='2018-03-29T10:40:41.822717Z')
+        ]
+        bundles = list(map(self._load_canned_bundle, fqids))
+        expected_digest = defaultdict(list)
+        for bundle in bundles:
+            for contribution in self.index_service.transform(self.catalog, bundle, delete=False):
+                insort(expected_digest[contribution.entity.entity_type], 1)
+        # Two contributions to the same project are consolidated into one tally
+        expected_digest['projects'] = [2]
+
+        message = self.client.bundles_message(self.catalog, fqids)
+        self.assertEqual(len(fqids), len(message['notifications']))
+        mock_plugin = MagicMock()
+        mock_plugin.fetch_bundles.return_value = bundles
+        mock_plugin.resolve_bundle.side_effect = DSSBundleFQID.from_json
+        mock_plugin.sources = [source]
+        with patch.object(IndexService, 'repository_plugin', return_value=mock_plugin):
+            self.controller.contribute([self._mock_sqs_record(message)])
+
+        mock_plugin.fetch_bundles.assert_called_once_with(fqids)
+        mock_plugin.fetch_bundle.assert_not_called()
+        tallies = self._read_queue(self._tallies_queue)
+        self.assertEqual(expected_digest, self._digest_tallies(tallies))
+
     def _digest_tallies(self, tallies):
         entities = defaultdict(list)
         for tally in tallies:
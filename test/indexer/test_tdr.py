@@ -2,13 +2,21 @@ from abc import (
     ABCMeta,
     abstractmethod,
 )
+from collections import (
+    defaultdict,
+)
 from collections.abc import (
     Iterable,
+    Iterator,
     Mapping,
 )
+from contextlib import (
+    contextmanager,
+)
 from datetime import (
     timezone,
 )
+import gzip
 from io import (
     BytesIO,
 )
@@ -16,6 +24,12 @@ import json
 from operator import (
     attrgetter,
 )
+import os
+from pathlib import (
+    Path,
+)
+import re
+import tempfile
 from typing import (
     Callable,
     Generic,
@@ -32,6 +46,9 @@ from unittest.mock import (
 )
 
 import attr
+from botocore.exceptions import (
+    ClientError,
+)
 from furl import (
     furl,
 )
@@ -40,6 +57,9 @@ from more_itertools import (
     one,
     take,
 )
+from moto import (
+    mock_s3,
+)
 from tinyquery import (
     tinyquery,
 )
@@ -61,9 +81,15 @@ from azul.bigquery import (
     BigQueryRow,
     BigQueryRows,
 )
+from azul.deployment import (
+    aws,
+)
 from azul.indexer import (
     SourcedBundleFQID,
 )
+from azul.indexer.document import (
+    EntityReference,
+)
 from azul.logging import (
     configure_test_logging,
     get_test_logger,
@@ -82,11 +108,20 @@ from azul.plugins.repository.tdr_hca import (
     TDRBundleFQID,
     TDRHCABundle,
 )
+from azul.plugins.repository.tdr_hca.lineage import (
+    LineageIndex,
+    LineageStore,
+    S3LineageStore,
+)
 from azul.terra import (
+    SourceRef as TDRSourceRef,
     TDRClient,
     TDRSourceSpec,
     TerraClient,
 )
+from azul.time import (
+    parse_dcp2_version,
+)
 from azul.types import (
     JSON,
     JSONs,
@@ -149,6 +184,15 @@ class MockPlugin(TDRPlugin, metaclass=ABCMeta):
             for value in values
         )
 
+    @classmethod
+    def _union_all(cls, queries: Iterable[str]) -> str:
+        # Legacy SQL combines the results of comma-separated subqueries
+        return 'SELECT * FROM ' + ', '.join(f'({query})' for query in queries)
+
+    @classmethod
+    def _null(cls, type_: str) -> str:
+        return f'{type_}(NULL)'
+
 
 class TestMockPlugin(AzulUnitTestCase):
 
@@ -156,6 +200,10 @@ class TestMockPlugin(AzulUnitTestCase):
         self.assertEqual('(foo = "abc" AND bar = 123) OR (foo = "def" AND bar = 456)',
                          MockPlugin._in(('foo', 'bar'), [('"abc"', '123'), ('"def"', '456')]))
 
+    def test_union_all(self):
+        self.assertEqual('SELECT * FROM (SELECT 1), (SELECT 2)',
+                         MockPlugin._union_all(['SELECT 1', 'SELECT 2']))
+
 
 class TDRPluginTestCase(TDRTestCase, CannedBundleTestCase[BUNDLE], Generic[BUNDLE]):
 
@@ -348,6 +396,225 @@ class TestTDRHCAPlugin(TDRHCAPluginTestCase):
         self.assertEqual(test_bundle.metadata_files, emulated_bundle.metadata_files)
 
 
+class TestTDRHCAQueries(TDRHCAPluginTestCase):
+    """
+    Test the queries made when emulating one or more bundles against the
+    canned tables of all of the below bundles.
+    """
+    bundle_fqid = SourcedBundleFQID(source=TDRPluginTestCase.source,
+                                    uuid='1b6d8348-d6e9-406a-aa6a-7ee886e52bf9',
+                                    version='2019-09-24T09:35:06.958773Z')
+
+    stitched_bundle_fqid = SourcedBundleFQID(source=TDRPluginTestCase.source,
+                                             uuid='4426adc5-b3c5-5aab-ab86-51d8ce44dfbe',
+                                             version='2020-08-10T21:24:26.174274Z')
+
+    @cached_property
+    def tables(self) -> dict[str, dict[str, JSON]]:
+        """
+        The rows of the canned tables for all of the above bundles, by table
+        name and primary key
+        """
+        tables = defaultdict(dict)
+        for bundle_fqid in self.bundle_fqid, self.stitched_bundle_fqid:
+            canned_tables = self._load_canned_file_version(uuid=bundle_fqid.uuid,
+                                                           version=None,
+                                                           extension='tables.tdr')['tables']
+            for table_name, table in canned_tables.items():
+                for row in table['rows']:
+                    tables[table_name][row[table_name + '_id']] = row
+        return tables
+
+    def setUp(self):
+        super().setUp()
+        for table_name, rows in self.tables.items():
+            self._make_mock_entity_table(self.source.spec, table_name, list(rows.values()))
+
+    def _run_lineage_sql(self, query: str) -> BigQueryRows:
+        """
+        Emulate the query for the bundles producing a given set of entities or,
+        if the set is omitted, any entity, which relies on BigQuery features
+        that are hard to emulate
+        """
+        match = re.search(r'IN UNNEST\((\[[^]]*])\)', query)
+        output_ids = None if match is None else set(re.findall(r"'([^']+)'", match.group(1)))
+        for links_id, row in self.tables['links'].items():
+            for link in row['content']['links']:
+                if link['link_type'] == 'process_link':
+                    for output in link['outputs']:
+                        if output_ids is None or output['output_id'] in output_ids:
+                            yield {
+                                'links_id': links_id,
+                                'version': parse_dcp2_version(row['version']),
+                                'output_id': output['output_id']
+                            }
+
+    @contextmanager
+    def _patch_plugin(self,
+                      plugin: TDRPlugin,
+                      num_entity_queries: int
+                      ) -> Iterator[list[tdr_hca.BundleQueryReport]]:
+        self.queries = []
+        plugin_cls = type(plugin)
+        run_sql = plugin_cls._run_sql
+
+        def _run_sql(plugin, query: str) -> BigQueryRows:
+            self.queries.append(query)
+            if 'JSON_EXTRACT_ARRAY' in query:
+                return self._run_lineage_sql(query)
+            else:
+                return run_sql(plugin, query)
+
+        reports = []
+        report_cls = tdr_hca.BundleQueryReport
+
+        def new_report():
+            report = report_cls()
+            reports.append(report)
+            return report
+
+        with (
+            patch.dict(os.environ, AZUL_TDR_ENTITY_QUERIES=str(num_entity_queries)),
+            patch.object(plugin_cls, '_run_sql', new=_run_sql),
+            patch.object(tdr_hca, 'BundleQueryReport', side_effect=new_report),
+            patch('azul.Config.tdr_service_url',
+                  new=PropertyMock(return_value=self.mock_service_url))
+        ):
+            yield reports
+
+    def test_entity_queries(self):
+        expected_bundle = self._load_canned_bundle(self.bundle_fqid)
+        plugin = self.plugin_for_source_spec(self.source.spec)
+        num_entity_types = 13
+        for num_queries, num_expected_queries in [(0, num_entity_types), (1, 1), (4, 4)]:
+            with self.subTest(num_queries=num_queries):
+                with self._patch_plugin(plugin, num_queries) as reports:
+                    bundle = plugin.fetch_bundle(self.bundle_fqid)
+                self.assertEqual(expected_bundle.manifest, bundle.manifest)
+                self.assertEqual(expected_bundle.metadata_files, bundle.metadata_files)
+                # One additional query for the links
+                self.assertEqual(1 + num_expected_queries, len(self.queries))
+                report = one(reports)
+                self.assertEqual(len(self.queries), report.num_queries)
+                self.assertEqual(1 + num_entity_types, report.num_tables)
+                self.assertEqual(len(bundle.metadata_files), report.num_rows)
+                self.assertEqual(report.num_queries, len(report.to_json()['latencies']))
+
+    def test_fetch_bundles(self):
+        bundle_fqids = [self.stitched_bundle_fqid, self.bundle_fqid]
+        expected_bundles = list(map(self._load_canned_bundle, bundle_fqids))
+        plugin = self.plugin_for_source_spec(self.source.spec)
+        for num_queries in 0, 1:
+            with self.subTest(num_queries=num_queries):
+                with self._patch_plugin(plugin, num_queries):
+                    for expected_bundle in expected_bundles:
+                        bundle = plugin.fetch_bundle(expected_bundle.fqid)
+                        self.assertEqual(expected_bundle.manifest, bundle.manifest)
+                        self.assertEqual(expected_bundle.metadata_files, bundle.metadata_files)
+                    individual_queries = self.queries
+                with self._patch_plugin(plugin, num_queries) as reports:
+                    bundles = plugin.fetch_bundles(bundle_fqids)
+                batch_queries = self.queries
+                self.assertEqual(bundle_fqids, [bundle.fqid for bundle in bundles])
+                for expected_bundle, bundle in zip(expected_bundles, bundles):
+                    self.assertEqual(expected_bundle.manifest, bundle.manifest)
+                    self.assertEqual(expected_bundle.metadata_files, bundle.metadata_files)
+                # The batch shares the queries for the links of the root bundles
+                # and for the entities of the same type.
+                self.assertEqual(len(batch_queries), one(reports).num_queries)
+                self.assertLess(len(batch_queries), len(individual_queries))
+                if num_queries == 1:
+                    # Three queries for links, two for upstream bundles and one
+                    # for the entities. Fetching the bundles individually takes
+                    # one more query for links and one more for entities.
+                    self.assertEqual(6, len(batch_queries))
+                    self.assertEqual(8, len(individual_queries))
+
+    def test_lineage_cache(self):
+        expected_bundle = self._load_canned_bundle(self.stitched_bundle_fqid)
+        plugin = self.plugin_for_source_spec(self.source.spec)
+
+        def fetch_bundle() -> list[str]:
+            with self._patch_plugin(plugin, num_entity_queries=1):
+                bundle = plugin.fetch_bundle(self.stitched_bundle_fqid)
+            self.assertEqual(expected_bundle.manifest, bundle.manifest)
+            self.assertEqual(expected_bundle.metadata_files, bundle.metadata_files)
+            return [query for query in self.queries if 'JSON_EXTRACT_ARRAY' in query]
+
+        # Without the cache, the upstream bundles are looked up once for every
+        # level of stitching
+        lineage_queries = fetch_bundle()
+        self.assertEqual(2, len(lineage_queries))
+        self.assertTrue(all(' IN UNNEST([' in query for query in lineage_queries))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            location = 'file://' + tmp
+            with patch.dict(os.environ, AZUL_TDR_LINEAGE_CACHE=location):
+                store = LineageStore.for_location(location)
+                # The first bundle that needs stitching builds the index …
+                lineage_queries = fetch_bundle()
+                self.assertEqual(1, len(lineage_queries))
+                self.assertNotIn(' IN UNNEST([', one(lineage_queries))
+                path = Path(tmp) / f'{self.source.id}.json.gz'
+                self.assertTrue(path.exists())
+                # … subsequent ones use the index in memory …
+                self.assertEqual([], fetch_bundle())
+                # … or in the store
+                LineageStore.for_location.cache_clear()
+                self.assertIsNot(store, LineageStore.for_location(location))
+                self.assertEqual([], fetch_bundle())
+                # Datasets aren't cached because their contents can change
+                dataset_spec = attr.evolve(self.source.spec, is_snapshot=False)
+                dataset = TDRSourceRef(id=self.source.id, spec=dataset_spec)
+                links_json = self.tables['links'][self.stitched_bundle_fqid.uuid]
+                project = EntityReference(entity_type='project',
+                                          entity_id=links_json['project_id'])
+                links = tdr_hca.Links.from_json(project, links_json['content'])
+                plugin = self.plugin_for_source_spec(dataset_spec)
+                with self._patch_plugin(plugin, num_entity_queries=1):
+                    plugin._find_upstream_bundles(dataset, links.dangling_inputs())
+                self.assertIn(' IN UNNEST([', one(self.queries))
+
+
+class TestS3LineageStore(AzulUnitTestCase):
+    bucket = 'lineage-test-bucket'
+
+    def _store(self) -> S3LineageStore:
+        return S3LineageStore(bucket=self.bucket, prefix='lineage/')
+
+    @mock_s3
+    def test_store(self):
+        aws.s3.create_bucket(Bucket=self.bucket,
+                             CreateBucketConfiguration={
+                                 'LocationConstraint': config.region
+                             })
+        rows = [
+            dict(links_id='b1', version='v1', output_id='e1'),
+            dict(links_id='b2', version='v2', output_id='e2'),
+        ]
+        index = LineageIndex.from_rows(rows)
+        build = Mock(return_value=index)
+        # A missing index is built and saved …
+        self.assertEqual(index, self._store().get('snapshot', build))
+        build.assert_called_once_with()
+        response = aws.s3.get_object(Bucket=self.bucket, Key='lineage/snapshot.json.gz')
+        self.assertEqual(index.to_json(), json.loads(gzip.decompress(response['Body'].read())))
+        # … and loaded by another process
+        build.reset_mock()
+        self.assertEqual(index, self._store().get('snapshot', build))
+        build.assert_not_called()
+        # Without s3:ListBucket, S3 responds with 403 for a missing key
+        error = ClientError({'Error': {'Code': 'AccessDenied'}}, 'GetObject')
+        with patch.object(type(aws.s3), 'get_object', side_effect=error):
+            self.assertEqual(index, self._store().get('other_snapshot', build))
+        build.assert_called_once_with()
+        # Other errors are propagated
+        error = ClientError({'Error': {'Code': 'InternalError'}}, 'GetObject')
+        with patch.object(type(aws.s3), 'get_object', side_effect=error):
+            with self.assertRaises(ClientError):
+                self._store().get('snapshot', build)
+
+
 class TestTDRSourceList(AzulUnitTestCase):
 
     def _mock_snapshots(self, access_token: str) -> JSONs:
@@ -0,0 +1,133 @@
+from operator import (
+    attrgetter,
+)
+
+from azul.indexer import (
+    SourcedBundleFQID,
+)
+from azul.indexer.document import (
+    Contribution,
+    Document,
+)
+from azul.indexer.index_service import (
+    IndexService,
+)
+from azul.json import (
+    copy_jsons,
+)
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from azul.types import (
+    JSONs,
+)
+from azul_test_case import (
+    DCP1TestCase,
+)
+from indexer import (
+    CannedBundleTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class TranslateFieldsTestCase(DCP1TestCase, CannedBundleTestCase):
+    """
+    Prepares the documents derived from canned HCA bundles, both for forward
+    and reverse translation.
+    """
+
+    bundles = [
+        ('aaa96233-bf27-44c7-82df-b4dc15ad4d9d', '2018-11-02T11:33:44.698028Z'),
+        ('2a87dc5c-0c3c-4d91-a348-5d784ab48b92', '2018-03-29T10:39:45.437487Z'),
+        ('ffac201f-4b1c-4455-bd58-19c1a9e863b4', '2019-10-09T17:07:35.528600Z')
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index_service = IndexService()
+        documents = cls._documents()
+        field_types = cls.index_service.field_types(cls.catalog)
+        # The input documents for each direction of translation
+        cls.documents = {
+            True: documents,
+            False: Document.translate_fields(documents, field_types, forward=True)
+        }
+
+    @classmethod
+    def _documents(cls) -> JSONs:
+        contributions = []
+        for uuid, version in cls.bundles:
+            fqid = SourcedBundleFQID(source=cls.source, uuid=uuid, version=version)
+            bundle = cls._load_canned_bundle(fqid)
+            for partition in cls.index_service.deep_transform(cls.catalog, bundle, delete=False):
+                contributions.extend(partition)
+        # Aggregation expects contributions as they are read from the index
+        field_types = cls.index_service.catalogued_field_types()
+        contributions = [
+            Contribution.from_index(field_types, {
+                '_index': request['index'],
+                '_id': request['id'],
+                '_source': request['body']
+            })
+            for request in (c.to_index(cls.catalog, field_types) for c in contributions)
+        ]
+        contributions.sort(key=attrgetter('coordinates.entity.entity_type',
+                                          'coordinates.entity.entity_id'))
+        aggregates = list(cls.index_service._aggregate(contributions))
+        return [document.to_json() for document in [*contributions, *aggregates]]
+
+
+class TestTranslateFields(TranslateFieldsTestCase):
+    """
+    Compare the translators compiled by Document.translator() with the
+    recursive Document.translate_fields() on the documents derived from
+    canned HCA bundles.
+    """
+
+    def test_translator(self):
+        field_types = self.index_service.field_types(self.catalog)
+        for forward in True, False:
+            with self.subTest(forward=forward):
+                documents = self.documents[forward]
+                expected = [
+                    Document.translate_fields(document, field_types, forward=forward)
+                    for document in documents
+                ]
+                translator = Document.translator(self.catalog, field_types, forward=forward)
+                actual = list(map(translator, documents))
+                self.assertEqual(expected, actual)
+                # The service translates lists of documents
+                actual = self.index_service.translate_fields(self.catalog, documents, forward=forward)
+                self.assertEqual(expected, actual)
+                if not forward:
+                    documents = copy_jsons(documents)
+                    translator = Document.translator(self.catalog,
+                                                     field_types,
+                                                     forward=forward,
+                                                     in_place=True)
+                    actual = list(map(translator, documents))
+                    self.assertEqual(expected, actual)
+                    self.assertEqual(expected, documents)
+
+    def test_translator_cache(self):
+        field_types = self.index_service.field_types(self.catalog)
+        self.assertIs(field_types, self.index_service.field_types(self.catalog))
+        translator = Document.translator(self.catalog, field_types, forward=True)
+        self.assertIs(translator, Document.translator(self.catalog, field_types, forward=True))
+        self.assertIsNot(translator, Document.translator(self.catalog, field_types, forward=False))
+        # Translators compiled from another tree, as done by another service,
+        # don't displace those compiled from the first one
+        other_field_types = IndexService().field_types(self.catalog)
+        self.assertIsNot(field_types, other_field_types)
+        other_translator = Document.translator(self.catalog, other_field_types, forward=True)
+        self.assertIsNot(translator, other_translator)
+        self.assertIs(translator, Document.translator(self.catalog, field_types, forward=True))
+        self.assertIs(other_translator, Document.translator(self.catalog, other_field_types, forward=True))
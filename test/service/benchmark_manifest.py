@@ -0,0 +1,114 @@
+import time
+
+from more_itertools import (
+    one,
+)
+
+from azul.indexer.document import (
+    null_str,
+)
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from azul.plugins import (
+    ManifestFormat,
+)
+from azul.service.manifest_service import (
+    Cells,
+    ManifestGenerator,
+)
+from service.test_manifest import (
+    ManifestTestCase,
+    manifest_test,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class BenchmarkManifest(ManifestTestCase):
+    """
+    Not really a test but a benchmark of the extraction of manifest rows from
+    the documents derived from canned HCA bundles, before and after the
+    extractors were precompiled. The throughput is logged.
+    """
+
+    @manifest_test
+    def test_extract_fields_benchmark(self):
+        for bundle_fqid in [
+            self.bundle_fqid(uuid='f79257a7-dfc6-46d6-ae00-ba4b25313c10',
+                             version='2018-09-14T13:33:14.453337Z'),
+            self.bundle_fqid(uuid='cfab8304-dc9f-439e-af29-f8eb75b0729d',
+                             version='2019-07-18T21:28:20.595913Z'),
+            self.bundle_fqid(uuid='f0731ab4-6b80-4eed-97c9-4984de81a47c',
+                             version='2019-07-23T06:21:20.663434Z')
+        ]:
+            self._index_canned_bundle(bundle_fqid)
+        generator_cls = ManifestGenerator.cls_for_format(ManifestFormat.compact)
+        generator = generator_cls(self._service, self.catalog, self._filters({}))
+        docs = [generator._hit_to_doc(hit) for hit in generator._create_request().scan()]
+        self.assertGreater(len(docs), 10)
+
+        # The implementation that resolved the field types for every row
+        def extract_fields(field_path, entities, column_mapping, row):
+            field_types = generator._field_types
+            for field in field_path:
+                field_types = field_types[field]
+
+            def convert(field_name, field_value):
+                try:
+                    field_type = field_types[field_name]
+                except KeyError:
+                    if field_name == 'file_url':
+                        field_type = null_str
+                    else:
+                        raise
+                else:
+                    if isinstance(field_type, list):
+                        field_type = one(field_type)
+                return field_type.to_tsv(field_value)
+
+            for field_name, column_name in column_mapping.items():
+                column_value = []
+                for entity in entities:
+                    try:
+                        field_value = entity[field_name]
+                    except KeyError:
+                        pass
+                    else:
+                        if isinstance(field_value, list):
+                            column_value += [
+                                convert(field_name, field_sub_value)
+                                for field_sub_value in field_value
+                                if field_sub_value is not None
+                            ]
+                        else:
+                            column_value.append(convert(field_name, field_value))
+                column_value = generator.padded_joiner.join(sorted(set(column_value))[:100])
+                row[column_name] = column_value
+
+        def extract_rows(extract) -> tuple[list[Cells], float]:
+            rows = []
+            start = time.perf_counter()
+            for _ in range(num_rounds):
+                for doc in docs:
+                    row = {}
+                    for field_path, column_mapping in generator.manifest_config.items():
+                        extract(field_path=field_path,
+                                entities=generator._get_entities(field_path, doc),
+                                column_mapping=column_mapping,
+                                row=row)
+                    rows.append(row)
+            return rows, time.perf_counter() - start
+
+        num_rounds = 100
+        expected, before = extract_rows(extract_fields)
+        actual, after = extract_rows(generator._extract_fields)
+        self.assertEqual(expected, actual)
+        log.info('Extracted %.0f rows/s before and %.0f rows/s after precompiling the extractors',
+                 len(actual) / before, len(actual) / after)
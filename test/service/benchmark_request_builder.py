@@ -0,0 +1,60 @@
+import timeit
+from unittest import (
+    mock,
+)
+
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from azul.plugins.metadata.hca import (
+    Plugin,
+)
+from azul.service.elasticsearch_service import (
+    FilterStage,
+)
+from service.test_request_builder import (
+    RequestBuilderTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class BenchmarkRequestBuilder(RequestBuilderTestCase):
+    """
+    Not really a test but a micro-benchmark of the preparation of a request
+    with aggregations, with and without sharing the queries for the
+    individual filters between the aggregations for the facets. The timings
+    are logged.
+    """
+
+    def test_benchmark(self):
+        service = self.Service(Plugin())
+        num_facets = len(service.plugin.facets)
+        for num_filters in 0, 1, 4, 8:
+            filters = self._facet_filters(service, num_filters)
+
+            def shared():
+                self._prepare_request(filters, True, service).to_dict()
+
+            def unshared():
+                with mock.patch.object(FilterStage, '_filter_queries',
+                                       property(FilterStage._filter_queries.fget)):
+                    shared()
+
+            timings = {
+                f.__name__: min(timeit.repeat(f, number=10, repeat=3)) / 10
+                for f in (unshared, shared)
+            }
+            log.info('Preparing a request with %i facets and %i filter(s) took '
+                     '%.2fms without and %.2fms with shared filter queries, '
+                     'a speedup of %.1fx',
+                     num_facets, num_filters,
+                     timings['unshared'] * 1000,
+                     timings['shared'] * 1000,
+                     timings['unshared'] / timings['shared'])
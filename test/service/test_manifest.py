@@ -1,3 +1,6 @@
+from array import (
+    array,
+)
 from collections import (
     defaultdict,
 )
@@ -21,6 +24,7 @@ import os
 from pathlib import (
     Path,
 )
+import re
 from tempfile import (
     TemporaryDirectory,
 )
@@ -85,8 +89,8 @@ from azul.service import (
 )
 from azul.service.manifest_service import (
     BDBagManifestGenerator,
-    Bundles,
     CachedManifestNotFound,
+    FQID,
     Manifest,
     ManifestGenerator,
     ManifestKey,
@@ -177,10 +181,38 @@ class ManifestTestCase(DCP1TestCase, WebServiceTestCase, StorageServiceTestMixin
                                                    partition=partition)
             if isinstance(partition, Manifest):
                 return partition, num_partitions
+            elif isinstance(partition, list):
+                return self._get_sliced_manifest_object(format, filters, partition)
             # Emulate controller serializing the partition between steps
             partition = ManifestPartition.from_json(partition.to_json())
             num_partitions += 1
 
+    def _get_sliced_manifest_object(self,
+                                    format: ManifestFormat,
+                                    filters: Filters,
+                                    slices: list[ManifestPartition]
+                                    ) -> tuple[Manifest, int]:
+        # Emulate the step function, but generate one slice after another
+        # instead of concurrently
+        num_partitions = 0
+        for i, partition in enumerate(slices):
+            while not partition.is_last:
+                partition = self._service.get_manifest(format=format,
+                                                       catalog=self.catalog,
+                                                       filters=filters,
+                                                       partition=partition)
+                partition = ManifestPartition.from_json(partition.to_json())
+                num_partitions += 1
+            slices[i] = partition
+        generator_cls = ManifestGenerator.cls_for_format(format)
+        generator = generator_cls(self._service, self.catalog, filters)
+        manifest = self._service.concatenate_slices(format=format,
+                                                    catalog=self.catalog,
+                                                    filters=filters,
+                                                    manifest_key=generator.manifest_key(),
+                                                    slices=slices)
+        return manifest, num_partitions
+
 
 def manifest_test(test):
     """
@@ -1057,10 +1089,10 @@ class TestManifestEndpoints(ManifestTestCase, PFBTestCase):
                 reader = csv.DictReader(fh, delimiter='\t')
                 return list(reader), list(reader.fieldnames)
 
-    def test_bdbag_manifest_remove_redundant_entries(self):
+    def test_bdbag_manifest_redundant_bundles(self):
         """
-        Test BDBagManifestGenerator._remove_redundant_entries() directly with a
-        large set of sample data
+        Test BDBagManifestGenerator._redundant_bundles() directly with a large
+        set of sample data
         """
         now = datetime.utcnow()
 
@@ -1070,67 +1102,54 @@ class TestManifestEndpoints(ManifestTestCase, PFBTestCase):
         def u():
             return str(uuid4())
 
-        bundles: Bundles = {}
+        bundles: dict[FQID, list[str]] = {}
         # Create sample data that can be passed to
-        # BDBagManifestGenerator._remove_redundant_entries()
+        # BDBagManifestGenerator._redundant_bundles()
         # Each entry is given a timestamp 1 second later than the previous entry
         # to have variety in the entries
         num_of_entries = 100_000
         for i in range(num_of_entries):
             bundle_fqid = u(), v(i)
-            bundles[bundle_fqid] = {
-                'bam': [
-                    {'file': {'file_uuid': u()}},
-                    {'file': {'file_uuid': u()}},
-                    {'file': {'file_uuid': u()}}
-                ]
-            }
+            bundles[bundle_fqid] = [u(), u(), u()]
         fqids = {}
         keys = list(bundles.keys())
         # Add an entry with the same set of files as another entry though with a
         # later timestamp
         bundle_fqid = u(), v(num_of_entries + 1)
         # An arbitrary entry in bundles
-        bundles[bundle_fqid] = deepcopy(bundles[keys[100]])
+        bundles[bundle_fqid] = bundles[keys[100]][:]
         # With same set of files [1] will be removed (earlier timestamp)
         fqids['equal'] = bundle_fqid, keys[100]
         # Add an entry with a subset of files compared to another entry
         bundle_fqid = u(), v(num_of_entries + 2)
         # An arbitrary entry in bundles
-        bundles[bundle_fqid] = deepcopy(bundles[keys[200]])
-        del bundles[bundle_fqid]['bam'][2]
+        bundles[bundle_fqid] = bundles[keys[200]][:2]
         # [0] will be removed as it has a subset of files that [1] has
         fqids['subset'] = bundle_fqid, keys[200]
         # Add an entry with a superset of files compared to another entry
         bundle_fqid = u(), v(num_of_entries + 3)
         # An arbitrary entry in bundles
-        bundles[bundle_fqid] = deepcopy(bundles[keys[300]])
-        bundles[bundle_fqid]['bam'].append({'file': {'file_uuid': u()}})
-        # [0] has a superset of files that [0] has so [0] wil be removed
+        bundles[bundle_fqid] = [*bundles[keys[300]], u()]
+        # [0] has a superset of files that [1] has so [1] wil be removed
         fqids['superset'] = bundle_fqid, keys[300]
 
         # the generated entries plus 3 redundant entries
         self.assertEqual(len(bundles), num_of_entries + 3)
-        self.assertIn(fqids['equal'][0], bundles)
-        self.assertIn(fqids['equal'][1], bundles)
-        self.assertIn(fqids['subset'][0], bundles)
-        self.assertIn(fqids['subset'][1], bundles)
-        self.assertIn(fqids['superset'][0], bundles)
-        self.assertIn(fqids['superset'][1], bundles)
-
-        BDBagManifestGenerator._remove_redundant_entries(bundles)
-
-        # 3 redundant entries removed
-        self.assertEqual(len(bundles), num_of_entries)
-        # Removed for a duplicate file set with an earlier timestamp
-        self.assertNotIn(fqids['equal'][1], bundles)
-        self.assertIn(fqids['equal'][0], bundles)
-        # Removed for having a subset of files as another entry
-        self.assertNotIn(fqids['subset'][0], bundles)
-        self.assertIn(fqids['subset'][1], bundles)
-        self.assertIn(fqids['superset'][0], bundles)
-        # Removed for having a subset of files as another entry
-        self.assertNotIn(fqids['superset'][1], bundles)
+
+        fingerprint = BDBagManifestGenerator._file_fingerprint
+        bundle_files = {
+            bundle_fqid: array('q', sorted(map(fingerprint, file_uuids)))
+            for bundle_fqid, file_uuids in bundles.items()
+        }
+        redundant_bundles = BDBagManifestGenerator._redundant_bundles(bundle_files)
+
+        self.assertEqual({
+            # Removed for a duplicate file set with an earlier timestamp
+            fqids['equal'][1],
+            # Removed for having a subset of files as another entry
+            fqids['subset'][0],
+            fqids['superset'][1]
+        }, redundant_bundles)
 
     @manifest_test
     def test_bdbag_manifest_for_redundant_entries(self):
@@ -1166,9 +1185,13 @@ class TestManifestEndpoints(ManifestTestCase, PFBTestCase):
             # files when compared to its analysis bundle.
             {}
         ]:
-            rows, fieldnames = self._extract_bdbag_response(filters)
-            bundle_uuids = {row['bundle_uuid'] for row in rows}
-            self.assertEqual(bundle_uuids, expected_bundle_uuids)
+            # The rows are written in batches of bundles
+            for bundle_batch_size in (1, BDBagManifestGenerator.bundle_batch_size):
+                with self.subTest(filters=filters, bundle_batch_size=bundle_batch_size):
+                    with patch.object(BDBagManifestGenerator, 'bundle_batch_size', bundle_batch_size):
+                        rows, fieldnames = self._extract_bdbag_response(filters)
+                    bundle_uuids = {row['bundle_uuid'] for row in rows}
+                    self.assertEqual(bundle_uuids, expected_bundle_uuids)
 
     @manifest_test
     def test_curl_manifest(self):
@@ -1576,9 +1599,82 @@ class TestManifestPartitioning(ManifestTestCase, DocumentCloningTestCase):
     def test(self):
         # This is the smallest valid S3 part size
         part_size = 5 * 1024 * 1024
-        with patch.object(PagedManifestGenerator, 'part_size', part_size):
+        with (
+            patch.object(PagedManifestGenerator, 'part_size', part_size),
+            self.assertLogs(logger=manifest_service.log, level='INFO') as logs
+        ):
             manifest, num_partitions = self._get_manifest_object(ManifestFormat.compact,
                                                                  filters={})
         content = requests.get(manifest.location).content
         self.assertGreater(num_partitions, 1)
         self.assertGreater(len(content), (num_partitions - 1) * part_size)
+        # The timings of each stage are logged for every partition
+        stats = [log for log in logs.output if 'ES requests took' in log]
+        self.assertEqual(num_partitions, len(stats))
+
+    @manifest_test
+    def test_upload_parts(self):
+        """
+        A partition that is larger than the upload part size is uploaded in
+        several parts, with the same result as uploading it in one part.
+        """
+        # This is the smallest valid S3 part size
+        part_size = 5 * 1024 * 1024
+        format = ManifestFormat.compact
+        with patch.object(PagedManifestGenerator, 'part_size', part_size):
+            expected, _ = self._get_manifest_object(format, filters={})
+        # Download the content before the object is replaced
+        expected_content = requests.get(expected.location).content
+        generator_cls = ManifestGenerator.cls_for_format(format)
+        self.storage_service.delete(generator_cls.s3_object_key(expected.manifest_key))
+        with (
+            patch.object(PagedManifestGenerator, 'part_size', 2 * part_size),
+            patch.object(PagedManifestGenerator, 'upload_part_size', part_size),
+            self.assertLogs(logger=manifest_service.log, level='INFO') as logs
+        ):
+            actual, num_partitions = self._get_manifest_object(format, filters={})
+        self.assertFalse(actual.was_cached)
+        self.assertEqual(expected.manifest_key, actual.manifest_key)
+        self.assertEqual(expected_content, requests.get(actual.location).content)
+        num_parts = [
+            int(match[1])
+            for match in (re.search(r' in (\d+) part\(s\) of partition ', log) for log in logs.output)
+            if match is not None
+        ]
+        self.assertEqual(num_partitions, len(num_parts))
+        # At least one partition was uploaded in more than one part
+        self.assertGreater(sum(num_parts), num_partitions)
+
+    @manifest_test
+    def test_slices(self):
+        part_size = 5 * 1024 * 1024
+        for format in ManifestFormat.compact, ManifestFormat.curl:
+            with self.subTest(format=format):
+                with patch.object(PagedManifestGenerator, 'part_size', part_size):
+                    expected, num_partitions = self._get_manifest_object(format, filters={})
+                # The sliced manifest replaces the object, so the content of the
+                # unsliced one needs to be downloaded first
+                expected_content = requests.get(expected.location).content
+                generator_cls = ManifestGenerator.cls_for_format(format)
+                object_key = generator_cls.s3_object_key(expected.manifest_key)
+                self.storage_service.delete(object_key)
+                with (
+                    patch.object(PagedManifestGenerator, 'part_size', part_size),
+                    patch.object(PagedManifestGenerator, 'min_slice_size', 1000),
+                    patch.dict(os.environ, AZUL_MANIFEST_SLICES='4'),
+                    self.assertLogs(logger=manifest_service.log, level='INFO') as logs
+                ):
+                    actual, num_slice_partitions = self._get_manifest_object(format, filters={})
+                self.assertFalse(actual.was_cached)
+                self.assertEqual(expected.manifest_key, actual.manifest_key)
+                self.assertIn('Slicing manifest with 5000 files into 4 slices',
+                              ' '.join(logs.output))
+                # Each slice is written in at least one partition
+                self.assertGreaterEqual(num_slice_partitions, 4)
+                self.assertEqual(expected_content, requests.get(actual.location).content)
+                # The slices are deleted after they were concatenated
+                response = self.storage_service.client.list_objects_v2(
+                    Bucket=self.storage_service.bucket_name,
+                    Prefix=object_key
+                )
+                self.assertEqual([object_key], [o['Key'] for o in response['Contents']])
@@ -6,6 +6,8 @@ from itertools import (
     product,
 )
 import json
+import os
+import runpy
 from typing import (
     ContextManager,
 )
@@ -19,12 +21,17 @@ from uuid import (
     UUID,
 )
 
+import attrs
 from botocore.exceptions import (
     ClientError,
 )
 from furl import (
     furl,
 )
+from more_itertools import (
+    first,
+    one,
+)
 from moto import (
     mock_sts,
 )
@@ -34,6 +41,12 @@ import responses
 from app_test_case import (
     LocalAppTestCase,
 )
+from azul import (
+    config,
+)
+from azul.deployment import (
+    aws,
+)
 from azul.logging import (
     configure_test_logging,
 )
@@ -51,6 +64,7 @@ from azul.service.async_manifest_service import (
 )
 from azul.service.manifest_controller import (
     ManifestGenerationState,
+    manifest_state_key,
 )
 from azul.service.manifest_service import (
     CachedManifestNotFound,
@@ -60,6 +74,10 @@ from azul.service.manifest_service import (
     ManifestService,
     SignedManifestKey,
 )
+from azul.types import (
+    AnyJSON,
+    JSON,
+)
 from azul_test_case import (
     AzulUnitTestCase,
     DCP1TestCase,
@@ -326,6 +344,144 @@ class TestManifestController(DCP1TestCase, LocalAppTestCase):
                         else:
                             assert False, mock_effect
 
+    def _state_machine_definition(self) -> JSON:
+        """
+        The definition of the manifest state machine, as emitted by the
+        Terraform template
+        """
+        template = os.path.join(config.project_root,
+                                'terraform',
+                                'step_function.tf.json.template.py')
+        with (
+            patch.object(type(aws), 'get_lambda_arn', return_value='generate_manifest'),
+            patch.object(type(aws), 'permissions_boundary_tf', new={}),
+            patch('azul.terraform.emit_tf') as emit_tf
+        ):
+            runpy.run_path(template)
+        resources = one(emit_tf.mock_calls).args[0]['resource']
+        return json.loads(resources['aws_sfn_state_machine']['manifest']['definition'])
+
+    def _run_state_machine(self, machine: JSON, state: JSON) -> JSON:
+        """
+        Emulate an execution of the given state machine with the given input,
+        invoking the manifest generation Lambda function in-process. Only the
+        subset of the Amazon States Language used by the manifest state machine
+        is supported.
+        """
+
+        def select(state: JSON, path: str) -> AnyJSON:
+            assert path.startswith('$.'), path
+            for key in path[2:].split('.'):
+                state = state[key]
+            return state
+
+        def matches(state: JSON, choice: JSON) -> bool:
+            try:
+                value = select(state, choice['Variable'])
+            except KeyError:
+                present, value = False, None
+            else:
+                present = True
+            if 'IsPresent' in choice:
+                return present == choice['IsPresent']
+            elif 'BooleanEquals' in choice:
+                return present and value == choice['BooleanEquals']
+            else:
+                assert False, choice
+
+        name = machine['StartAt']
+        while True:
+            node = machine['States'][name]
+            node_type = node['Type']
+            if node_type == 'Succeed':
+                return state
+            elif node_type == 'Choice':
+                name = first((choice['Next'] for choice in node['Choices'] if matches(state, choice)),
+                             node['Default'])
+            elif node_type == 'Task':
+                self.assertEqual('generate_manifest', node['Resource'])
+                # The output of a task replaces the state
+                state = self.app_module.generate_manifest(state, None)
+                name = node['Next']
+            elif node_type == 'Map':
+                results = []
+                for item in select(state, node['ItemsPath']):
+                    item_state = {}
+                    for key, path in node['ItemSelector'].items():
+                        assert key.endswith('.$'), key
+                        value = item if path == '$$.Map.Item.Value' else select(state, path)
+                        item_state[key[:-2]] = value
+                    results.append(self._run_state_machine(node['ItemProcessor'], item_state))
+                result_path = node['ResultPath']
+                assert result_path.startswith('$.') and '.' not in result_path[2:], result_path
+                state = {**state, result_path[2:]: results}
+                name = node['Next']
+            else:
+                assert False, node_type
+
+    @mock.patch.object(ManifestService, 'concatenate_slices')
+    @mock.patch.object(ManifestService, 'get_manifest')
+    def test_slices(self, get_manifest, concatenate_slices):
+        """
+        Run the manifest state machine for a manifest that is generated in
+        slices, with each slice written in two partitions.
+        """
+        format = ManifestFormat.compact
+        filters = Filters(explicit={}, source_ids={self.source.id})
+        manifest_key = ManifestKey(catalog=self.catalog,
+                                   format=format,
+                                   manifest_hash=UUID('d2b0ce3c-46f0-57fe-b9d4-2e38d8934fd4'),
+                                   source_hash=UUID('77936747-5968-588e-809f-af842d6be9e0'))
+        manifest = Manifest(location='https://url.to.manifest?foo=bar',
+                            was_cached=False,
+                            format=format,
+                            manifest_key=manifest_key,
+                            file_name='some_file_name')
+        bounds = [None, '4', '8', 'c', None]
+        slices = [
+            ManifestPartition.first_of_slice(slice_index, slice_start, slice_end)
+            for slice_index, (slice_start, slice_end) in enumerate(zip(bounds, bounds[1:]))
+        ]
+
+        def get_manifest_(*,
+                          partition: ManifestPartition,
+                          **kwargs
+                          ) -> ManifestPartition | list[ManifestPartition]:
+            self.assertEqual(dict(format=format,
+                                  catalog=self.catalog,
+                                  filters=filters,
+                                  manifest_key=manifest_key),
+                             kwargs)
+            if partition.is_first:
+                return slices
+            else:
+                self.assertIsNotNone(partition.slice_index)
+                self.assertFalse(partition.is_last)
+                # The first partition of each slice is followed by a last one
+                return attrs.evolve(partition,
+                                    index=partition.index + 1,
+                                    is_last=partition.index == 1)
+
+        get_manifest.side_effect = get_manifest_
+        concatenate_slices.return_value = manifest
+        state: ManifestGenerationState = dict(filters=filters.to_json(),
+                                              manifest_key=manifest_key.to_json(),
+                                              partition=ManifestPartition.first().to_json())
+        state = self._run_state_machine(self._state_machine_definition(), state)
+        self.assertEqual({manifest_state_key: manifest.to_json()}, state)
+        # One invocation to slice the manifest and two for every slice
+        self.assertEqual(1 + 2 * len(slices), get_manifest.call_count)
+        concatenate_slices.assert_called_once_with(
+            format=format,
+            catalog=self.catalog,
+            filters=filters,
+            manifest_key=manifest_key,
+            slices=[
+                attrs.evolve(slice, index=2, is_last=True)
+                for slice in slices
+            ]
+        )
+
     token = Token.first(execution_id).encode()
 
     def _test(self, *, expected_status, token=token):
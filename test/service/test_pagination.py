@@ -2,16 +2,24 @@ from itertools import (
     chain,
     groupby,
 )
+import json
 from operator import (
     itemgetter,
 )
+import os
 from typing import (
     Any,
     Optional,
 )
 import unittest
+from unittest import (
+    mock,
+)
 
 import attr
+from furl import (
+    furl,
+)
 from more_itertools import (
     unzip,
 )
@@ -119,6 +127,7 @@ class TestPagination(DCP1TestCase, DocumentCloningTestCase):
                 'count': len(values),
                 'order': order,
                 'total': index_size,
+                'totalRelation': 'eq',
                 'sort': sort_field,
             }
             self.assertEqual(expected_pagination, pagination)
@@ -148,6 +157,44 @@ class TestPagination(DCP1TestCase, DocumentCloningTestCase):
         values = list(chain.from_iterable(page.values for page in pages))
         self.assertEqual(values, list(sorted(unique(values), reverse=reverse)))
 
+    def test_approximate_total(self):
+        index_size, limit = 5, 3
+        self._add_docs(index_size)
+        # Matches every document, regardless of the template it was cloned from
+        file_formats = {
+            file['file_format']
+            for template in self._templates
+            for file in template['contents']['files']
+        }
+        filters = {'fileFormat': {'is': sorted(file_formats)}}
+        with mock.patch.dict(os.environ, AZUL_TOTAL_HITS_LIMIT=str(limit)):
+            for filtered, exact_total, expected_total in [
+                # Unfiltered searches count hits up to the limit by default
+                (False, None, (limit, 'gte')),
+                (False, True, (index_size, 'eq')),
+                # Filtered searches count all hits on the first page by default
+                (True, None, (index_size, 'eq')),
+                (True, False, (limit, 'gte'))
+            ]:
+                with self.subTest(filtered=filtered, exact_total=exact_total):
+                    args = dict(catalog=self.catalog, size=2)
+                    if filtered:
+                        args['filters'] = json.dumps(filters)
+                    if exact_total is not None:
+                        args['exact_total'] = json.dumps(exact_total)
+                    url = self.base_url.set(path='/index/files', args=args)
+                    response = requests.get(str(url))
+                    response.raise_for_status()
+                    pagination = response.json()['pagination']
+                    total, relation = expected_total
+                    self.assertEqual(total, pagination['total'])
+                    self.assertEqual(relation, pagination['totalRelation'])
+                    self.assertEqual(-(-total // 2), pagination['pages'])
+                    # The link to the next page is unaffected by the total
+                    # and retains the requested counting mode
+                    next_args = furl(pagination['next']).args
+                    self.assertEqual(args.get('exact_total'), next_args.get('exact_total'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,12 @@
+from io import (
+    BytesIO,
+)
 from typing import (
     cast,
 )
+from unittest.mock import (
+    patch,
+)
 
 import fastavro
 
@@ -36,3 +42,34 @@ class TestPFB(PFBTestCase):
         avro_pfb.PFBEntity(id='a' * 254, name='foo', object={})
         with self.assertRaises(azul.RequirementError):
             avro_pfb.PFBEntity(id='a' * 255, name='foo', object={})
+
+    def test_pfb_parts(self):
+        field_types = FileTransformer.field_types()
+        schema = avro_pfb.pfb_schema_from_field_types(field_types)
+        metadata_entity = avro_pfb.pfb_metadata_entity(field_types)
+        header = avro_pfb.pfb_header(schema)
+        parts = []
+        for i in range(3):
+            with BytesIO() as buffer:
+                buffer.write(header)
+                avro_pfb.write_pfb_entities([metadata_entity] * i, schema, buffer)
+                parts.append(buffer.getvalue()[0 if i == 0 else len(header):])
+        # The header is only written once
+        self.assertEqual(header, parts[0])
+        # Parts written separately concatenate to a valid PFB
+        reader = fastavro.reader(BytesIO(b''.join(parts)))
+        self.assertEqual(3, len(list(reader)))
+
+    def test_pfb_converter_seen_entities(self):
+        field_types = FileTransformer.field_types()
+        schema = avro_pfb.pfb_schema_from_field_types(field_types)
+        converter = avro_pfb.PFBConverter(schema, repository_plugin=None)
+        a, b, c = (
+            avro_pfb.PFBEntity(id=id, name='foo', object={})
+            for id in 'abc'
+        )
+        with patch.object(converter, 'max_seen_entities', 2):
+            self.assertEqual([True, True, False, True],
+                             list(map(converter._is_new, [a, b, a, c])))
+            # The least recently seen entity was forgotten
+            self.assertEqual([False, True], list(map(converter._is_new, [a, b])))
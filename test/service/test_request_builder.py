@@ -4,12 +4,18 @@ from collections.abc import (
 )
 import json
 import unittest
+from unittest import (
+    mock,
+)
 
 import attr
 
 from azul import (
     CatalogName,
 )
+from azul.indexer.document import (
+    NullableString,
+)
 from azul.logging import (
     configure_test_logging,
 )
@@ -29,6 +35,7 @@ from azul.service import (
 )
 from azul.service.elasticsearch_service import (
     ElasticsearchService,
+    FilterStage,
     ToDictStage,
 )
 from azul_test_case import (
@@ -44,7 +51,7 @@ def setUpModule():
     configure_test_logging()
 
 
-class TestRequestBuilder(DCP1TestCase, WebServiceTestCase):
+class RequestBuilderTestCase(DCP1TestCase, WebServiceTestCase):
     # Subclass the class under test so we can inject a mock plugin
     @attr.s(frozen=True, auto_attribs=True)
     class Service(ElasticsearchService):
@@ -53,6 +60,34 @@ class TestRequestBuilder(DCP1TestCase, WebServiceTestCase):
         def metadata_plugin(self, catalog: CatalogName) -> MetadataPlugin:
             return self.plugin
 
+    def _prepare_request(self, filters, post_filter, service):
+        entity_type = 'files'
+        pipeline = service.create_chain(catalog=self.catalog,
+                                        entity_type=entity_type,
+                                        filters=filters,
+                                        post_filter=post_filter,
+                                        document_slice=None)
+        pipeline = ToDictStage(service=service,
+                               catalog=self.catalog,
+                               entity_type=entity_type).wrap(pipeline)
+        pipeline = HCAAggregationStage.create_and_wrap(pipeline)
+        request = pipeline.prepare_request(service.create_request(self.catalog, entity_type))
+        return request
+
+    def _facet_filters(self, service, num_filters: int) -> Filters:
+        plugin = service.plugin
+        facets = [
+            facet
+            for facet in plugin.facets
+            if isinstance(service.field_type(self.catalog, plugin.field_mapping[facet]),
+                          NullableString)
+        ]
+        explicit = {facet: {'is': ['foo', None]} for facet in facets[:num_filters]}
+        assert len(explicit) == num_filters, len(facets)
+        return Filters(explicit=explicit, source_ids={'bar'})
+
+
+class TestRequestBuilder(RequestBuilderTestCase):
     # The mock plugin
     class MockPlugin(Plugin):
 
@@ -322,24 +357,12 @@ class TestRequestBuilder(DCP1TestCase, WebServiceTestCase):
         service = self.Service(self.MockPlugin())
         filters = Filters(explicit=sample_filter, source_ids=set())
         request = self._prepare_request(filters, post_filter, service)
+        # The state of incremental aggregation is never part of a response
+        expected_output = {**expected_output, '_source': {'excludes': ['accumulators']}}
         expected_output = json.dumps(expected_output, sort_keys=True)
         actual_output = json.dumps(request.to_dict(), sort_keys=True)
         self.assertEqual(actual_output, expected_output)
 
-    def _prepare_request(self, filters, post_filter, service):
-        entity_type = 'files'
-        pipeline = service.create_chain(catalog=self.catalog,
-                                        entity_type=entity_type,
-                                        filters=filters,
-                                        post_filter=post_filter,
-                                        document_slice=None)
-        pipeline = ToDictStage(service=service,
-                               catalog=self.catalog,
-                               entity_type=entity_type).wrap(pipeline)
-        pipeline = HCAAggregationStage.create_and_wrap(pipeline)
-        request = pipeline.prepare_request(service.create_request(self.catalog, entity_type))
-        return request
-
     def test_create_aggregate(self):
         """
         Tests creation of an ES aggregate
@@ -393,6 +416,27 @@ class TestRequestBuilder(DCP1TestCase, WebServiceTestCase):
         actual_output = json.dumps(aggregation.to_dict(), sort_keys=True)
         self.assertEqual(actual_output, expected_output)
 
+    def test_shared_filter_queries(self):
+        """
+        The queries for the individual filters are built once per request and
+        shared by the aggregations for all facets.
+        """
+        service = self.Service(Plugin())
+        filters = self._facet_filters(service, 3)
+        request = self._prepare_request(filters, True, service)
+        filter_queries = {
+            id(query)
+            for facet in service.plugin.facets
+            for query in request.aggs[facet].filter.must
+        }
+        self.assertEqual(len(filters.explicit) + 1, len(filter_queries))
+
+        # The queries are the same as those built from scratch
+        with mock.patch.object(FilterStage, '_filter_queries',
+                               property(FilterStage._filter_queries.fget)):
+            expected = self._prepare_request(filters, True, service)
+        self.assertEqual(expected.to_dict(), request.to_dict())
+
 
 if __name__ == '__main__':
     unittest.main()
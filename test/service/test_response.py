@@ -71,14 +71,21 @@ from azul.plugins import (
     FieldPath,
 )
 from azul.plugins.metadata.hca.service.response import (
+    HCASummaryResponseStage,
     SearchResponseFactory,
 )
 from azul.plugins.repository.tdr import (
     TDRSourceRef,
 )
+from azul.service import (
+    Filters,
+)
 from azul.service.elasticsearch_service import (
     ResponsePagination,
 )
+from azul.service.repository_service import (
+    RepositoryService,
+)
 from azul.terra import (
     TDRSourceSpec,
 )
@@ -373,6 +380,39 @@ class TestResponse(DCP1TestCase, WebServiceTestCase):
             self.assertTrue('fileTypeSummaries' in hit)
             self.assertFalse('files' in hit)
 
+    def test_response_factory_field_globs(self):
+        """
+        The hits made from only those properties of the aggregate documents
+        that the factory claims to read must be the same as the ones made from
+        the complete documents.
+        """
+        for entity_type in 'files', 'samples', 'projects', 'bundles':
+            with self.subTest(entity_type=entity_type):
+                index_name = IndexName.create(catalog=self.catalog,
+                                              entity_type=entity_type,
+                                              doc_type=DocumentType.aggregate)
+                field_globs = SearchResponseFactory.field_globs(entity_type)
+
+                def make_hits(**kwargs) -> JSONs:
+                    results = self.es_client.search(index=str(index_name),
+                                                    body={'sort': ['entity_id.keyword']},
+                                                    size=100,
+                                                    **kwargs)
+                    hits = [hit['_source'] for hit in results['hits']['hits']]
+                    hits = self._index_service.translate_fields(catalog=self.catalog,
+                                                                doc=hits,
+                                                                forward=False)
+                    factory = SearchResponseFactory(hits=hits,
+                                                    pagination=self.paginations[0],
+                                                    aggs={},
+                                                    entity_type=entity_type,
+                                                    catalog=self.catalog)
+                    return factory.make_hits()
+
+                expected = make_hits()
+                self.assertGreater(len(expected), 0)
+                self.assertEqual(expected, make_hits(_source_includes=field_globs))
+
     canned_aggs = {
         "organ": {
             "doc_count": 21,
@@ -3380,6 +3420,30 @@ class TestResponseFields(DCP1TestCase, WebServiceTestCase):
         ]
         self.assertElasticEqual(expected_projects, summary['projects'])
 
+    def test_summary_async(self):
+        """
+        The summary is the same regardless of whether the requests for the
+        individual entity types are sent concurrently or in a single
+        multi-search request.
+        """
+        service = RepositoryService()
+        filters = Filters(explicit={}, source_ids={self.source.id})
+        num_entity_types = len(HCASummaryResponseStage().aggs_by_authority)
+        summaries = {}
+        for es_async in False, True:
+            with self.subTest(es_async=es_async):
+                with (
+                    patch.object(type(config), 'es_async', new=es_async),
+                    patch.object(RepositoryService,
+                                 'execute_async',
+                                 autospec=True,
+                                 side_effect=RepositoryService.execute_async) as execute_async
+                ):
+                    summaries[es_async] = service._summary_uncached(self.catalog, filters)
+                self.assertEqual(num_entity_types if es_async else 0,
+                                 execute_async.await_count)
+        self.assertEqual(summaries[False], summaries[True])
+
     def test_filtered_summary_cell_counts(self):
         # Bundle 00f48893 has 5 cell suspensions from 3 donors:
         # Donor 427c0a62 (female)    Donor 66b7152c (female)   Donor b8049daa (male)
@@ -3544,6 +3608,7 @@ class TestUnpopulatedIndexResponse(DCP1TestCase, WebServiceTestCase):
                     'pagination': {
                         'count': 0,
                         'total': 0,
+                        'totalRelation': 'eq',
                         'size': 10,
                         'next': None,
                         'previous': None,
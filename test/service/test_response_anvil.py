@@ -285,6 +285,7 @@ class TestAnvilResponse(AnvilIndexerTestCase, WebServiceTestCase):
                 'pagination': {
                     'count': 2,
                     'total': 2,
+                    'totalRelation': 'eq',
                     'size': 10,
                     'next': None,
                     'previous': None,
@@ -646,6 +647,7 @@ class TestAnvilResponse(AnvilIndexerTestCase, WebServiceTestCase):
                 'pagination': {
                     'count': 1,
                     'total': 1,
+                    'totalRelation': 'eq',
                     'size': 10,
                     'next': None,
                     'previous': None,
@@ -961,7 +963,8 @@ class TestAnvilResponse(AnvilIndexerTestCase, WebServiceTestCase):
                     'previous': None,
                     'size': 10,
                     'sort': 'bundleUuid',
-                    'total': 1
+                    'total': 1,
+                    'totalRelation': 'eq'
                 },
                 'termFacets': {
                     'accessible': {
@@ -1230,6 +1233,7 @@ class TestAnvilResponse(AnvilIndexerTestCase, WebServiceTestCase):
                 'pagination': {
                     'count': 1,
                     'total': 1,
+                    'totalRelation': 'eq',
                     'size': 10,
                     'next': None,
                     'previous': None,
@@ -1606,6 +1610,7 @@ class TestAnvilResponse(AnvilIndexerTestCase, WebServiceTestCase):
                 'pagination': {
                     'count': 1,
                     'total': 1,
+                    'totalRelation': 'eq',
                     'size': 10,
                     'next': None,
                     'previous': None,
@@ -2098,6 +2103,7 @@ class TestAnvilResponse(AnvilIndexerTestCase, WebServiceTestCase):
                 'pagination': {
                     'count': 2,
                     'total': 2,
+                    'totalRelation': 'eq',
                     'size': 10,
                     'next': None,
                     'previous': None,
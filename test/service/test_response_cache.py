@@ -0,0 +1,115 @@
+from itertools import (
+    count,
+)
+import os
+from unittest import (
+    mock,
+)
+
+from moto import (
+    mock_dynamodb,
+)
+
+from azul.generation_service import (
+    Generation,
+    GenerationService,
+)
+from azul.indexer.index_service import (
+    IndexService,
+)
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from azul.service import (
+    Filters,
+)
+from azul.service.elasticsearch_service import (
+    Pagination,
+)
+from azul.service.repository_service import (
+    RepositoryService,
+)
+from azul.service.response_cache import (
+    ResponseCache,
+)
+from dynamodb_test_case import (
+    DynamoDBTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+@mock_dynamodb
+class TestResponseCache(DynamoDBTestCase):
+    ddb_table_name = GenerationService.table_name
+    ddb_attrs = {GenerationService.key_attribute: 'S'}
+    ddb_hash_key = GenerationService.key_attribute
+
+    catalog = 'foo'
+
+    def test_generations(self):
+        service = GenerationService()
+        self.assertEqual(0, service.get(self.catalog).number)
+        for expected in 1, 2:
+            generation = service.increment(self.catalog)
+            self.assertEqual(expected, generation.number)
+            self.assertEqual(generation, service.get(self.catalog))
+        self.assertFalse(generation.is_settled(generation.modified))
+        self.assertEqual(0, service.get('bar').number)
+
+    def test_repository_service(self):
+        service = RepositoryService()
+        filters = Filters(explicit={}, source_ids={'a', 'b'})
+        pagination = Pagination(order='asc', size=10, sort='entryId')
+        counter = count()
+
+        def search():
+            return service._search(catalog=self.catalog,
+                                   entity_type='files',
+                                   aggregate=True,
+                                   filters=filters,
+                                   pagination=pagination)
+
+        def summary():
+            return service.summary(self.catalog, filters)
+
+        cache = ResponseCache(max_size=8)
+        with (
+            mock.patch.object(RepositoryService, 'response_cache', new=cache),
+            mock.patch.dict(os.environ, AZUL_RESPONSE_CACHE_SIZE=str(cache.max_size)),
+            mock.patch.object(RepositoryService, '_search_uncached',
+                              side_effect=lambda **kwargs: {'search': next(counter)}),
+            mock.patch.object(RepositoryService, '_summary_uncached',
+                              side_effect=lambda *args: {'summary': next(counter)})
+        ):
+            self.assertEqual({'search': 0}, search())
+            self.assertEqual({'summary': 1}, summary())
+            # Cached responses are returned as copies
+            response = search()
+            self.assertEqual({'search': 0}, response)
+            response['search'] = None
+            self.assertEqual({'search': 0}, search())
+            self.assertEqual({'summary': 1}, summary())
+            self.assertEqual((3, 2), (cache.stats.hits, cache.stats.misses))
+
+            # Responses depend on the accessible sources
+            filters = Filters(explicit={}, source_ids={'a'})
+            self.assertEqual({'search': 2}, search())
+            self.assertEqual({'search': 2}, search())
+
+            # Writing aggregates invalidates all responses for the catalog.
+            # Until the aggregates are visible, responses aren't cached.
+            IndexService()._increment_generations([self.catalog])
+            self.assertEqual({'search': 3}, search())
+            self.assertEqual({'search': 4}, search())
+            with mock.patch.object(Generation, 'is_settled', return_value=True):
+                self.assertEqual({'search': 5}, search())
+                self.assertEqual({'search': 5}, search())
+                self.assertEqual({'summary': 6}, summary())
+            self.assertEqual(2, len(cache))
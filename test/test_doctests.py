@@ -13,10 +13,13 @@ import azul.doctests
 import azul.dss
 import azul.exceptions
 import azul.files
+import azul.generation_service
 import azul.http
 import azul.indexer
 import azul.indexer.aggregate
 import azul.indexer.document
+import azul.indexer.index_service
+import azul.indexer.rollup
 import azul.iterators
 import azul.json
 import azul.json_freeze
@@ -36,9 +39,12 @@ import azul.openapi.schema
 import azul.plugins.metadata.hca.indexer.transform
 import azul.plugins.metadata.hca.service.contributor_matrices
 import azul.plugins.repository.tdr_hca
+import azul.plugins.repository.tdr_hca.lineage
+import azul.service.avro_pfb
 import azul.service.drs_controller
 import azul.service.manifest_service
 import azul.service.repository_controller
+import azul.service.response_cache
 import azul.strings
 import azul.terra
 import azul.terraform
@@ -71,10 +77,13 @@ def load_tests(_loader, tests, _ignore):
         azul.dss,
         azul.exceptions,
         azul.files,
+        azul.generation_service,
         azul.http,
         azul.indexer,
         azul.indexer.aggregate,
         azul.indexer.document,
+        azul.indexer.index_service,
+        azul.indexer.rollup,
         azul.iterators,
         azul.json,
         azul.json_freeze,
@@ -85,10 +94,13 @@ def load_tests(_loader, tests, _ignore):
         azul.openapi.schema,
         azul.plugins.metadata.hca.service.contributor_matrices,
         azul.plugins.repository.tdr_hca,
+        azul.plugins.repository.tdr_hca.lineage,
         azul.plugins.metadata.hca.indexer.transform,
+        azul.service.avro_pfb,
         azul.service.drs_controller,
         azul.service.manifest_service,
         azul.service.repository_controller,
+        azul.service.response_cache,
         azul.strings,
         azul.terra,
         azul.terraform,
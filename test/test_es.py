@@ -0,0 +1,332 @@
+import asyncio
+from collections.abc import (
+    Mapping,
+)
+from concurrent.futures import (
+    ThreadPoolExecutor,
+)
+import datetime
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+import json
+from threading import (
+    Lock,
+    Thread,
+)
+import time
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+from aws_requests_auth import (
+    aws_auth,
+)
+from aws_requests_auth.aws_auth import (
+    AWSRequestsAuth,
+)
+from elasticsearch import (
+    AsyncElasticsearch,
+    Elasticsearch,
+)
+from elasticsearch_dsl import (
+    MultiSearch,
+    Search,
+)
+from elasticsearch_dsl.response import (
+    Response,
+)
+import requests
+
+from azul import (
+    config,
+)
+from azul.es import (
+    AzulAIOHttpConnection,
+    AzulConnection,
+    AzulRequestsHttpConnection,
+    AzulUrllib3HttpConnection,
+    CachedBotoAWSRequestsAuth,
+    ConnectionPoolStats,
+    ESClientFactory,
+    event_loop,
+)
+from azul.logging import (
+    configure_test_logging,
+    get_test_logger,
+)
+from azul.service.elasticsearch_service import (
+    ElasticsearchService,
+)
+from azul.types import (
+    JSON,
+)
+from azul_test_case import (
+    AzulUnitTestCase,
+)
+
+log = get_test_logger(__name__)
+
+
+# noinspection PyPep8Naming
+def setUpModule():
+    configure_test_logging(log)
+
+
+class TestCachedBotoAWSRequestsAuth(AzulUnitTestCase):
+
+    def test_signature(self):
+        auth = CachedBotoAWSRequestsAuth(aws_host='foo.us-east-1.es.amazonaws.com',
+                                         aws_region='us-east-1',
+                                         aws_service='es')
+        request = requests.Request(method='POST',
+                                   url='https://foo.us-east-1.es.amazonaws.com/bar/_search?size=1',
+                                   data=b'{"query":{}}').prepare()
+        clock = Mock()
+        clock.datetime.utcnow.return_value = datetime.datetime(2023, 1, 2, 3, 4, 5)
+        key_cache = CachedBotoAWSRequestsAuth._signing_key
+        key_cache.cache_clear()
+        with patch.object(aws_auth, 'datetime', new=clock):
+            with patch('azul.es.datetime', new=clock):
+                for aws_token in None, 'bar':
+                    with self.subTest(aws_token=aws_token):
+                        credentials = dict(aws_access_key='AKIDEXAMPLE',
+                                           aws_secret_access_key='foo',
+                                           aws_token=aws_token)
+                        expected = AWSRequestsAuth.get_aws_request_headers(auth,
+                                                                           request,
+                                                                           **credentials)
+                        actual = auth.get_aws_request_headers(request, **credentials)
+                        self.assertEqual(expected, actual)
+        # The key was derived once and reused for the second signature
+        cache_info = key_cache.cache_info()
+        self.assertEqual((1, 1), (cache_info.misses, cache_info.hits))
+
+
+class LocalServerTestCase(AzulUnitTestCase):
+    """
+    Runs an HTTP server that answers every request with an empty JSON object
+    after a delay, or with one empty JSON object per search in the case of a
+    multi-search request. The server records the requests it receives, and
+    the maximum number of requests it handled at the same time.
+    """
+    latency = .1
+
+    def setUp(self):
+        super().setUp()
+        test_case = self
+        self.requests: list[tuple[str, str, Mapping[str, str], bytes]] = []
+        self.num_in_flight, self.max_in_flight = 0, 0
+        lock = Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self, body: bytes = b''):
+                with lock:
+                    test_case.requests.append((self.command, self.path, self.headers, body))
+                    test_case.num_in_flight += 1
+                    test_case.max_in_flight = max(test_case.max_in_flight,
+                                                  test_case.num_in_flight)
+                # Hold on to the connection long enough for requests in excess
+                # of the pool size to have to wait for it
+                time.sleep(test_case.latency)
+                with lock:
+                    test_case.num_in_flight -= 1
+                if self.path.split('?')[0].endswith('/_msearch'):
+                    # One header and one body line per search
+                    num_searches = len(body.splitlines()) // 2
+                    body = json.dumps({'responses': [{}] * num_searches}).encode()
+                else:
+                    body = b'{}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.do_GET(self.rfile.read(int(self.headers['Content-Length'])))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('localhost', 0), Handler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+
+class TestConnectionPool(LocalServerTestCase):
+    pool_size = 2
+    num_threads = 4
+
+    def test_pool(self):
+        for connection_class in AzulUrllib3HttpConnection, AzulRequestsHttpConnection:
+            with self.subTest(connection_class=connection_class):
+                client = Elasticsearch(hosts=[dict(host='localhost',
+                                                   port=self.server.server_port)],
+                                       connection_class=connection_class,
+                                       max_retries=0,
+                                       pool_size=self.pool_size)
+                connection = client.transport.get_connection()
+                assert isinstance(connection, AzulConnection)
+                num_requests = 3 * self.num_threads
+                with ThreadPoolExecutor(max_workers=self.num_threads) as tpe:
+                    futures = [
+                        tpe.submit(client.transport.perform_request, 'GET', '/')
+                        for _ in range(num_requests)
+                    ]
+                    for future in futures:
+                        self.assertEqual({}, future.result())
+                stats = connection.pool_stats
+                self.assertEqual(num_requests, stats.requests)
+                self.assertGreater(stats.waits, 0)
+                # Connections are kept alive and reused
+                self.assertEqual(ConnectionPoolStats(requests=num_requests,
+                                                     waits=stats.waits,
+                                                     new_connections=self.pool_size),
+                                 stats)
+
+
+class TestAsyncClient(LocalServerTestCase):
+    num_requests = 4
+
+    def _client(self, **kwargs) -> AsyncElasticsearch:
+        return AsyncElasticsearch(hosts=[dict(host='localhost',
+                                              port=self.server.server_port)],
+                                  connection_class=AzulAIOHttpConnection,
+                                  max_retries=0,
+                                  pool_size=self.num_requests,
+                                  **kwargs)
+
+    def _search(self, client: AsyncElasticsearch) -> list[JSON]:
+
+        async def search():
+            try:
+                return await asyncio.gather(*(
+                    client.search(index='foo', body={})
+                    for _ in range(self.num_requests)
+                ))
+            finally:
+                await client.close()
+
+        return event_loop().run_until_complete(search())
+
+    def test_concurrency(self):
+        responses = self._search(self._client())
+        self.assertEqual([{}] * self.num_requests, responses)
+        # The requests are made concurrently, not one after the other
+        self.assertEqual(self.num_requests, self.max_in_flight)
+
+    def test_aws_auth(self):
+        auth = AWSRequestsAuth(aws_access_key='AKIDEXAMPLE',
+                               aws_secret_access_key='foo',
+                               aws_host='foo.us-east-1.es.amazonaws.com',
+                               aws_region='us-east-1',
+                               aws_service='es')
+        clock = Mock()
+        clock.datetime.utcnow.return_value = datetime.datetime(2023, 1, 2, 3, 4, 5)
+        with patch.object(aws_auth, 'datetime', new=clock):
+            self._search(self._client(aws_auth=auth))
+            self.assertEqual(self.num_requests, len(self.requests))
+            # The client library sends HEAD requests as GET requests
+            client = self._client(aws_auth=auth)
+
+            async def exists():
+                try:
+                    return await client.indices.exists(index='foo')
+                finally:
+                    await client.close()
+
+            self.assertTrue(event_loop().run_until_complete(exists()))
+            self.assertEqual('GET', self.requests[-1][0])
+            for method, path, headers, body in self.requests:
+                # The signature covers the request as it was received
+                request = requests.Request(method=method,
+                                           url=f'http://localhost{path}',
+                                           data=body)
+                expected = auth.get_aws_request_headers_handler(request.prepare())
+                self.assertTrue(expected['Authorization'].startswith('AWS4-HMAC-SHA256 '))
+                for name, value in expected.items():
+                    self.assertEqual(value, headers[name])
+
+    def test_execute_async(self):
+        service = ElasticsearchService()
+        es_endpoint = 'localhost', self.server.server_port
+        with patch.object(type(config), 'es_endpoint', new=es_endpoint):
+            requests_ = [Search(index='foo').extra(size=0) for _ in range(self.num_requests)]
+            responses = service.run_concurrently(*map(service.execute_async, requests_))
+        self.assertEqual([Response] * self.num_requests, list(map(type, responses)))
+        self.assertEqual(self.num_requests, self.max_in_flight)
+        self.assertEqual([('POST', '/foo/_search', {'size': 0})] * self.num_requests,
+                         [(method, path, json.loads(body)) for method, path, _, body in self.requests])
+
+    def test_client_replacement(self):
+        es_endpoint = 'localhost', self.server.server_port
+
+        async def get_async():
+            return await ESClientFactory.get_async()
+
+        with (
+            patch.object(type(config), 'es_endpoint', new=es_endpoint),
+            patch.object(AsyncElasticsearch, 'close', autospec=True) as close
+        ):
+            client = event_loop().run_until_complete(get_async())
+            # The client is reused for as long as the configuration is the same
+            self.assertIs(client, event_loop().run_until_complete(get_async()))
+            close.assert_not_called()
+            # A client that is replaced is closed
+            with patch.object(type(config), 'es_timeout', new=config.es_timeout + 1):
+                other_client = event_loop().run_until_complete(get_async())
+            self.assertIsNot(client, other_client)
+            close.assert_awaited_once_with(client)
+
+            def get_async_in_thread():
+                loop = event_loop()
+                try:
+                    return loop.run_until_complete(get_async())
+                finally:
+                    loop.close()
+
+            # Each thread has its own client
+            with ThreadPoolExecutor(max_workers=1) as tpe:
+                thread_client = tpe.submit(get_async_in_thread).result()
+            self.assertIsNot(other_client, thread_client)
+            close.assert_awaited_once_with(client)
+
+    def test_event_loop(self):
+        self.assertIs(event_loop(), event_loop())
+
+        def other_event_loop():
+            loop = event_loop()
+            loop.close()
+            return loop
+
+        with ThreadPoolExecutor(max_workers=1) as tpe:
+            other = tpe.submit(other_event_loop).result()
+        self.assertIsNot(event_loop(), other)
+
+    def test_benchmark(self):
+        client = Elasticsearch(hosts=[dict(host='localhost',
+                                           port=self.server.server_port)],
+                               max_retries=0)
+        request = MultiSearch(using=client)
+        for _ in range(self.num_requests):
+            request = request.add(Search(index='foo'))
+        start = time.perf_counter()
+        responses = request.execute()
+        multi_search = time.perf_counter() - start
+        self.assertEqual(self.num_requests, len(responses))
+        start = time.perf_counter()
+        self._search(self._client())
+        concurrent = time.perf_counter() - start
+        log.info('%i searches took %.3fs in a multi-search request and '
+                 '%.3fs as concurrent requests',
+                 self.num_requests, multi_search, concurrent)